@@ -4,7 +4,19 @@ from django.urls import reverse
 from django import forms
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.contrib import messages
+from django.contrib.admin import helpers
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.template.response import TemplateResponse
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.urls import path
 from .models import Profile, Subdivision, Product, ProductImage, ChangeLog
+from .importers import ProductImportError, import_products
+from .changelog_archive import find_archived_entries
+from .permissions import get_permission_context
 
 class ProfileInline(admin.StackedInline):
     """Inline для отображения профиля в админке пользователя"""
@@ -89,6 +101,19 @@ class SubdivisionAdminForm(forms.ModelForm):
         model = Subdivision
         fields = '__all__'
 
+class ProductImportForm(forms.Form):
+    """Форма загрузки файла для импорта продуктов"""
+    file = forms.FileField(
+        label="Файл CSV или XLSX",
+        help_text="Столбцы: code, name, description, characteristics, status, condition, "
+                  "quantity, unit, location, storage_date, notes"
+    )
+    update_existing = forms.BooleanField(
+        required=False,
+        label="Обновлять существующие коды",
+        help_text="Иначе строки с существующими кодами попадут в отчет об ошибках"
+    )
+
 @admin.register(Subdivision)
 class SubdivisionAdmin(admin.ModelAdmin):
     form = SubdivisionAdminForm
@@ -97,6 +122,7 @@ class SubdivisionAdmin(admin.ModelAdmin):
     search_fields = ['code', 'name', 'description']
     readonly_fields = ['created_at', 'updated_at']
     inlines = [SubdivisionMemberInline]
+    actions = ['import_products']
     fieldsets = (
         ('Основная информация', {
             'fields': ('code', 'name', 'description', 'manager')
@@ -116,11 +142,66 @@ class SubdivisionAdmin(admin.ModelAdmin):
         return format_html('<strong>{}</strong>', count)
     member_count.short_description = "Кол-во членов"
     
+    def get_queryset(self, request):
+        # Количество неликвидов из счетчиков одним запросом для всего списка
+        return super().get_queryset(request).annotate(
+            _product_count=Coalesce(Sum('product_counters__count'), 0)
+        )
+    
     def product_count(self, obj):
-        count = obj.product_count()
+        count = getattr(obj, '_product_count', None)
+        if count is None:
+            count = obj.product_count()
         url = reverse('admin:catalog_product_changelist') + f'?subdivision__id__exact={obj.id}'
         return format_html('<a href="{}">{}</a>', url, count)
     product_count.short_description = "Кол-во неликвидов"
+    product_count.admin_order_field = '_product_count'
+    
+    @admin.action(description="Импортировать продукты из CSV/XLSX")
+    def import_products(self, request, queryset):
+        """Импорт продуктов в выбранное подразделение (промежуточная страница с формой)"""
+        if queryset.count() != 1:
+            self.message_user(request, "Выберите одно подразделение для импорта", messages.WARNING)
+            return None
+        subdivision = queryset.first()
+        
+        if 'apply' in request.POST:
+            form = ProductImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+                try:
+                    report = import_products(
+                        upload,
+                        upload.name,
+                        subdivision=subdivision,
+                        user=request.user,
+                        update_existing=form.cleaned_data['update_existing']
+                    )
+                except ProductImportError as e:
+                    self.message_user(request, str(e), messages.ERROR)
+                    return None
+                
+                self.message_user(
+                    request,
+                    f"Импорт в {subdivision.code}: создано {report.created}, "
+                    f"обновлено {report.updated}, ошибок {report.failed}",
+                    messages.WARNING if report.errors else messages.SUCCESS
+                )
+                # Показываем только первые ошибки, полный отчет - командой import_products
+                for row_number, code, message in report.errors[:20]:
+                    self.message_user(request, f"Строка {row_number} ({code}): {message}", messages.ERROR)
+                return None
+        else:
+            form = ProductImportForm()
+        
+        return TemplateResponse(request, 'admin/catalog/subdivision/import_products.html', {
+            **self.admin_site.each_context(request),
+            'title': f"Импорт продуктов: {subdivision}",
+            'subdivision': subdivision,
+            'form': form,
+            'opts': self.model._meta,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
     
     def save_model(self, request, obj, form, change):
         # Сохраняем подразделение
@@ -135,7 +216,6 @@ class SubdivisionAdmin(admin.ModelAdmin):
             profile.save()
             
             # Логируем действие
-            from django.contrib import messages
             messages.success(
                 request, 
                 f'Пользователь {add_user.username} добавлен в подразделение {obj.name}'
@@ -184,17 +264,43 @@ class ProductImageInline(admin.TabularInline):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 100px; max-width: 100px;" />',
-                obj.image.url
+                obj.get_rendition_url('admin')
             )
         return "-"
     image_preview.short_description = "Превью"
 
+class ChangeLogInlineFormSet(BaseInlineFormSet):
+    """Одна страница истории продукта вместо всех записей"""
+    per_page = 20
+    page_number = 1
+    
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            paginator = Paginator(
+                super().get_queryset().select_related('changed_by').order_by('-timestamp', '-id'),
+                self.per_page
+            )
+            self.page = paginator.get_page(self.page_number)
+            self._queryset = list(self.page.object_list)
+            # Продукт уже есть в формсете - не загружаем его для каждой строки
+            for change in self._queryset:
+                change.product = self.instance
+        return self._queryset
+
 class ChangeLogInline(admin.TabularInline):
     model = ChangeLog
+    formset = ChangeLogInlineFormSet
+    template = 'admin/catalog/product/changelog_inline.html'
     extra = 0
+    fields = ['action', 'changed_by', 'changes', 'timestamp']
     readonly_fields = ['action', 'changed_by', 'changes', 'timestamp']
     can_delete = False
     
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.page_number = request.GET.get('changes_page') or 1
+        return formset
+    
     def has_add_permission(self, request, obj=None):
         return False
 
@@ -264,7 +370,7 @@ class ProductAdmin(admin.ModelAdmin):
         if main_image and main_image.image:
             return format_html(
                 '<img src="{}" style="max-height: 200px; max-width: 200px;" />',
-                main_image.image.url
+                main_image.get_rendition_url('admin')
             )
         return "Нет изображения"
     main_image_preview.short_description = "Основное изображение"
@@ -273,13 +379,62 @@ class ProductAdmin(admin.ModelAdmin):
         if not change:  # Если создается новый объект
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+    
+    # Права на продукт - по правилам каталога (контекст прав запроса, без запросов на каждый объект)
+    def has_view_permission(self, request, obj=None):
+        return super().has_view_permission(request, obj) and (
+            obj is None or get_permission_context(request.user).can_view(obj)
+        )
+    
+    def has_change_permission(self, request, obj=None):
+        return super().has_change_permission(request, obj) and (
+            obj is None or get_permission_context(request.user).can_edit(obj)
+        )
+    
+    def has_delete_permission(self, request, obj=None):
+        return super().has_delete_permission(request, obj) and (
+            obj is None or get_permission_context(request.user).can_delete(obj)
+        )
+    
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:product_id>/archived-changes/',
+                self.admin_site.admin_view(self.archived_changes_view),
+                name='catalog_product_archived_changes'
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def archived_changes_view(self, request, product_id):
+        """Записи истории продукта из архива (команда archive_changelog)"""
+        product = self.get_object(request, str(product_id))
+        if product is None or not self.has_view_permission(request, product):
+            raise PermissionDenied
+        
+        actions = dict(ChangeLog.ACTION_CHOICES)
+        entries = find_archived_entries(product.pk)
+        for entry in entries:
+            entry['action_display'] = actions.get(entry['action'], entry['action'])
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Архив истории изменений: {product}',
+            'product': product,
+            'entries': entries,
+        }
+        return TemplateResponse(request, 'admin/catalog/product/archived_changes.html', context)
 
 @admin.register(ProductImage)
 class ProductImageAdmin(admin.ModelAdmin):
-    list_display = ['product_link', 'image_preview', 'is_main', 'uploaded_by', 'uploaded_at']
-    list_filter = ['is_main', 'uploaded_at']
+    list_display = ['product_link', 'image_preview', 'is_main', 'processing_status', 'uploaded_by', 'uploaded_at']
+    list_filter = ['is_main', 'processing_status', 'uploaded_at']
     search_fields = ['product__code', 'product__name', 'description']
-    readonly_fields = ['uploaded_by', 'uploaded_at', 'image_preview_large']
+    readonly_fields = [
+        'uploaded_by', 'uploaded_at', 'image_preview_large',
+        'processing_status', 'processed_at', 'processing_error'
+    ]
     
     def product_link(self, obj):
         url = reverse('admin:catalog_product_change', args=[obj.product.id])
@@ -290,7 +445,7 @@ class ProductImageAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 50px; max-width: 50px;" />',
-                obj.image.url
+                obj.get_rendition_url('admin')
             )
         return "-"
     image_preview.short_description = "Превью"
@@ -299,7 +454,7 @@ class ProductImageAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 300px; max-width: 300px;" />',
-                obj.image.url
+                obj.get_rendition_url('card')
             )
         return "-"
     image_preview_large.short_description = "Изображение"
@@ -312,6 +467,7 @@ class ProductImageAdmin(admin.ModelAdmin):
 @admin.register(ChangeLog)
 class ChangeLogAdmin(admin.ModelAdmin):
     list_display = ['product', 'action', 'changed_by', 'timestamp']
+    list_select_related = ['product', 'changed_by']
     list_filter = ['action', 'timestamp']
     search_fields = ['product__code', 'product__name', 'changed_by__username']
     readonly_fields = ['product', 'action', 'changed_by', 'changes', 'timestamp']
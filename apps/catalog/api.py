@@ -0,0 +1,205 @@
+"""
+JSON API каталога только для чтения (опрос с терминалов).
+
+Ответы содержат ETag, построенный из версий кэша каталога (apps.catalog.cache).
+Повторный запрос с If-None-Match получает 304 без выборки и сериализации
+данных: для списков это только чтение версий из кэша, для подразделения
+и продукта - один поиск по индексу.
+
+Last-Modified не отдается: ответ включает изображения и подразделение,
+а их изменения (в том числе удаление изображения) не отражаются ни в одной
+дате - If-Modified-Since мог бы получить 304 для устаревших данных.
+Версии кэша сдвигаются при любом таком изменении.
+
+Если кэш недоступен, ответы отдаются без ETag (и без 304), а не с ошибкой.
+"""
+import hashlib
+import logging
+
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
+
+from .cache import get_or_build, get_versions, product_scope, subdivision_scope
+from .models import Product, Subdivision
+from .pagination import CursorPaginator
+from .views import apply_product_filters
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def make_etag(scopes, parts=()):
+    """ETag из версий областей кэша и параметров запроса (None, если кэш недоступен)"""
+    try:
+        versions = get_versions(scopes)
+    except Exception as e:
+        logger.error(f"Ошибка чтения версий кэша для ETag {scopes}: {e}")
+        return None
+    raw = repr((versions, list(parts)))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def get_subdivision(request, subdivision_code):
+    """Подразделение запроса (загружается один раз для ETag и для ответа)"""
+    if not hasattr(request, 'catalog_subdivision'):
+        request.catalog_subdivision = Subdivision.objects.filter(code=subdivision_code).first()
+    return request.catalog_subdivision
+
+
+def image_url(request, image, rendition):
+    return request.build_absolute_uri(image.get_rendition_url(rendition)) if image else None
+
+
+def subdivision_to_dict(subdivision):
+    return {
+        'id': subdivision.pk,
+        'code': subdivision.code,
+        'name': subdivision.name,
+        'description': subdivision.description,
+        'product_count': subdivision.product_count,
+    }
+
+
+def product_to_dict(request, product):
+    """Краткие данные продукта для списка"""
+    return {
+        'id': product.pk,
+        'code': product.code,
+        'name': product.name,
+        'subdivision': product.subdivision.code,
+        'status': product.status,
+        'condition': product.condition,
+        'quantity': product.quantity,
+        'unit': product.unit,
+        'location': product.location,
+        'image': image_url(request, product.get_main_image(), 'card'),
+        'created_at': product.created_at.isoformat(),
+        'updated_at': product.updated_at.isoformat(),
+    }
+
+
+def product_detail_to_dict(request, product):
+    data = product_to_dict(request, product)
+    data.update({
+        'description': product.description,
+        'characteristics': product.characteristics,
+        'storage_date': product.storage_date.isoformat() if product.storage_date else None,
+        'notes': product.notes,
+        'created_by': product.created_by.username if product.created_by else None,
+        'images': [
+            {
+                'id': image.pk,
+                'description': image.description,
+                'is_main': image.is_main,
+                'url': image_url(request, image, 'detail'),
+                'thumbnail': request.build_absolute_uri(image.thumbnail.url) if image.thumbnail else None,
+            }
+            for image in product.images.all()
+        ],
+    })
+    return data
+
+
+def json_response(data):
+    response = JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+    # Клиент каждый раз проверяет актуальность через If-None-Match
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def subdivisions_etag(request):
+    return make_etag(['subdivisions', 'products'])
+
+
+@require_GET
+@condition(etag_func=subdivisions_etag)
+def subdivision_list(request):
+    """Подразделения с количеством продуктов"""
+    def build():
+        subdivisions = Subdivision.objects.annotate(
+            product_count=Coalesce(Sum('product_counters__count'), 0)
+        ).order_by('name')
+        return {'results': [subdivision_to_dict(subdivision) for subdivision in subdivisions]}
+
+    return json_response(get_or_build('api:subdivisions', ['subdivisions', 'products'], build))
+
+
+def subdivision_products_etag(request, subdivision_code):
+    subdivision = get_subdivision(request, subdivision_code)
+    if subdivision is None:
+        return None
+    return make_etag(
+        ['subdivisions', subdivision_scope(subdivision.pk)],
+        sorted(request.GET.items())
+    )
+
+
+@require_GET
+@condition(etag_func=subdivision_products_etag)
+def subdivision_products(request, subdivision_code):
+    """
+    Продукты подразделения с курсорной пагинацией.
+
+    Параметры: фильтры как на странице подразделения, cursor, limit.
+    """
+    subdivision = get_subdivision(request, subdivision_code)
+    if subdivision is None:
+        raise Http404('Подразделение не найдено')
+
+    def build():
+        queryset = apply_product_filters(
+            Product.objects.filter(subdivision=subdivision),
+            request.GET
+        ).select_related('subdivision').prefetch_related('images')
+        page = CursorPaginator(queryset, get_limit(request)).page(request.GET.get('cursor'))
+        return {
+            'results': [product_to_dict(request, product) for product in page.object_list],
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+
+    data = get_or_build(
+        'api:subdivision_products',
+        ['subdivisions', subdivision_scope(subdivision.pk)],
+        build,
+        parts=(sorted(request.GET.items()), request.get_host())
+    )
+    return json_response(data)
+
+
+def product_etag(request, product_id):
+    return make_etag(['subdivisions', product_scope(product_id)])
+
+
+@require_GET
+@condition(etag_func=product_etag)
+def product_detail(request, product_id):
+    """Полные данные продукта с изображениями"""
+    def build():
+        product = get_object_or_404(
+            Product.objects.select_related('subdivision', 'created_by').prefetch_related('images'),
+            pk=product_id
+        )
+        return product_detail_to_dict(request, product)
+
+    data = get_or_build(
+        'api:product',
+        ['subdivisions', product_scope(product_id)],
+        build,
+        parts=(request.get_host(),)
+    )
+    return json_response(data)
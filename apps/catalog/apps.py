@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.catalog'
\ No newline at end of file
+    name = 'apps.catalog'
+    
+    def ready(self):
+        # Подключаем обработчики сигналов
+        from . import signals  # noqa: F401
@@ -0,0 +1,161 @@
+"""
+Кэширование данных каталога с версионной инвалидацией.
+
+Каждая область данных имеет номер версии в кэше:
+    'subdivisions'        - список и реквизиты подразделений;
+    'products'            - любое изменение продуктов (счетчики главной страницы);
+    'subdivision:<id>'    - продукты подразделения (страницы списка);
+    'product:<id>'        - отдельный продукт с изображениями;
+    'product_codes:<id>'  - коды продуктов подразделения (apps.catalog.code_index),
+                            меняется только при добавлении, удалении, переносе
+                            продукта или смене кода, но не при правке изображений.
+Ключ закэшированных данных включает версии всех областей, от которых они
+зависят. Сигналы моделей меняют версии, и старые записи просто перестают
+читаться (и со временем вытесняются), без поиска и удаления ключей.
+
+Фрагменты, ключ которых строится из самих данных (карточки продуктов
+по id, updated_at и основному изображению), читаются пачкой через
+get_many_or_build и не зависят от версий.
+
+Ошибки кэша (например, недоступный Redis) не ломают страницы - данные
+в этом случае строятся заново из базы.
+"""
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+
+
+def version_key(scope):
+    return f'catalog:version:{scope}'
+
+
+def subdivision_scope(subdivision_id):
+    return f'subdivision:{subdivision_id}'
+
+
+def product_scope(product_id):
+    return f'product:{product_id}'
+
+
+def product_codes_scope(subdivision_id):
+    return f'product_codes:{subdivision_id}'
+
+
+def new_version():
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """Текущие версии областей одним запросом к кэшу"""
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(scopes):
+    """Асинхронный вариант get_versions"""
+    keys = [version_key(scope) for scope in scopes]
+    versions = await cache.aget_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    """Инвалидация областей: новая версия для каждой (одним запросом к кэшу)"""
+    if not scopes:
+        return
+    version = new_version()
+    try:
+        cache.set_many({version_key(scope): version for scope in scopes}, timeout=None)
+    except Exception as e:
+        logger.error(f"Ошибка обновления версий кэша {scopes}: {e}")
+
+
+def bump_versions_on_commit(*scopes):
+    """
+    Инвалидация после фиксации текущей транзакции (вне транзакции - сразу).
+
+    Версия, сдвинутая до фиксации, позволила бы параллельному запросу
+    закэшировать под новой версией еще старые данные.
+    """
+    if scopes:
+        transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+def make_key(name, scopes, parts=()):
+    versions = get_versions(scopes)
+    raw = repr((list(zip(scopes, versions)), list(parts)))
+    return f'catalog:{name}:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_or_build(name, scopes, builder, parts=(), timeout=DEFAULT_TIMEOUT):
+    """
+    Данные из кэша или builder() с сохранением в кэш.
+
+    name - название данных, scopes - области, от версий которых они зависят,
+    parts - дополнительные части ключа (фильтры, курсор и т.д.).
+    """
+    try:
+        key = make_key(name, scopes, parts)
+        value = cache.get(key)
+    except Exception as e:
+        logger.error(f"Ошибка чтения кэша {name}: {e}")
+        return builder()
+
+    if value is None:
+        value = builder()
+        try:
+            cache.set(key, value, timeout)
+        except Exception as e:
+            logger.error(f"Ошибка записи кэша {name}: {e}")
+    return value
+
+
+def get_many_or_build(name, items, key_parts, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    Значения для списка items одним чтением из кэша (get_many).
+
+    key_parts(item) - части ключа элемента, builder(item) - значение для
+    отсутствующего в кэше элемента; новые значения сохраняются одним
+    set_many. Возвращает значения в порядке items.
+    """
+    keys = [
+        f'catalog:{name}:' + hashlib.md5(repr(key_parts(item)).encode()).hexdigest()
+        for item in items
+    ]
+    try:
+        cached = cache.get_many(keys)
+    except Exception as e:
+        logger.error(f"Ошибка чтения кэша {name}: {e}")
+        cached = {}
+
+    values = []
+    missing = {}
+    for key, item in zip(keys, items):
+        if key in cached:
+            values.append(cached[key])
+        else:
+            value = builder(item)
+            missing[key] = value
+            values.append(value)
+
+    if missing:
+        try:
+            cache.set_many(missing, timeout)
+        except Exception as e:
+            logger.error(f"Ошибка записи кэша {name}: {e}")
+    return values
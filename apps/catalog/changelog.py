@@ -0,0 +1,208 @@
+"""
+Журнал изменений продуктов (ChangeLog) с отложенной записью.
+
+При загрузке продукта значения полей запоминаются (Product.from_db),
+при сохранении вычисляется компактная разница {поле: [было, стало]}
+и добавляется в буфер текущего контекста (потока или asyncio-задачи). Буфер записывается одним
+ChangeLog.objects.bulk_create в конце запроса (ChangeLogMiddleware)
+или блока collect(), либо отправляется в задачу Celery write_changelog
+при CHANGELOG_ASYNC = True. Поэтому сохранение продукта не выполняет
+дополнительных запросов для журнала.
+
+Вне блока collect() (shell, скрипты) запись выполняется сразу.
+"""
+import logging
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from asgiref.local import Local
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# Отслеживаемые поля продукта (attname)
+TRACKED_FIELDS = [
+    'code', 'name', 'description', 'characteristics', 'subdivision_id',
+    'status', 'condition', 'quantity', 'unit', 'location', 'storage_date', 'notes'
+]
+
+# Размер буфера, после которого он записывается не дожидаясь конца блока
+MAX_BUFFER_SIZE = 1000
+
+# Local из asgiref, как у соединений Django: буфер общий для async-представления
+# и его вызовов sync_to_async
+_state = Local()
+
+
+def json_value(value):
+    """Значение поля в виде, пригодном для JSONField"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def snapshot(product):
+    """Текущие значения отслеживаемых полей"""
+    return {field: getattr(product, field) for field in TRACKED_FIELDS}
+
+
+def diff_values(old, new):
+    """Разница {поле: [было, стало]} по полям, известным в обоих снимках"""
+    return {
+        field: [json_value(old[field]), json_value(new[field])]
+        for field in TRACKED_FIELDS
+        if field in old and field in new and old[field] != new[field]
+    }
+
+
+def get_action(changes, created=False):
+    if created:
+        return 'create'
+    if 'status' in changes:
+        return 'status_change'
+    return 'update'
+
+
+def _get_buffer():
+    if not hasattr(_state, 'entries'):
+        _state.entries = []
+        _state.depth = 0
+        _state.user = None
+    return _state
+
+
+def get_user_id(user):
+    """id пользователя блока collect (request.user вычисляется только при записи)"""
+    if user is not None and getattr(user, 'is_authenticated', False):
+        return user.pk
+    return None
+
+
+def record(product_id, action, changes, user_id=None):
+    """Добавление записи в буфер (или сразу в базу вне блока collect)"""
+    state = _get_buffer()
+    state.entries.append({
+        'product_id': product_id,
+        'action': action,
+        'changed_by_id': user_id if user_id is not None else get_user_id(state.user),
+        'changes': changes,
+        'timestamp': timezone.now(),
+    })
+    if state.depth == 0 or len(state.entries) >= MAX_BUFFER_SIZE:
+        flush()
+
+
+def record_save(product, created=False):
+    """Запись изменения продукта после save()"""
+    new = snapshot(product)
+    if created:
+        changes = {field: json_value(value) for field, value in new.items() if value not in ('', None, {})}
+    else:
+        changes = diff_values(getattr(product, '_loaded_values', None) or {}, new)
+        if not changes:
+            return
+    record(product.pk, get_action(changes, created), changes)
+
+
+def record_bulk(old_values, products):
+    """
+    Запись изменений для массовых операций (bulk_create/bulk_update).
+
+    old_values - {id: снимок до изменения} для существующих продуктов,
+    остальные продукты считаются созданными.
+    """
+    for product in products:
+        if not product.pk:
+            continue
+        if product.pk in old_values:
+            changes = diff_values(old_values[product.pk], snapshot(product))
+            if changes:
+                record(product.pk, get_action(changes), changes)
+        else:
+            record_save(product, created=True)
+
+
+def discard(product_id):
+    """Удаление из буфера записей удаленного продукта (журнал удаляется вместе с ним)"""
+    state = _get_buffer()
+    state.entries = [entry for entry in state.entries if entry['product_id'] != product_id]
+
+
+def has_pending():
+    """Есть ли в буфере незаписанные записи"""
+    return bool(_get_buffer().entries)
+
+
+def flush():
+    """Запись накопленного буфера"""
+    state = _get_buffer()
+    entries, state.entries = state.entries, []
+    if not entries:
+        return
+
+    if getattr(settings, 'CHANGELOG_ASYNC', False):
+        from .tasks import write_changelog
+        try:
+            write_changelog.delay([
+                dict(entry, timestamp=entry['timestamp'].isoformat()) for entry in entries
+            ])
+            return
+        except Exception as e:
+            logger.error(f"Ошибка отправки журнала изменений в очередь: {e}")
+
+    write_entries(entries)
+
+
+def write_entries(entries):
+    """Запись пачки записей журнала одним запросом"""
+    from .models import ChangeLog
+
+    objects = []
+    for entry in entries:
+        timestamp = entry['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = parse_datetime(timestamp)
+        objects.append(ChangeLog(
+            product_id=entry['product_id'],
+            action=entry['action'],
+            changed_by_id=entry['changed_by_id'],
+            changes=entry['changes'],
+            timestamp=timestamp,
+        ))
+    try:
+        ChangeLog.objects.bulk_create(objects, batch_size=MAX_BUFFER_SIZE)
+    except Exception as e:
+        # Журнал не должен ломать основную операцию
+        logger.error(f"Ошибка записи журнала изменений ({len(objects)} записей): {e}")
+
+
+@contextmanager
+def collect(user=None, autoflush=True):
+    """
+    Блок, в котором записи журнала накапливаются и записываются в конце.
+
+    user - пользователь, от имени которого выполняются изменения.
+    Вложенные блоки используют буфер внешнего. autoflush=False - буфер
+    записывает вызывающий код (в async-коде через sync_to_async(flush)).
+    """
+    state = _get_buffer()
+    if state.depth == 0:
+        # Свой список для блока: Local копирует данные при записи, а общий с
+        # родительским контекстом список накапливал бы записи чужих запросов
+        state.entries = []
+    previous_user = state.user
+    if user is not None:
+        state.user = user
+    state.depth += 1
+    try:
+        yield
+    finally:
+        state.depth -= 1
+        state.user = previous_user
+        if state.depth == 0 and autoflush:
+            flush()
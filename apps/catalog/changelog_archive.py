@@ -0,0 +1,163 @@
+"""
+Холодный архив журнала изменений.
+
+Старые записи ChangeLog выгружаются в сегменты JSONL, сжатые gzip
+(CHANGELOG_ARCHIVE_DIR), и удаляются из базы пачками. Рядом с каждым
+сегментом лежит индекс *.index.json со списком продуктов, поэтому поиск
+архивных записей продукта читает только нужные сегменты.
+
+Сегмент сначала пишется во временный файл и переименовывается только
+после успешного закрытия, а записи удаляются из базы только после этого,
+так что при сбое данные не теряются (в худшем случае попадут в архив дважды).
+"""
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChangeLog
+
+SEGMENT_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.index.json'
+
+
+def get_archive_dir():
+    return str(getattr(settings, 'CHANGELOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive', 'changelog')))
+
+
+def entry_to_dict(entry):
+    """Запись журнала для архива (значения из values())"""
+    return {
+        'id': entry['id'],
+        'product_id': entry['product_id'],
+        'product_code': entry['product__code'],
+        'action': entry['action'],
+        'changed_by_id': entry['changed_by_id'],
+        'changed_by': entry['changed_by__username'],
+        'changes': entry['changes'],
+        'timestamp': entry['timestamp'].isoformat(),
+    }
+
+
+def iter_old_entries(before, batch_size):
+    """Записи старше before пачками по возрастанию id (keyset, без OFFSET)"""
+    queryset = ChangeLog.objects.filter(timestamp__lt=before).order_by('id').values(
+        'id', 'product_id', 'product__code', 'action', 'changed_by_id',
+        'changed_by__username', 'changes', 'timestamp'
+    )
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]['id']
+
+
+def write_segment(directory, name, entries_batches, segment_size):
+    """
+    Запись одного сегмента из потока пачек.
+
+    Возвращает (id записанных записей, индекс сегмента) или None,
+    если записей больше нет.
+    """
+    path = os.path.join(directory, name + SEGMENT_SUFFIX)
+    tmp_path = path + '.tmp'
+    ids = []
+    products = set()
+    first = last = None
+
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as output:
+        for batch in entries_batches:
+            for entry in batch:
+                data = entry_to_dict(entry)
+                output.write(json.dumps(data, ensure_ascii=False) + '\n')
+                ids.append(data['id'])
+                products.add(data['product_id'])
+                first = first or data['timestamp']
+                last = data['timestamp']
+            if len(ids) >= segment_size:
+                break
+
+    if not ids:
+        os.remove(tmp_path)
+        return None
+
+    index = {
+        'segment': name + SEGMENT_SUFFIX,
+        'count': len(ids),
+        'first_id': ids[0],
+        'last_id': ids[-1],
+        'first_timestamp': first,
+        'last_timestamp': last,
+        'products': sorted(products),
+    }
+    with open(os.path.join(directory, name + INDEX_SUFFIX), 'w', encoding='utf-8') as index_file:
+        json.dump(index, index_file)
+    # Сегмент появляется под своим именем последним - после индекса
+    os.replace(tmp_path, path)
+    return ids, index
+
+
+def delete_entries(ids, batch_size):
+    """Удаление записей из базы пачками (короткие транзакции)"""
+    deleted = 0
+    for start in range(0, len(ids), batch_size):
+        count, _ = ChangeLog.objects.filter(id__in=ids[start:start + batch_size]).delete()
+        deleted += count
+    return deleted
+
+
+def archive_changelog(days, batch_size=5000, segment_size=100000, directory=None):
+    """
+    Архивация записей старше days дней.
+
+    Возвращает список индексов записанных сегментов.
+    """
+    directory = directory or get_archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    before = timezone.now() - timedelta(days=days)
+    prefix = 'changelog-' + timezone.now().strftime('%Y%m%d%H%M%S')
+
+    batches = iter_old_entries(before, batch_size)
+    segments = []
+    while True:
+        result = write_segment(directory, f'{prefix}-{len(segments) + 1:04d}', batches, segment_size)
+        if result is None:
+            break
+        ids, index = result
+        delete_entries(ids, batch_size)
+        segments.append(index)
+    return segments
+
+
+def iter_indexes(directory=None):
+    directory = directory or get_archive_dir()
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(INDEX_SUFFIX):
+            with open(os.path.join(directory, name), encoding='utf-8') as index_file:
+                yield json.load(index_file)
+
+
+def find_archived_entries(product_id, directory=None):
+    """Архивные записи продукта (новые первыми); читаются только сегменты из индекса"""
+    directory = directory or get_archive_dir()
+    entries = []
+    for index in iter_indexes(directory):
+        path = os.path.join(directory, index['segment'])
+        if product_id not in index['products'] or not os.path.exists(path):
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as segment:
+            for line in segment:
+                data = json.loads(line)
+                if data['product_id'] == product_id:
+                    data['timestamp'] = parse_datetime(data['timestamp'])
+                    entries.append(data)
+    entries.sort(key=lambda data: (data['timestamp'], data['id']), reverse=True)
+    return entries
@@ -0,0 +1,133 @@
+"""
+Множества кодов продуктов по подразделениям в памяти процесса.
+
+Проверка занятости кода (в том числе пачкой) отвечает по множеству без
+запроса к базе. Множество подразделения загружается одним запросом и
+действует, пока не изменилась версия кодов подразделения в кэше
+(product_codes_scope в apps.catalog.cache): сигналы Product и импорт меняют
+ее, только когда набор кодов мог измениться (новый, удаленный или
+перенесенный продукт, смена кода), - правка остальных полей и изображений
+множество не перестраивает. Версия меняется и множество в своем процессе
+сбрасывается после фиксации транзакции (invalidate_on_commit): иначе
+параллельный запрос мог бы загрузить еще старые коды под новой версией.
+
+Включается настройкой CATALOG_CODE_INDEX.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import aget_versions, bump_versions, product_codes_scope
+from .models import Product, Subdivision
+
+logger = logging.getLogger(__name__)
+
+
+def is_enabled():
+    return getattr(settings, 'CATALOG_CODE_INDEX', False)
+
+
+class ProductCodeIndex:
+    """Коды продуктов подразделений (и id подразделений по коду) с версиями из кэша"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subdivisions = None  # (версия, {код подразделения: id})
+        self._codes = {}  # id подразделения -> (версия, frozenset кодов)
+
+    def invalidate(self, subdivision_id=None):
+        with self._lock:
+            if subdivision_id is None:
+                self._subdivisions = None
+                self._codes.clear()
+            else:
+                self._codes.pop(subdivision_id, None)
+
+    def _get_subdivisions(self, version):
+        entry = self._subdivisions
+        return entry[1] if entry and entry[0] == version else None
+
+    def _get_codes(self, subdivision_id, version):
+        entry = self._codes.get(subdivision_id)
+        return entry[1] if entry and entry[0] == version else None
+
+    def _store_subdivisions(self, version, subdivisions):
+        with self._lock:
+            self._subdivisions = (version, subdivisions)
+
+    def _store_codes(self, subdivision_id, version, codes):
+        with self._lock:
+            self._codes[subdivision_id] = (version, codes)
+
+    async def afind_taken(self, subdivision_code, codes):
+        """Занятые коды из codes или None, если подразделение не найдено"""
+        version, = await aget_versions(['subdivisions'])
+        subdivisions = self._get_subdivisions(version)
+        if subdivisions is None:
+            subdivisions = {
+                code: pk async for code, pk in Subdivision.objects.values_list('code', 'id')
+            }
+            self._store_subdivisions(version, subdivisions)
+
+        subdivision_id = subdivisions.get(subdivision_code)
+        if subdivision_id is None:
+            return None
+        if not codes:
+            return set()
+
+        version, = await aget_versions([product_codes_scope(subdivision_id)])
+        known = self._get_codes(subdivision_id, version)
+        if known is None:
+            known = frozenset([
+                code async for code in
+                Product.objects.filter(subdivision_id=subdivision_id).values_list('code', flat=True)
+            ])
+            self._store_codes(subdivision_id, version, known)
+        return {code for code in codes if code in known}
+
+
+code_index = ProductCodeIndex()
+
+
+def invalidate_on_commit(*subdivision_ids, subdivisions=False):
+    """
+    Сброс множеств кодов после фиксации транзакции (вне транзакции - сразу).
+
+    subdivision_ids - подразделения с изменившимся набором кодов;
+    subdivisions=True - изменился список подразделений (сбрасывается все,
+    версию 'subdivisions' меняют сигналы кэша).
+    """
+    def invalidate():
+        if subdivisions:
+            code_index.invalidate()
+        for subdivision_id in subdivision_ids:
+            code_index.invalidate(subdivision_id)
+        bump_versions(*[product_codes_scope(subdivision_id) for subdivision_id in subdivision_ids])
+
+    transaction.on_commit(invalidate)
+
+
+async def afind_taken_codes(subdivision_code, codes):
+    """
+    Занятые коды подразделения или None, если подразделение не найдено.
+
+    Через множество в памяти, если оно включено и кэш доступен,
+    иначе - один запрос code__in.
+    """
+    if is_enabled():
+        try:
+            return await code_index.afind_taken(subdivision_code, codes)
+        except Exception as e:
+            logger.error(f"Ошибка индекса кодов продуктов, проверка по базе: {e}")
+
+    subdivision_id = await Subdivision.objects.filter(code=subdivision_code).values_list('id', flat=True).afirst()
+    if subdivision_id is None:
+        return None
+    if not codes:
+        return set()
+    return {
+        code async for code in
+        Product.objects.filter(subdivision_id=subdivision_id, code__in=codes).values_list('code', flat=True)
+    }
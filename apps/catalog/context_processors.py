@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+from .permissions import get_permission_context
+
+
+def catalog_permissions(request):
+    """Контекст прав текущего пользователя для шаблонов (загружается при первом обращении)"""
+    return {
+        'catalog_permissions': SimpleLazyObject(
+            lambda: get_permission_context(request.user)
+        ),
+    }
@@ -0,0 +1,143 @@
+"""
+События обработки изображений продуктов (Server-Sent Events).
+
+Задачи обработки (apps.catalog.tasks) публикуют событие о готовности
+или ошибке изображения в канал продукта, а представление image_events
+(ASGI) подписывается на канал и передает события браузеру - странице
+не нужно перезагружаться, чтобы увидеть миниатюру.
+
+Транспорт - Redis pub/sub (CATALOG_EVENTS_REDIS_URL). Если он не задан,
+используется замена в памяти процесса: события доходят, только когда
+задачи выполняются в процессе веб-сервера (task_always_eager, разработка).
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'nonliquid:product-images:'
+
+_redis_client = None
+
+# Подписчики замены в памяти: {product_id: [(цикл событий, очередь), ...]}
+_local_subscribers = {}
+_local_lock = threading.Lock()
+
+
+def get_channel(product_id):
+    return f'{CHANNEL_PREFIX}{product_id}'
+
+
+def get_redis_url():
+    return getattr(settings, 'CATALOG_EVENTS_REDIS_URL', None)
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(get_redis_url())
+    return _redis_client
+
+
+def image_event(product_image):
+    """Данные события изображения для клиента"""
+    done = product_image.processing_status == product_image.PROCESSING_DONE
+    return {
+        'id': product_image.pk,
+        'product_id': product_image.product_id,
+        'status': product_image.processing_status,
+        'thumbnail': product_image.thumbnail.url if done and product_image.thumbnail else None,
+        'url': product_image.get_rendition_url('card') if done else None,
+        'error': product_image.processing_error,
+    }
+
+
+def publish(product_id, event):
+    """Публикация события в канал продукта (ошибки транспорта не критичны)"""
+    data = json.dumps(event, ensure_ascii=False)
+    if get_redis_url():
+        try:
+            get_redis_client().publish(get_channel(product_id), data)
+        except Exception as e:
+            logger.warning(f"Не удалось опубликовать событие продукта {product_id}: {e}")
+        return
+
+    with _local_lock:
+        subscribers = list(_local_subscribers.get(product_id, ()))
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, data)
+        except RuntimeError:
+            # Цикл событий подписчика уже закрыт
+            pass
+
+
+def publish_image_events(product_image):
+    """События для изображения и всех изображений с тем же общим файлом"""
+    for image in product_image.get_processing_queryset():
+        publish(image.product_id, image_event(image))
+
+
+class LocalSubscription:
+    """Подписка через очередь в памяти процесса"""
+
+    def __init__(self, product_id):
+        self.product_id = product_id
+
+    async def __aenter__(self):
+        self.item = (asyncio.get_running_loop(), asyncio.Queue())
+        with _local_lock:
+            _local_subscribers.setdefault(self.product_id, []).append(self.item)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        with _local_lock:
+            subscribers = _local_subscribers.get(self.product_id, [])
+            subscribers.remove(self.item)
+            if not subscribers:
+                _local_subscribers.pop(self.product_id, None)
+
+    async def get(self, timeout):
+        """Следующее событие (JSON) или None, если за timeout секунд его не было"""
+        try:
+            return await asyncio.wait_for(self.item[1].get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisSubscription:
+    """Подписка на канал Redis pub/sub (свое соединение на подписчика)"""
+
+    def __init__(self, product_id):
+        self.product_id = product_id
+
+    async def __aenter__(self):
+        import redis.asyncio as aioredis
+        self.client = aioredis.Redis.from_url(get_redis_url())
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(get_channel(self.product_id))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+    async def get(self, timeout):
+        """Следующее событие (JSON) или None, если за timeout секунд его не было"""
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        data = message['data']
+        return data.decode() if isinstance(data, bytes) else data
+
+
+def subscribe(product_id):
+    """Подписка на события продукта: async with subscribe(id) as subscription"""
+    if get_redis_url():
+        return RedisSubscription(product_id)
+    return LocalSubscription(product_id)
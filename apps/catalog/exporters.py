@@ -0,0 +1,98 @@
+"""
+Потоковая выгрузка продуктов подразделения в CSV/XLSX.
+
+Строки читаются через queryset.iterator(chunk_size=...), поэтому память
+не зависит от количества продуктов. CSV отдается клиенту по мере чтения
+строк, XLSX - только после записи всей книги (см. write_xlsx). Столбцы совпадают с форматом импорта
+(apps.catalog.importers), так что выгрузку можно загрузить обратно.
+"""
+import csv
+import json
+import tempfile
+
+from django.utils import timezone
+
+from .importers import COLUMNS
+
+EXPORT_COLUMNS = COLUMNS + ['created_by', 'created_at', 'updated_at']
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def product_row(product):
+    """Значения столбцов выгрузки для продукта"""
+    return [
+        product.code,
+        product.name,
+        product.description,
+        json.dumps(product.characteristics, ensure_ascii=False) if product.characteristics else '',
+        product.subdivision.code,
+        product.status,
+        product.condition,
+        product.quantity,
+        product.unit,
+        product.location,
+        product.storage_date.isoformat() if product.storage_date else '',
+        product.notes,
+        product.created_by.username if product.created_by else '',
+        timezone.localtime(product.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+        timezone.localtime(product.updated_at).strftime('%Y-%m-%d %H:%M:%S'),
+    ]
+
+
+def iter_products(queryset):
+    return queryset.select_related('subdivision', 'created_by').iterator(chunk_size=CHUNK_SIZE)
+
+
+def iter_csv(queryset):
+    """Строки CSV (с BOM и разделителем ';' для Excel) по одной"""
+    writer = csv.writer(Echo(), delimiter=';')
+    yield '\ufeff' + writer.writerow(EXPORT_COLUMNS)
+    for product in iter_products(queryset):
+        yield writer.writerow(product_row(product))
+
+
+def write_xlsx(queryset):
+    """
+    Выгрузка в XLSX во временный файл.
+
+    openpyxl в режиме write_only пишет строки на диск по мере добавления,
+    поэтому в памяти не держится весь лист. Возвращает открытый файл.
+
+    Ограничение: XLSX - zip-архив, и openpyxl собирает его целиком при
+    workbook.save(), поэтому ответ начинается только после записи всей
+    книги, а временный файл занимает место на диске до конца выгрузки.
+    Время до первого байта растет с числом продуктов; для больших
+    подразделений используйте CSV, который отдается потоком.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Неликвиды')
+    sheet.append(EXPORT_COLUMNS)
+    for product in iter_products(queryset):
+        sheet.append(product_row(product))
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def iter_file(file, chunk_size=64 * 1024):
+    """Чтение файла кусками с закрытием в конце"""
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
@@ -0,0 +1,339 @@
+"""
+Конвейер обработки изображений продуктов.
+
+Файл открывается и декодируется один раз (для JPEG - с уменьшением
+при загрузке через Image.draft()), из одного декодированного изображения
+получаются оптимизированный оригинал, миниатюра и адаптивные варианты
+(renditions), а модель сохраняется одним save(update_fields=...).
+
+Варианты задаются настройкой IMAGE_RENDITIONS: для каждого имени - список
+ширин и атрибут sizes; форматы - IMAGE_RENDITION_FORMATS (webp, avif, jpeg).
+
+Изображения, загруженные с дедупликацией, обрабатываются на уровне общего
+файла (ImageBlob) один раз для всех ссылающихся ProductImage
+(process_stored_image).
+
+Файлы читаются и записываются только через хранилище (apps.catalog.storage_io),
+поэтому конвейер работает и с S3-совместимыми хранилищами.
+"""
+import logging
+import os
+import re
+import time
+
+from django.conf import settings
+from PIL import Image, features
+
+from .cache import bump_versions, product_scope, subdivision_scope
+from .storage_io import delete_file, encode_image, open_stream, save_file
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZED_SIZE = getattr(settings, 'IMAGE_OPTIMIZED_SIZE', (1920, 1080))
+THUMBNAIL_SIZE = getattr(settings, 'IMAGE_THUMBNAIL_SIZE', (500, 500))
+QUALITY = getattr(settings, 'IMAGE_QUALITY', 85)
+
+# Суффикс, который хранилище Django добавляет к занятому имени (get_alternative_name)
+STORAGE_SUFFIX_RE = re.compile(r'_[a-zA-Z0-9]{7}$')
+
+DEFAULT_RENDITIONS = {
+    'admin': {'widths': [100, 200], 'sizes': '100px'},
+    'card': {'widths': [320, 480, 640], 'sizes': '(max-width: 768px) 100vw, 33vw'},
+    'detail': {'widths': [640, 960, 1280], 'sizes': '(max-width: 992px) 100vw, 50vw'},
+}
+
+# Формат -> (формат Pillow, MIME-тип, расширение, параметры сохранения)
+RENDITION_FORMATS = {
+    'avif': ('AVIF', 'image/avif', 'avif', {'quality': 60}),
+    'webp': ('WEBP', 'image/webp', 'webp', {'quality': QUALITY, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', {'quality': QUALITY, 'optimize': True, 'progressive': True}),
+}
+
+
+def get_rendition_specs():
+    """Варианты изображений из настройки IMAGE_RENDITIONS"""
+    return getattr(settings, 'IMAGE_RENDITIONS', DEFAULT_RENDITIONS)
+
+
+def get_rendition_formats():
+    """Форматы вариантов, поддерживаемые установленным Pillow (JPEG - всегда последним)"""
+    formats = getattr(settings, 'IMAGE_RENDITION_FORMATS', ['webp', 'jpeg'])
+    supported = [
+        fmt for fmt in formats
+        if fmt in RENDITION_FORMATS and (fmt == 'jpeg' or features.check(fmt))
+    ]
+    if 'jpeg' not in supported:
+        supported.append('jpeg')
+    return supported
+
+
+def get_rendition_widths():
+    """Все ширины всех вариантов по убыванию"""
+    widths = set()
+    for spec in get_rendition_specs().values():
+        widths.update(spec['widths'])
+    return sorted(widths, reverse=True)
+
+
+class StageTimer:
+    """Замер времени этапов конвейера"""
+
+    def __init__(self):
+        self.timings = {}
+        self._started = time.perf_counter()
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self.timings[name] = round((now - self._started) * 1000, 1)
+        self._started = now
+
+    @property
+    def total(self):
+        return round(sum(self.timings.values()), 1)
+
+
+def decode_image(file, target_size):
+    """
+    Открыть и декодировать изображение.
+
+    Для JPEG draft() декодирует сразу в уменьшенном масштабе (1/2, 1/4, 1/8),
+    не меньшем target_size, что в разы быстрее полного декодирования.
+    """
+    img = Image.open(file)
+    img.draft('RGB', target_size)
+    img.load()
+
+    # Конвертируем в RGB если нужно
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    return img
+
+
+def encode_jpeg(img, optimize=False):
+    return encode_image(img, 'JPEG', quality=QUALITY, optimize=optimize)
+
+
+def source_stem(name):
+    """
+    Имя файла без расширения и без суффикса, добавленного хранилищем.
+
+    Новый файл сохраняется до удаления прежнего (replace_file), и хранилище
+    добавляет к занятому имени случайный суффикс; без его отбрасывания имя
+    удлинялось бы при каждой повторной обработке.
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return STORAGE_SUFFIX_RE.sub('', stem)
+
+
+def jpeg_name(name, prefix=''):
+    """Имя файла с расширением .jpg (результат всегда сохраняется в JPEG)"""
+    return f'{prefix}{source_stem(name)}.jpg'
+
+
+def replace_file(field_file, name, content):
+    """
+    Сохранить файл поля, удалив предыдущую версию (без сохранения модели).
+
+    Новый файл записывается до удаления старого: при ошибке записи поле
+    продолжает ссылаться на существующий файл.
+    """
+    old_name = field_file.name
+    try:
+        field_file.save(name, content, save=False)
+    finally:
+        content.close()
+    if old_name and old_name != field_file.name:
+        delete_file(field_file.storage, old_name)
+
+
+def build_renditions(img, source_name):
+    """
+    Все варианты изображения за один проход.
+
+    Ширины обрабатываются по убыванию, и каждое следующее уменьшение
+    делается из предыдущего, а не из исходного изображения.
+    Ширины не меньше большей стороны исходного изображения не увеличивают его:
+    для них кодируется один общий вариант в исходном размере.
+    Возвращает ({ширина: {формат: (имя, содержимое, (w, h))}}, список форматов).
+    """
+    formats = get_rendition_formats()
+    stem = source_stem(source_name)
+    largest = max(img.size)
+    outputs = {}
+    original = None
+    current = img
+    for width in get_rendition_widths():
+        if width >= largest:
+            if original is None:
+                original = encode_rendition(img, f'{stem}_{largest}', formats)
+            outputs[width] = original
+            continue
+        if current.width > width or current.height > width:
+            current = current.copy()
+            current.thumbnail((width, width), Image.Resampling.LANCZOS)
+        outputs[width] = encode_rendition(current, f'{stem}_{width}', formats)
+    return outputs, formats
+
+
+def encode_rendition(img, base_name, formats):
+    """Один вариант изображения во всех форматах: {формат: (имя, содержимое, (w, h))}"""
+    encoded = {}
+    for fmt in formats:
+        pil_format, _, extension, options = RENDITION_FORMATS[fmt]
+        encoded[fmt] = (
+            f'{base_name}.{extension}',
+            encode_image(img, pil_format, **options),
+            img.size
+        )
+    return encoded
+
+
+def save_renditions(product_image, outputs, formats):
+    """Запись файлов вариантов и их описание для поля renditions (ProductImage или ImageBlob)"""
+    storage = product_image.image.storage
+    old_names = {
+        item['name']
+        for by_format in (product_image.renditions or {}).values()
+        for items in by_format.values()
+        for item in items
+    }
+
+    saved = {}
+    by_filename = {}
+    for width, by_format in outputs.items():
+        for fmt, (filename, content, size) in by_format.items():
+            # Общий вариант для нескольких ширин записывается один раз
+            if filename not in by_filename:
+                name = save_file(storage, product_image.get_rendition_path(filename), content)
+                by_filename[filename] = {'width': size[0], 'height': size[1], 'name': name}
+            saved[(width, fmt)] = by_filename[filename]
+
+    # Варианты от предыдущей обработки удаляем после записи новых
+    for name in old_names - {item['name'] for item in saved.values()}:
+        delete_file(storage, name)
+
+    renditions = {}
+    for rendition, spec in get_rendition_specs().items():
+        renditions[rendition] = {}
+        for fmt in formats:
+            items = []
+            for width in sorted(spec['widths']):
+                item = saved[(width, fmt)]
+                if not items or items[-1]['name'] != item['name']:
+                    items.append(item)
+            renditions[rendition][fmt] = items
+    return renditions
+
+
+def process_image(product_image, optimize=True, thumbnail=True, renditions=True):
+    """
+    Обработка изображения за одно декодирование.
+
+    Возвращает словарь с длительностью этапов в миллисекундах.
+    """
+    timer = StageTimer()
+    update_fields = []
+
+    # Если оригинал не пересохраняем, достаточно декодировать до размера
+    # самой крупной из миниатюры и вариантов
+    if optimize:
+        target_size = OPTIMIZED_SIZE
+    else:
+        largest = max([THUMBNAIL_SIZE[0], THUMBNAIL_SIZE[1]] + get_rendition_widths())
+        target_size = (largest, largest)
+    with open_stream(product_image.image.storage, product_image.image.name) as file:
+        img = decode_image(file, target_size)
+    timer.stage('decode')
+
+    if optimize:
+        # Масштабируем если изображение слишком большое
+        if img.width > OPTIMIZED_SIZE[0] or img.height > OPTIMIZED_SIZE[1]:
+            img.thumbnail(OPTIMIZED_SIZE, Image.Resampling.LANCZOS)
+        optimized = encode_jpeg(img, optimize=True)
+        timer.stage('optimize')
+
+    if thumbnail:
+        # Миниатюру строим из уже уменьшенного изображения
+        thumb = img.copy()
+        thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        thumb_content = encode_jpeg(thumb)
+        timer.stage('thumbnail')
+
+    if renditions:
+        rendition_outputs, rendition_formats = build_renditions(img, product_image.image.name)
+        timer.stage('renditions')
+
+    if optimize:
+        replace_file(product_image.image, jpeg_name(product_image.image.name), optimized)
+        update_fields.append('image')
+    if thumbnail:
+        replace_file(
+            product_image.thumbnail,
+            jpeg_name(product_image.image.name, prefix='thumb_'),
+            thumb_content
+        )
+        update_fields.append('thumbnail')
+    if renditions:
+        product_image.renditions = save_renditions(
+            product_image, rendition_outputs, rendition_formats
+        )
+        update_fields.append('renditions')
+    timer.stage('write')
+
+    if update_fields:
+        product_image.save(update_fields=update_fields)
+    timer.stage('save')
+
+    logger.info(
+        f"Изображение {product_image.id} обработано за {timer.total} мс: {timer.timings}"
+    )
+    return timer.timings
+
+
+def process_stored_image(product_image, force=False, **options):
+    """
+    Обработка изображения продукта с учетом общего файла.
+
+    Если изображение ссылается на ImageBlob, обрабатывается общий файл,
+    а результат одним запросом переносится во все ссылающиеся изображения.
+    Уже обработанный общий файл повторно обрабатывается только при force
+    (например, при перегенерации миниатюр).
+
+    Общий файл обрабатывает одна задача, захватившая его
+    (ImageBlob.claim_processing): параллельные задачи других изображений
+    с тем же файлом не перезаписывают и не удаляют файлы друг друга.
+    Если файл обрабатывается другой задачей, ничего не делается - она
+    перенесет результат во все изображения; иначе (файл уже обработан)
+    результат переносится сразу.
+
+    После создания миниатюры изображения отмечаются обработанными
+    (processing_status); ошибки отмечает вызывающая задача.
+    """
+    blob = product_image.blob
+    if blob is None:
+        timings = process_image(product_image, **options)
+        if options.get('thumbnail', True):
+            product_image.mark_processed()
+        return timings
+
+    timings = {}
+    if blob.claim_processing(force=force):
+        try:
+            timings = process_image(blob, **options)
+        except Exception:
+            blob.finish_processing()
+            raise
+        blob.finish_processing(processed=options.get('thumbnail', True))
+    else:
+        blob.refresh_from_db()
+        if blob.processing_started_at is not None:
+            # Файл обрабатывает другая задача
+            return timings
+    blob.sync_product_images()
+
+    # update() не отправляет сигналы - сбрасываем кэш страниц сами
+    scopes = set()
+    for product_id, subdivision_id in blob.product_images.values_list('product_id', 'product__subdivision_id'):
+        scopes.update([product_scope(product_id), subdivision_scope(subdivision_id)])
+    bump_versions(*scopes)
+    return timings
@@ -0,0 +1,361 @@
+"""
+Потоковый импорт продуктов из CSV/XLSX (выгрузки ERP).
+
+Файл читается построчно, строки проверяются и записываются пачками через
+bulk_create. Уникальность кода проверяется по множеству кодов подразделения,
+которое загружается одним запросом при первой встрече подразделения.
+Если пачка все же нарушает ограничение базы (например, продукт с тем же
+кодом создан параллельно), ее строки записываются по одной, и ошибка
+указывается для конкретной строки.
+
+Читатели возвращают пары (номер строки в файле, строка); пустые строки
+пропускаются, но учитываются в нумерации.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from collections import Counter
+
+from .models import Product, ProductCounter, Subdivision
+from .search import get_search_engine
+from .cache import bump_versions_on_commit, product_scope, subdivision_scope
+from . import changelog, code_index
+
+COLUMNS = [
+    'code', 'name', 'description', 'characteristics', 'subdivision',
+    'status', 'condition', 'quantity', 'unit', 'location', 'storage_date', 'notes'
+]
+
+# Поля, обновляемые при повторном импорте существующего кода
+UPDATE_FIELDS = [
+    'name', 'description', 'characteristics', 'status', 'condition',
+    'quantity', 'unit', 'location', 'storage_date', 'notes', 'updated_at'
+]
+
+# Заголовки столбцов на русском (как в выгрузках ERP)
+COLUMN_ALIASES = {
+    'код': 'code',
+    'код продукции': 'code',
+    'наименование': 'name',
+    'описание': 'description',
+    'характеристики': 'characteristics',
+    'подразделение': 'subdivision',
+    'код подразделения': 'subdivision',
+    'статус': 'status',
+    'состояние': 'condition',
+    'количество': 'quantity',
+    'единица измерения': 'unit',
+    'ед. изм.': 'unit',
+    'место хранения': 'location',
+    'дата постановки на хранение': 'storage_date',
+    'примечания': 'notes',
+}
+
+
+class ProductImportError(Exception):
+    pass
+
+
+def normalize_header(header):
+    key = str(header or '').strip().lower()
+    return COLUMN_ALIASES.get(key, key)
+
+
+def read_csv(file):
+    """Построчное чтение CSV (разделитель определяется автоматически)"""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    sample = text.read(64 * 1024)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text, dialect)
+    header = [normalize_header(column) for column in next(reader, [])]
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            # line_num - номер последней прочитанной строки файла
+            yield reader.line_num, dict(zip(header, row))
+
+
+def read_xlsx(file):
+    """Построчное чтение XLSX в режиме read_only (без загрузки листа в память)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ProductImportError('Для импорта XLSX необходим пакет openpyxl')
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [normalize_header(column) for column in next(rows, [])]
+        for row_number, row in enumerate(rows, start=2):
+            if any(cell not in (None, '') for cell in row):
+                yield row_number, dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """Пары (номер строки, строка в виде словаря) по расширению имени файла"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return read_csv(file)
+    if extension in ('.xlsx', '.xlsm'):
+        return read_xlsx(file)
+    raise ProductImportError(f'Неподдерживаемый формат файла: {extension} (ожидается .csv или .xlsx)')
+
+
+def clean_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+class ImportReport:
+    """Итоги импорта и ошибки по строкам"""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []  # (номер строки, код, сообщение)
+
+    def add_error(self, row_number, code, message):
+        self.errors.append((row_number, code, message))
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    def write_csv(self, stream):
+        writer = csv.writer(stream)
+        writer.writerow(['row', 'code', 'error'])
+        writer.writerows(self.errors)
+
+
+class ProductImporter:
+    """
+    Импорт продуктов пачками.
+
+    subdivision - подразделение по умолчанию (если в файле нет столбца subdivision);
+    update_existing - обновлять существующие коды вместо ошибки.
+    """
+
+    def __init__(self, subdivision=None, user=None, batch_size=1000,
+                 update_existing=False, dry_run=False):
+        self.subdivision = subdivision
+        self.user = user
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+        self.dry_run = dry_run
+        self.report = ImportReport()
+        self._subdivisions = {}
+        self._codes = {}
+        self._seen = set()
+        self._recount = set()
+
+    def get_subdivision(self, code):
+        """Подразделение по коду (кэшируется на время импорта)"""
+        if not code:
+            return self.subdivision
+        if code not in self._subdivisions:
+            self._subdivisions[code] = Subdivision.objects.filter(code=code).first()
+        return self._subdivisions[code]
+
+    def get_codes(self, subdivision):
+        """Множество существующих кодов подразделения (один запрос на подразделение)"""
+        if subdivision.pk not in self._codes:
+            self._codes[subdivision.pk] = set(
+                Product.objects.filter(subdivision=subdivision).values_list('code', flat=True)
+            )
+        return self._codes[subdivision.pk]
+
+    def build_product(self, row):
+        """Продукт из строки файла; ValidationError при ошибках"""
+        data = {column: clean_value(row.get(column)) for column in COLUMNS}
+
+        subdivision = self.get_subdivision(str(data.pop('subdivision')))
+        if subdivision is None:
+            raise ValidationError('Подразделение не найдено')
+
+        if isinstance(data['characteristics'], str):
+            try:
+                data['characteristics'] = json.loads(data['characteristics']) if data['characteristics'] else {}
+            except ValueError:
+                raise ValidationError('Характеристики должны быть в формате JSON')
+
+        if data['storage_date'] in ('', None):
+            data['storage_date'] = None
+        elif isinstance(data['storage_date'], datetime):
+            data['storage_date'] = data['storage_date'].date()
+        elif not isinstance(data['storage_date'], date):
+            raw_date = str(data['storage_date'])
+            for date_format in ('%Y-%m-%d', '%d.%m.%Y'):
+                try:
+                    data['storage_date'] = datetime.strptime(raw_date, date_format).date()
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValidationError(f'Неверная дата: {raw_date}')
+
+        # Пустые значения заменяем значениями по умолчанию модели
+        for field in ('status', 'condition', 'quantity', 'unit'):
+            if data[field] in ('', None):
+                data[field] = Product._meta.get_field(field).get_default()
+        data['code'] = str(data['code'])
+
+        product = Product(subdivision=subdivision, created_by=self.user, **data)
+        # Проверка полей в памяти; уникальность проверяется по множеству кодов
+        product.full_clean(
+            exclude=['subdivision', 'created_by'],
+            validate_unique=False,
+            validate_constraints=False
+        )
+        return product
+
+    def run(self, rows):
+        # Журнал изменений пишется пачками, а не по записи на продукт
+        with changelog.collect(user=self.user):
+            return self.import_rows(rows)
+
+    def import_rows(self, rows):
+        batch = []
+        for row_number, row in rows:
+            try:
+                product = self.build_product(row)
+            except ValidationError as e:
+                self.report.add_error(row_number, row.get('code'), '; '.join(e.messages))
+                continue
+
+            key = (product.subdivision.pk, product.code)
+            if key in self._seen:
+                self.report.add_error(row_number, product.code, 'Код повторяется в файле')
+                continue
+            self._seen.add(key)
+
+            codes = self.get_codes(product.subdivision)
+            if product.code in codes and not self.update_existing:
+                self.report.add_error(
+                    row_number, product.code,
+                    f'Продукт с кодом "{product.code}" уже существует в подразделении '
+                    f'"{product.subdivision.code}"'
+                )
+                continue
+
+            product._import_existing = product.code in codes
+            product._import_row = row_number
+            codes.add(product.code)
+            batch.append(product)
+
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch)
+                batch = []
+
+        if batch:
+            self.write_batch(batch)
+
+        # При обновлении статус/состояние существующих продуктов могли измениться,
+        # поэтому счетчики затронутых подразделений пересчитываем целиком
+        if self._recount and not self.dry_run:
+            ProductCounter.recount(self._recount)
+        return self.report
+
+    def write_batch(self, batch):
+        if not self.dry_run:
+            old_values = self.get_old_values(batch) if any(p._import_existing for p in batch) else {}
+            try:
+                self.bulk_write(batch)
+            except IntegrityError:
+                # Пачка откатилась целиком - записываем по строке, чтобы найти ошибочные
+                batch = self.write_rows(batch)
+            self.after_write(batch, old_values)
+        updated = sum(1 for product in batch if product._import_existing)
+        self.report.created += len(batch) - updated
+        self.report.updated += updated
+
+    def bulk_write(self, products):
+        with transaction.atomic():
+            if self.update_existing:
+                Product.objects.bulk_create(
+                    products,
+                    update_conflicts=True,
+                    unique_fields=['code', 'subdivision'],
+                    update_fields=UPDATE_FIELDS
+                )
+            else:
+                Product.objects.bulk_create(products)
+
+    def write_rows(self, batch):
+        """Запись пачки по одной строке; возвращает записанные продукты"""
+        written = []
+        for product in batch:
+            try:
+                self.bulk_write([product])
+            except IntegrityError as e:
+                product.pk = None
+                self.report.add_error(product._import_row, product.code, f'Ошибка записи: {e}')
+                continue
+            written.append(product)
+        return written
+
+    def get_old_values(self, batch):
+        """Значения обновляемых продуктов до записи: {(подразделение, код): снимок с id}"""
+        existing = [product for product in batch if product._import_existing]
+        queryset = Product.objects.filter(
+            subdivision_id__in={product.subdivision.pk for product in existing},
+            code__in={product.code for product in existing}
+        ).values('id', *changelog.TRACKED_FIELDS)
+        return {(values['subdivision_id'], values['code']): values for values in queryset}
+
+    def after_write(self, batch, old_values):
+        """bulk_create не отправляет сигналы - обновляем поисковый индекс, счетчики и журнал сами"""
+        for product in batch:
+            old = old_values.get((product.subdivision.pk, product.code))
+            if old and not product.pk:
+                # Не все базы возвращают id строк, обновленных при конфликте
+                product.pk = old['id']
+        changelog.record_bulk(
+            {old['id']: old for old in old_values.values()},
+            batch
+        )
+
+        engine = get_search_engine()
+        for product in batch:
+            if product.pk:
+                engine.index_product(product)
+
+        created = Counter()
+        for product in batch:
+            if product._import_existing:
+                self._recount.add(product.subdivision.pk)
+            else:
+                created[product.get_counter_key()] += 1
+        for key, count in created.items():
+            ProductCounter.adjust(*key, count)
+
+        # Новые коды - только у созданных продуктов (обновление идет по коду)
+        code_index.invalidate_on_commit(*{
+            product.subdivision.pk for product in batch if not product._import_existing
+        })
+
+        # Сброс кэша затронутых подразделений и обновленных продуктов
+        bump_versions_on_commit(
+            'products',
+            *{subdivision_scope(product.subdivision.pk) for product in batch},
+            *[product_scope(product.pk) for product in batch if product._import_existing and product.pk]
+        )
+
+
+def import_products(file, filename, **options):
+    """Импорт продуктов из файла; возвращает ImportReport"""
+    importer = ProductImporter(**options)
+    return importer.run(read_rows(file, filename))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.catalog.changelog_archive import archive_changelog, get_archive_dir
+
+class Command(BaseCommand):
+    help = 'Переносит старые записи истории изменений в сжатые архивные файлы (JSONL.gz) и удаляет их из базы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Архивировать записи старше указанного количества дней (по умолчанию 365)'
+        )
+        parser.add_argument(
+            '--dir',
+            help='Каталог архива (по умолчанию CHANGELOG_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пачки чтения и удаления (по умолчанию 5000)'
+        )
+        parser.add_argument(
+            '--segment-size',
+            type=int,
+            default=100000,
+            help='Количество записей в одном архивном файле (по умолчанию 100000)'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('Количество дней не может быть отрицательным')
+        if options['batch_size'] <= 0 or options['segment_size'] <= 0:
+            raise CommandError('Размеры пачки и сегмента должны быть положительными')
+        
+        directory = options['dir'] or get_archive_dir()
+        segments = archive_changelog(
+            options['days'],
+            batch_size=options['batch_size'],
+            segment_size=options['segment_size'],
+            directory=directory
+        )
+        
+        for segment in segments:
+            self.stdout.write(
+                f"{segment['segment']}: {segment['count']} записей "
+                f"({segment['first_timestamp']} - {segment['last_timestamp']})"
+            )
+        
+        total = sum(segment['count'] for segment in segments)
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово! Архивировано записей: {total}, файлов: {len(segments)} в {directory}")
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from apps.catalog.uploads import cleanup_sessions
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные сессии порционной загрузки изображений и их временные файлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Удалять сессии без активности дольше указанного количества часов (по умолчанию 24)'
+        )
+
+    def handle(self, *args, **options):
+        count = cleanup_sessions(options['hours'])
+        
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово! Удалено сессий: {count}")
+        )
@@ -0,0 +1,94 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.catalog.importers import ProductImportError, import_products
+from apps.catalog.models import Subdivision
+
+class Command(BaseCommand):
+    help = 'Импортирует продукты из CSV/XLSX (выгрузки ERP) пачками через bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            help='Путь к файлу .csv или .xlsx'
+        )
+        parser.add_argument(
+            '--subdivision',
+            help='Код подразделения по умолчанию (если в файле нет столбца subdivision)'
+        )
+        parser.add_argument(
+            '--user',
+            help='Имя пользователя, от имени которого создаются продукты'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной пачке записи (по умолчанию 1000)'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Обновлять продукты с существующими кодами вместо ошибки'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только проверить файл, ничего не записывая'
+        )
+        parser.add_argument(
+            '--report',
+            help='Путь к CSV-файлу для отчета об ошибках (по умолчанию - вывод в консоль)'
+        )
+
+    def handle(self, *args, **options):
+        subdivision = None
+        if options['subdivision']:
+            try:
+                subdivision = Subdivision.objects.get(code=options['subdivision'])
+            except Subdivision.DoesNotExist:
+                raise CommandError(f"Подразделение {options['subdivision']} не найдено")
+        
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь {options['user']} не найден")
+        
+        started = time.monotonic()
+        try:
+            with open(options['file'], 'rb') as file:
+                report = import_products(
+                    file,
+                    options['file'],
+                    subdivision=subdivision,
+                    user=user,
+                    batch_size=options['batch_size'],
+                    update_existing=options['update'],
+                    dry_run=options['dry_run']
+                )
+        except (OSError, ProductImportError) as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+        
+        if report.errors:
+            if options['report']:
+                with open(options['report'], 'w', newline='', encoding='utf-8') as stream:
+                    report.write_csv(stream)
+                self.stdout.write(
+                    self.style.WARNING(f"Отчет об ошибках сохранен в {options['report']}")
+                )
+            else:
+                for row_number, code, message in report.errors:
+                    self.stdout.write(
+                        self.style.ERROR(f"Строка {row_number} ({code}): {message}")
+                    )
+        
+        prefix = "Проверка завершена" if options['dry_run'] else "Готово"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}! Создано: {report.created}, обновлено: {report.updated}, "
+                f"ошибок: {report.failed} за {elapsed:.1f} с"
+            )
+        )
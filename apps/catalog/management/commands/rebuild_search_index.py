@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.catalog.search import get_search_engine
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый поисковый индекс продуктов'
+
+    def handle(self, *args, **options):
+        engine = get_search_engine()
+        self.stdout.write(f"Поисковый движок: {engine.__class__.__name__}")
+        
+        started = time.monotonic()
+        total = engine.rebuild()
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово! Проиндексировано продуктов: {total} за {elapsed:.1f} с"
+            )
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.catalog.models import ProductCounter, Subdivision
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики неликвидов по подразделениям, статусам и состояниям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdivision',
+            nargs='+',
+            help='Коды подразделений для пересчета (по умолчанию - все)'
+        )
+
+    def handle(self, *args, **options):
+        subdivision_ids = None
+        if options['subdivision']:
+            subdivision_ids = list(
+                Subdivision.objects.filter(code__in=options['subdivision']).values_list('id', flat=True)
+            )
+            if not subdivision_ids:
+                raise CommandError('Подразделения не найдены')
+        
+        total = ProductCounter.recount(subdivision_ids)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово! Записей счетчиков: {total}")
+        )
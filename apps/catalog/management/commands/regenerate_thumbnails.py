@@ -1,11 +1,21 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
 from apps.catalog.models import ProductImage
+from apps.catalog.process_pool import init_worker, process_chunk
 from apps.catalog.tasks import create_thumbnail
 import logging
 
 logger = logging.getLogger(__name__)
 
+
 class Command(BaseCommand):
     help = 'Пересоздает миниатюры для всех изображений'
 
@@ -26,49 +36,183 @@ class Command(BaseCommand):
             action='store_true',
             help='Пересоздать даже если миниатюра уже существует'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Обработать локально в N процессах (без брокера Celery)'
+        )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Отправлять в Celery группами задач по --chunk-size изображений'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Размер пачки изображений (по умолчанию 100)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: при повторном запуске обработка продолжится с места остановки'
+        )
 
     def handle(self, *args, **options):
-        image_ids = options.get('image_ids')
-        product_id = options.get('product_id')
-        force = options.get('force', False)
-        
-        if image_ids:
-            queryset = ProductImage.objects.filter(id__in=image_ids)
-        elif product_id:
-            queryset = ProductImage.objects.filter(product_id=product_id)
-        else:
-            queryset = ProductImage.objects.all()
-        
+        if options['workers'] < 0 or options['chunk_size'] <= 0:
+            raise CommandError('Количество процессов и размер пачки должны быть положительными')
+        if options['workers'] and options['batch']:
+            raise CommandError('Укажите либо --workers, либо --batch')
+
+        self.checkpoint_path = options['checkpoint']
+        self.state = self.load_checkpoint()
+        if self.state['last_id']:
+            self.stdout.write(
+                f"Продолжение с изображения {self.state['last_id']} "
+                f"(уже обработано: {self.state['processed']})"
+            )
+
+        queryset = self.get_queryset(options)
         total = queryset.count()
-        processed = 0
-        failed = 0
-        
         self.stdout.write(f"Найдено {total} изображений для обработки")
-        
-        for product_image in queryset:
-            try:
-                # Пропускаем, если миниатюра уже есть и не форсируем
-                if product_image.thumbnail and not force:
-                    self.stdout.write(
-                        self.style.WARNING(f"Миниатюра уже существует для {product_image.id}")
-                    )
-                    continue
-                
-                # Запускаем задачу
-                create_thumbnail.delay(product_image.id)
-                processed += 1
-                self.stdout.write(
-                    self.style.SUCCESS(f"Задача создана для изображения {product_image.id}")
-                )
-                
-            except Exception as e:
-                failed += 1
-                self.stdout.write(
-                    self.style.ERROR(f"Ошибка для изображения {product_image.id}: {str(e)}")
-                )
-        
+
+        self.verbosity = options['verbosity']
+        self.processed = 0
+        self.failed = 0
+        self.started = started = time.perf_counter()
+
+        chunks = self.iter_chunks(queryset, options['chunk_size'])
+        if options['workers']:
+            self.run_local(chunks, options['workers'])
+        elif options['batch']:
+            self.run_batch(chunks)
+        else:
+            self.run_tasks(chunks)
+
+        elapsed = time.perf_counter() - started
+        rate = self.processed / elapsed if elapsed > 0 else 0
+        action = 'Обработано' if options['workers'] else 'Отправлено в очередь'
         self.stdout.write(
             self.style.SUCCESS(
-                f"Готово! Обработано: {processed}, ошибок: {failed}, всего: {total}"
+                f"Готово! {action}: {self.processed}, ошибок: {self.failed}, всего: {total} "
+                f"за {elapsed:.1f} с ({rate:.1f} изобр./с)"
+            )
+        )
+
+    def get_queryset(self, options):
+        if options.get('image_ids'):
+            queryset = ProductImage.objects.filter(id__in=options['image_ids'])
+        elif options.get('product_id'):
+            queryset = ProductImage.objects.filter(product_id=options['product_id'])
+        else:
+            queryset = ProductImage.objects.all()
+
+        # Пропускаем изображения с миниатюрой, если не форсируем
+        if not options['force']:
+            queryset = queryset.filter(Q(thumbnail__isnull=True) | Q(thumbnail=''))
+        return queryset.filter(id__gt=self.state['last_id']).order_by('id')
+
+    def iter_chunks(self, queryset, chunk_size):
+        """
+        Пачки id изображений по возрастанию.
+
+        Изображения с общим файлом (ImageBlob) обрабатываются один раз:
+        результат переносится во все ссылающиеся изображения.
+        """
+        seen_blobs = set()
+        chunk = []
+        for image_id, blob_id in queryset.values_list('id', 'blob_id').iterator(chunk_size=chunk_size * 10):
+            if blob_id is not None:
+                if blob_id in seen_blobs:
+                    continue
+                seen_blobs.add(blob_id)
+            chunk.append(image_id)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def run_tasks(self, chunks):
+        """Одна задача create_thumbnail на изображение"""
+        for chunk in chunks:
+            for image_id in chunk:
+                try:
+                    create_thumbnail.delay(image_id)
+                    self.processed += 1
+                except Exception as e:
+                    self.failed += 1
+                    self.stdout.write(self.style.ERROR(f"Ошибка для изображения {image_id}: {str(e)}"))
+            self.chunk_done(chunk)
+
+    def run_batch(self, chunks):
+        """Группа задач Celery на пачку изображений"""
+        from celery import group
+
+        for chunk in chunks:
+            try:
+                group(create_thumbnail.s(image_id) for image_id in chunk).apply_async()
+                self.processed += len(chunk)
+            except Exception as e:
+                # Без брокера продолжать бессмысленно - остановка с контрольной точкой
+                raise CommandError(f"Ошибка отправки группы задач: {e}")
+            self.chunk_done(chunk)
+
+    def run_local(self, chunks, workers):
+        """
+        Обработка в пуле процессов.
+
+        В обработке одновременно не более workers * 2 пачек; контрольная
+        точка сдвигается только по завершенным по порядку пачкам.
+        """
+        # Id читаются до запуска пула: открытый курсор iterator() не должен
+        # использоваться параллельно с процессами пула
+        chunks = list(chunks)
+        connections.close_all()
+        pending = deque()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            # spawn вместо fork: процессы не наследуют сокеты соединений с базой
+            mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(process_chunk, chunk)))
+                if len(pending) >= workers * 2:
+                    self.collect(*pending.popleft())
+            while pending:
+                self.collect(*pending.popleft())
+
+    def collect(self, chunk, future):
+        processed, errors = future.result()
+        self.processed += processed
+        self.failed += len(errors)
+        for image_id, error in errors:
+            self.stdout.write(self.style.ERROR(f"Ошибка для изображения {image_id}: {error}"))
+        self.chunk_done(chunk)
+
+    def chunk_done(self, chunk):
+        """Прогресс и контрольная точка после пачки"""
+        self.state['last_id'] = chunk[-1]
+        self.state['processed'] += len(chunk)
+        self.save_checkpoint()
+        if self.verbosity:
+            elapsed = time.perf_counter() - self.started
+            self.stdout.write(
+                f"Пачка до изображения {chunk[-1]}: {len(chunk)} изображений, "
+                f"всего {self.processed} ({self.processed / elapsed:.1f} изобр./с)"
             )
-        )
\ No newline at end of file
+
+    def load_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as checkpoint:
+                return json.load(checkpoint)
+        return {'last_id': 0, 'processed': 0}
+
+    def save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as checkpoint:
+            json.dump(self.state, checkpoint)
+        os.replace(tmp_path, self.checkpoint_path)
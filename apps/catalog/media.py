@@ -0,0 +1,135 @@
+"""
+Выдача медиафайлов с проверкой прав.
+
+Представление protected_media определяет подразделения, которым
+принадлежит файл, проверяет право просмотра (PermissionContext) и
+передает отдачу файла веб-серверу - процесс Django байты изображения
+не читает и не занят на время загрузки:
+
+    MEDIA_SENDFILE_BACKEND = 'nginx'   - заголовок X-Accel-Redirect
+    MEDIA_SENDFILE_BACKEND = 'apache'  - заголовок X-Sendfile (mod_xsendfile)
+    MEDIA_SENDFILE_BACKEND = None      - файл отдает Django (только при DEBUG;
+                                         без DEBUG - ImproperlyConfigured)
+
+Настройка nginx (путь - MEDIA_ACCEL_REDIRECT_PREFIX, alias - MEDIA_ROOT):
+
+    location /protected-media/ {
+        internal;
+        alias /srv/catalog/media/;
+    }
+
+Если файлы в удаленном хранилище (S3), вместо X-Accel-Redirect
+выполняется перенаправление на storage.url() (для S3 - подписанная ссылка).
+
+Маршрут MEDIA_URL заменяет static() для медиафайлов, который раньше
+подключался в config/urls.py при DEBUG: при разработке файлы тоже
+выдаются только после проверки прав.
+"""
+import mimetypes
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .models import Subdivision
+from .permissions import get_permission_context
+
+# Каталоги, в которых за префиксом следует код подразделения
+SUBDIVISION_PREFIXES = ('product_images/', 'product_thumbnails/', 'product_renditions/')
+
+# Общие файлы изображений: в имени - SHA-256 содержимого (ImageBlob)
+BLOB_PREFIX = 'image_blobs/'
+SHA256_RE = re.compile(r'[0-9a-f]{64}')
+
+
+def clean_media_name(name):
+    """Имя файла из URL или None, если оно выходит за пределы медиакаталога"""
+    normalized = posixpath.normpath(name)
+    if normalized != name or normalized.startswith(('/', '../')) or normalized == '..':
+        return None
+    return normalized
+
+
+def get_file_subdivisions(name):
+    """Подразделения, продуктам которых принадлежит файл"""
+    if name.startswith(SUBDIVISION_PREFIXES):
+        parts = name.split('/')
+        if len(parts) > 2:
+            return Subdivision.objects.filter(code=parts[1])
+    elif name.startswith(BLOB_PREFIX):
+        match = SHA256_RE.search(posixpath.basename(name))
+        if match:
+            return Subdivision.objects.filter(
+                products__images__blob__sha256=match.group()
+            ).distinct()
+    return Subdivision.objects.none()
+
+
+def can_view_file(user, name):
+    """Может ли пользователь просматривать хотя бы один продукт с этим файлом"""
+    permissions = get_permission_context(user)
+    return any(
+        permissions.can_view_subdivision(subdivision)
+        for subdivision in get_file_subdivisions(name)
+    )
+
+
+def is_local_storage(storage, name):
+    try:
+        storage.path(name)
+    except NotImplementedError:
+        return False
+    return True
+
+
+def get_content_type(name):
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def build_response(name):
+    """Ответ, отдачу файла в котором выполняет веб-сервер"""
+    if not is_local_storage(default_storage, name):
+        return HttpResponseRedirect(default_storage.url(name))
+
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+    if backend is None:
+        if not settings.DEBUG:
+            # Процесс Django не должен занимать воркер передачей файла
+            raise ImproperlyConfigured(
+                'Для выдачи медиафайлов без DEBUG задайте MEDIA_SENDFILE_BACKEND (nginx или apache)'
+            )
+        # Разработка: файл читает сам Django
+        try:
+            return FileResponse(default_storage.open(name, 'rb'), content_type=get_content_type(name))
+        except FileNotFoundError:
+            raise Http404('Файл не найден')
+
+    response = HttpResponse(content_type=get_content_type(name))
+    if backend == 'nginx':
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(name)
+    elif backend == 'apache':
+        response['X-Sendfile'] = default_storage.path(name)
+    else:
+        raise ValueError(f'Неизвестный MEDIA_SENDFILE_BACKEND: {backend}')
+    return response
+
+
+@require_safe
+def protected_media(request, name):
+    """Медиафайл продукта после проверки права просмотра подразделения"""
+    name = clean_media_name(name)
+    if name is None or not can_view_file(request.user, name):
+        # Чужие и несуществующие файлы неразличимы
+        raise Http404('Файл не найден')
+
+    response = build_response(name)
+    # Ответ зависит от прав пользователя: кэшировать может только браузер
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 86400))
+    return response
@@ -0,0 +1,35 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .changelog import collect, flush, has_pending
+
+
+class ChangeLogMiddleware:
+    """
+    Накопление записей журнала изменений за время запроса.
+
+    Все изменения продуктов в запросе записываются одним bulk_create
+    после формирования ответа, с пользователем запроса в changed_by.
+    Поддерживает sync и async цепочки, чтобы не переводить
+    async-представления в синхронный режим.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect(user=request.user):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with collect(user=request.user, autoflush=False):
+            response = await self.get_response(request)
+        # Переход в поток sync_to_async - только если есть что записывать
+        if has_pending():
+            await sync_to_async(flush)()
+        return response
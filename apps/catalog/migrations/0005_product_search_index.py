@@ -0,0 +1,50 @@
+from django.db import migrations
+
+SQLITE_FTS_TABLE = 'catalog_product_fts'
+
+POSTGRES_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(catalog_product.code, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(catalog_product.name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(catalog_product.description, '')), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(catalog_product.location, '')), 'C')"
+)
+POSTGRES_INDEX_NAME = 'catalog_product_search_gin'
+
+
+def create_search_index(apps, schema_editor):
+    """Создание полнотекстового индекса в зависимости от базы данных"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX_NAME} '
+            f'ON catalog_product USING GIN (({POSTGRES_SEARCH_VECTOR}))'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} '
+            f"USING fts5(code, name, description, location, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, code, name, description, location) '
+            f"SELECT id, code, name, coalesce(description, ''), coalesce(location, '') "
+            f'FROM catalog_product'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_INDEX_NAME}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_profile_alter_usersubdivisionaccess_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Файлы вариантов изображения по названию и формату (заполняется при обработке)', verbose_name='Адаптивные варианты'),
+        ),
+    ]
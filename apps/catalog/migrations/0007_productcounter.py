@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_product_counters(apps, schema_editor):
+    """Начальное заполнение счетчиков по существующим продуктам"""
+    Product = apps.get_model('catalog', 'Product')
+    ProductCounter = apps.get_model('catalog', 'ProductCounter')
+    rows = Product.objects.order_by().values('subdivision_id', 'status', 'condition').annotate(
+        total=models.Count('id')
+    )
+    ProductCounter.objects.bulk_create([
+        ProductCounter(
+            subdivision_id=row['subdivision_id'],
+            status=row['status'],
+            condition=row['condition'],
+            count=row['total']
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_productimage_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20, verbose_name='Статус')),
+                ('condition', models.CharField(max_length=20, verbose_name='Состояние')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+                ('subdivision', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_counters', to='catalog.subdivision', verbose_name='Подразделение')),
+            ],
+            options={
+                'verbose_name': 'Счетчик неликвидов',
+                'verbose_name_plural': 'Счетчики неликвидов',
+                'constraints': [models.UniqueConstraint(fields=('subdivision', 'status', 'condition'), name='unique_product_counter')],
+            },
+        ),
+        migrations.RunPython(fill_product_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_productcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subdivision', '-created_at', '-id'], name='catalog_pro_subdivi_652d27_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_product_cursor_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subdivision', 'status', '-created_at', '-id'], name='catalog_pro_subdivi_f24ec8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subdivision', 'condition', '-created_at', '-id'], name='catalog_pro_subdivi_48360a_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_product_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changelog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Время изменения'),
+        ),
+    ]
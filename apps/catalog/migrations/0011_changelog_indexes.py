@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_changelog_timestamp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['product', '-timestamp', '-id'], name='catalog_cha_product_e4a9f7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['timestamp'], name='catalog_cha_timesta_2b9bea_idx'),
+        ),
+    ]
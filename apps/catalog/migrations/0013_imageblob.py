@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:51
+
+import apps.catalog.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('image', models.ImageField(upload_to=apps.catalog.models.get_blob_upload_path, verbose_name='Изображение')),
+                ('thumbnail', models.ImageField(blank=True, null=True, upload_to=apps.catalog.models.get_blob_derived_path, verbose_name='Миниатюра')),
+                ('renditions', models.JSONField(blank=True, default=dict, verbose_name='Адаптивные варианты')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер загруженного файла')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Количество ссылок')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата обработки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Файл изображения',
+                'verbose_name_plural': 'Файлы изображений',
+            },
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='product_images', to='catalog.imageblob', verbose_name='Общий файл'),
+        ),
+    ]
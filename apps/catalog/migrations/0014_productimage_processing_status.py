@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:55
+
+from django.db import migrations, models
+
+
+def mark_processed_images(apps, schema_editor):
+    """Изображения с миниатюрой уже обработаны"""
+    ProductImage = apps.get_model('catalog', 'ProductImage')
+    ProductImage.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True).update(
+        processing_status='done'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_imageblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата обработки'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False, verbose_name='Ошибка обработки'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ожидает обработки'), ('processing', 'Обрабатывается'), ('done', 'Обработано'), ('failed', 'Ошибка обработки')], db_index=True, default='pending', editable=False, max_length=20, verbose_name='Состояние обработки'),
+        ),
+        migrations.RunPython(mark_processed_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_productimage_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='Хеш содержимого, считается по мере приема частей (заполняется после приема всего файла)', max_length=64, verbose_name='SHA-256'),
+        ),
+    ]
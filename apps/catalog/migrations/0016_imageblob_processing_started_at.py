@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0015_uploadsession_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Задача, обрабатывающая файл сейчас (захват обработки)', null=True, verbose_name='Начало обработки'),
+        ),
+    ]
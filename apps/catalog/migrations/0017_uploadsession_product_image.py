@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0016_imageblob_processing_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='product_image',
+            field=models.ForeignKey(blank=True, help_text='Заполняется при завершении загрузки', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalog.productimage', verbose_name='Созданное изображение'),
+        ),
+    ]
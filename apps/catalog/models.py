@@ -1,7 +1,15 @@
-from django.db import models
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from .storage_io import delete_file
 
 def validate_image_size(value):
     """Валидатор для проверки размера изображения (макс 10MB)"""
@@ -21,6 +29,27 @@ def get_thumbnail_upload_path(instance, filename):
     """Генерация пути для загрузки миниатюр"""
     return f'product_thumbnails/{instance.product.subdivision.code}/{instance.product.code}/{filename}'
 
+def get_rendition_upload_path(instance, filename):
+    """Генерация пути для адаптивных вариантов изображений"""
+    return f'product_renditions/{instance.product.subdivision.code}/{instance.product.code}/{filename}'
+
+def get_blob_upload_path(instance, filename):
+    """Путь файла по содержимому: image_blobs/ab/cd/<sha256>.<расширение>"""
+    extension = os.path.splitext(filename)[1].lower()
+    return f'image_blobs/{instance.sha256[:2]}/{instance.sha256[2:4]}/{instance.sha256}{extension}'
+
+def get_blob_derived_path(instance, filename):
+    """Путь миниатюры и вариантов общего изображения"""
+    return f'image_blobs/{instance.sha256[:2]}/{instance.sha256[2:4]}/{filename}'
+
+def compute_sha256(file, chunk_size=64 * 1024):
+    """SHA-256 файла Django, читаемого частями (файл возвращается в начало)"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks(chunk_size):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
 class Profile(models.Model):
     """Профиль пользователя с привязкой к подразделению"""
     user = models.OneToOneField(
@@ -73,43 +102,11 @@ class Profile(models.Model):
     
     def get_user_permissions_in_subdivision(self, subdivision):
         """Получить права пользователя в указанном подразделении"""
-        if not self.user.is_authenticated:
-            return {'view': True, 'add': False, 'edit_any': False, 'delete': False, 'manage': False}
-        
-        if self.user.is_superuser:
-            return {'view': True, 'add': True, 'edit_any': True, 'delete': True, 'manage': True}
-        
-        # Если пользователь не привязан к подразделению - только просмотр
-        if not self.subdivision:
-            return {'view': True, 'add': False, 'edit_any': False, 'delete': False, 'manage': False}
-        
-        # Проверяем права в зависимости от группы
-        is_in_subdivision = self.subdivision == subdivision
-        
-        # Права Viewer (только просмотр)
-        if self.user.groups.filter(name='Viewer').exists():
-            return {'view': True, 'add': False, 'edit_any': False, 'delete': False, 'manage': False}
-        
-        # Права Editor (только в своем подразделении)
-        if self.user.groups.filter(name='Editor').exists():
-            if is_in_subdivision:
-                return {'view': True, 'add': True, 'edit_any': True, 'delete': False, 'manage': False}
-            else:
-                return {'view': True, 'add': False, 'edit_any': False, 'delete': False, 'manage': False}
+        from .permissions import get_permission_context, resolve_permissions
         
-        # Права Subdivision_Admin (только в своем подразделении)
-        if self.user.groups.filter(name='Subdivision_Admin').exists():
-            if is_in_subdivision:
-                return {'view': True, 'add': True, 'edit_any': True, 'delete': True, 'manage': True}
-            else:
-                return {'view': True, 'add': False, 'edit_any': False, 'delete': False, 'manage': False}
-        
-        # Права Super_Admin (во всех подразделениях)
-        if self.user.groups.filter(name='Super_Admin').exists():
-            return {'view': True, 'add': True, 'edit_any': True, 'delete': True, 'manage': True}
-        
-        # По умолчанию - только просмотр
-        return {'view': True, 'add': False, 'edit_any': False, 'delete': False, 'manage': False}
+        # Группы берем из контекста прав запроса, чтобы не запрашивать их повторно
+        group_names = get_permission_context(self.user).group_names
+        return resolve_permissions(self.user, self, group_names, subdivision.pk)
 
 class Subdivision(models.Model):
     """Модель подразделения предприятия"""
@@ -154,8 +151,8 @@ class Subdivision(models.Model):
         return f"{self.code} - {self.name}"
     
     def product_count(self):
-        """Количество неликвидов в подразделении"""
-        return self.products.count()
+        """Количество неликвидов в подразделении (по счетчикам, без подсчета продуктов)"""
+        return self.product_counters.aggregate(total=Sum('count'))['total'] or 0
     
     product_count.short_description = "Количество неликвидов"
     
@@ -165,48 +162,18 @@ class Subdivision(models.Model):
     
     def can_user_view(self, user):
         """Может ли пользователь просматривать подразделение"""
-        if not user.is_authenticated:
-            return True  # Неавторизованные могут только просматривать
-        
-        if user.is_superuser:
-            return True
-        
-        # Проверяем права через профиль
-        if hasattr(user, 'profile'):
-            permissions = user.profile.get_user_permissions_in_subdivision(self)
-            return permissions['view']
-        
-        return True  # По умолчанию - может просматривать
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_view_subdivision(self)
     
     def can_user_add_product(self, user):
         """Может ли пользователь добавлять продукты в подразделение"""
-        if not user.is_authenticated:
-            return False
-        
-        if user.is_superuser:
-            return True
-        
-        # Проверяем права через профиль
-        if hasattr(user, 'profile'):
-            permissions = user.profile.get_user_permissions_in_subdivision(self)
-            return permissions['add']
-        
-        return False
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_add_product(self)
     
     def can_user_manage(self, user):
         """Может ли пользователь управлять подразделением"""
-        if not user.is_authenticated:
-            return False
-        
-        if user.is_superuser:
-            return True
-        
-        # Проверяем права через профиль
-        if hasattr(user, 'profile'):
-            permissions = user.profile.get_user_permissions_in_subdivision(self)
-            return permissions['manage']
-        
-        return False
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_manage_subdivision(self)
     
     # Для использования в шаблонах
     def user_can_add_product(self, user):
@@ -318,6 +285,11 @@ class Product(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['condition']),
             models.Index(fields=['created_at']),
+            # Курсорная пагинация списка подразделения по (created_at, id)
+            models.Index(fields=['subdivision', '-created_at', '-id']),
+            # Фильтры списка подразделения по статусу и состоянию
+            models.Index(fields=['subdivision', 'status', '-created_at', '-id']),
+            models.Index(fields=['subdivision', 'condition', '-created_at', '-id']),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -329,13 +301,35 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем значения полей при загрузке для отслеживания изменений"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def get_counter_key(self, loaded=False):
+        """Ключ счетчика (подразделение, статус, состояние): текущий или при загрузке"""
+        if loaded:
+            values = getattr(self, '_loaded_values', None)
+            if not values or not {'subdivision_id', 'status', 'condition'} <= values.keys():
+                return None
+            return (values['subdivision_id'], values['status'], values['condition'])
+        return (self.subdivision_id, self.status, self.condition)
+    
     def get_main_image(self):
-        """Получение основного изображения продукта с приоритетом миниатюры"""
-        main_image = self.images.filter(is_main=True).first()
-        if not main_image:
-            main_image = self.images.first()
+        """Получение основного изображения продукта с приоритетом миниатюры
+        
+        Выбор делается по self.images.all(), а не через filter(), чтобы
+        использовать кэш prefetch_related('images') в списках продуктов
+        и не выполнять отдельные запросы на каждую карточку.
+        """
+        images = list(self.images.all())
+        for image in images:
+            if image.is_main:
+                return image
         
-        return main_image
+        return images[0] if images else None
 
     def get_thumbnail_url(self):
         """Получение URL миниатюры основного изображения"""
@@ -348,63 +342,264 @@ class Product(models.Model):
     
     def save(self, *args, **kwargs):
         """Переопределение save для логирования изменений"""
-        is_new = self.pk is None
+        from .changelog import record_save
+        
+        is_new = self._state.adding
         super().save(*args, **kwargs)
         
-        # Здесь позже добавим логирование изменений
-        if not is_new:
-            # Логирование изменения
-            pass
+        # Разница с загруженными значениями уходит в буфер журнала изменений
+        record_save(self, created=is_new)
+        
+        # Сохраненные значения становятся исходными для следующего сохранения
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
     
     def can_view(self, user):
         """Может ли пользователь просматривать продукт"""
-        if not user.is_authenticated:
-            return True  # Неавторизованные могут только просматривать
-        
-        if user.is_superuser:
-            return True
-        
-        return self.subdivision.can_user_view(user)
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_view(self)
     
     def can_edit(self, user):
         """Может ли пользователь редактировать продукт"""
-        if not user.is_authenticated:
-            return False
-        
-        if user.is_superuser:
-            return True
-        
-        # Проверяем права через профиль
-        if hasattr(user, 'profile'):
-            permissions = user.profile.get_user_permissions_in_subdivision(self.subdivision)
-            
-            # Editor и Subdivision_Admin могут редактировать любые записи в своем подразделении
-            if permissions['edit_any']:
-                return True
-            
-            # Если пользователь создал эту запись и имеет право на добавление
-            if permissions['add'] and self.created_by == user:
-                return True
-        
-        return False
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_edit(self)
     
     def can_delete(self, user):
         """Может ли пользователь удалить продукт"""
-        if not user.is_authenticated:
-            return False
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_delete(self)
+
+class ProductCounter(models.Model):
+    """
+    Количество продуктов по (подразделение, статус, состояние).
+    
+    Обновляется инкрементально сигналами Product и массовыми операциями,
+    чтобы главная страница и админка не считали продукты через COUNT.
+    Восстановление - команда recount_product_counters.
+    """
+    subdivision = models.ForeignKey(
+        Subdivision,
+        on_delete=models.CASCADE,
+        related_name='product_counters',
+        verbose_name="Подразделение"
+    )
+    status = models.CharField(max_length=20, verbose_name="Статус")
+    condition = models.CharField(max_length=20, verbose_name="Состояние")
+    count = models.IntegerField(default=0, verbose_name="Количество")
+    
+    class Meta:
+        verbose_name = "Счетчик неликвидов"
+        verbose_name_plural = "Счетчики неликвидов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subdivision', 'status', 'condition'],
+                name='unique_product_counter'
+            )
+        ]
+    
+    def __str__(self):
+        return f"{self.subdivision_id}/{self.status}/{self.condition}: {self.count}"
+    
+    @classmethod
+    def adjust(cls, subdivision_id, status, condition, delta):
+        """Изменить счетчик на delta (создается при первом обращении)"""
+        if not delta:
+            return
+        lookup = {'subdivision_id': subdivision_id, 'status': status, 'condition': condition}
+        if cls.objects.filter(**lookup).update(count=F('count') + delta) or delta < 0:
+            # Уменьшение несуществующего счетчика (например, при каскадном удалении
+            # подразделения) пропускаем
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Счетчик создан параллельно - повторяем обновление
+            cls.objects.filter(**lookup).update(count=F('count') + delta)
+    
+    @classmethod
+    def recount(cls, subdivision_ids=None):
+        """Пересчитать счетчики по таблице продуктов (все или указанных подразделений)"""
+        products = Product.objects.all()
+        counters = cls.objects.all()
+        if subdivision_ids is not None:
+            products = products.filter(subdivision_id__in=subdivision_ids)
+            counters = counters.filter(subdivision_id__in=subdivision_ids)
+        
+        rows = products.order_by().values('subdivision_id', 'status', 'condition').annotate(
+            total=Count('id')
+        )
+        with transaction.atomic():
+            counters.delete()
+            cls.objects.bulk_create([
+                cls(
+                    subdivision_id=row['subdivision_id'],
+                    status=row['status'],
+                    condition=row['condition'],
+                    count=row['total']
+                )
+                for row in rows
+            ])
+        return len(rows)
+
+class ImageBlob(models.Model):
+    """
+    Общий файл изображения, адресуемый по SHA-256 содержимого.
+    
+    Одинаковые загрузки (одно фото у нескольких продуктов или повторная
+    загрузка) хранятся и обрабатываются один раз: ProductImage ссылается
+    на ImageBlob и получает его файлы, миниатюру и варианты. ref_count -
+    количество ссылающихся изображений; при обнулении файлы удаляются.
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    image = models.ImageField(upload_to=get_blob_upload_path, verbose_name="Изображение")
+    thumbnail = models.ImageField(
+        upload_to=get_blob_derived_path,
+        null=True,
+        blank=True,
+        verbose_name="Миниатюра"
+    )
+    renditions = models.JSONField(default=dict, blank=True, verbose_name="Адаптивные варианты")
+    size = models.PositiveBigIntegerField(default=0, verbose_name="Размер загруженного файла")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Количество ссылок")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата обработки")
+    processing_started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Начало обработки",
+        help_text="Задача, обрабатывающая файл сейчас (захват обработки)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    
+    class Meta:
+        verbose_name = "Файл изображения"
+        verbose_name_plural = "Файлы изображений"
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count})"
+    
+    def get_rendition_path(self, filename):
+        return get_blob_derived_path(self, filename)
+    
+    @classmethod
+    def acquire(cls, file, sha256=None):
+        """
+        Общий файл для загруженного file (с увеличением счетчика ссылок).
         
-        if user.is_superuser:
-            return True
+        Содержимое хешируется потоково (если хеш sha256 не посчитан заранее,
+        например при порционной загрузке); если такой файл уже есть,
+        новый не сохраняется.
+        """
+        if sha256 is None:
+            sha256 = compute_sha256(file)
+        if cls.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1):
+            return cls.objects.get(sha256=sha256)
         
-        # Проверяем права через профиль
-        if hasattr(user, 'profile'):
-            permissions = user.profile.get_user_permissions_in_subdivision(self.subdivision)
-            return permissions['delete']
+        blob = cls(sha256=sha256, size=file.size, ref_count=1)
+        blob.image.save(os.path.basename(file.name), file, save=False)
+        try:
+            with transaction.atomic():
+                blob.save()
+        except IntegrityError:
+            # Такой же файл сохранен параллельно - используем его
+            blob.image.delete(save=False)
+            cls.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+            return cls.objects.get(sha256=sha256)
+        return blob
+    
+    @classmethod
+    def release(cls, blob_id):
+        """Уменьшение счетчика ссылок; последний освобождает файлы"""
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(pk=blob_id).first()
+            if blob is None:
+                return
+            if blob.ref_count > 1:
+                cls.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+        blob.delete_files()
+    
+    def delete_files(self):
+        storage = self.image.storage
+        names = [self.image.name, self.thumbnail.name if self.thumbnail else None]
+        for by_format in (self.renditions or {}).values():
+            for items in by_format.values():
+                names.extend(item['name'] for item in items)
+        for name in set(filter(None, names)):
+            delete_file(storage, name)
+    
+    def claim_processing(self, force=False):
+        """
+        Захват обработки файла одной задачей (условный UPDATE).
         
-        return False
+        Задачи изображений с общим файлом выполняются параллельно; файл
+        обрабатывает только захватившая задача, остальные переносят ее
+        результат (sync_product_images). Захват старше ограничения времени
+        задачи считается брошенным (рабочий процесс завершился аварийно).
+        Без force уже обработанный файл не захватывается.
+        """
+        now = timezone.now()
+        timeout = getattr(settings, 'CELERY_TASK_TIME_LIMIT', 30 * 60)
+        queryset = ImageBlob.objects.filter(pk=self.pk).filter(
+            Q(processing_started_at__isnull=True)
+            | Q(processing_started_at__lt=now - timedelta(seconds=timeout))
+        )
+        if not force:
+            queryset = queryset.filter(processed_at__isnull=True)
+        if not queryset.update(processing_started_at=now):
+            return False
+        self.processing_started_at = now
+        return True
+    
+    def finish_processing(self, processed=False):
+        """Снятие захвата (processed - создана миниатюра, файл обработан)"""
+        self.processing_started_at = None
+        update_fields = ['processing_started_at']
+        if processed:
+            self.processed_at = timezone.now()
+            update_fields.append('processed_at')
+        self.save(update_fields=update_fields)
+    
+    def copy_to(self, product_image):
+        """Файлы общего изображения в полях ProductImage (без сохранения)"""
+        # Присваивание имени (а не файла) - файл уже в хранилище и не сохраняется повторно
+        product_image.image = self.image.name
+        product_image.thumbnail = self.thumbnail.name if self.thumbnail else None
+        product_image.renditions = self.renditions
+    
+    def sync_product_images(self):
+        """Результат обработки во все ссылающиеся изображения одним запросом"""
+        fields = {
+            'image': self.image.name,
+            'thumbnail': self.thumbnail.name if self.thumbnail else None,
+            'renditions': self.renditions,
+        }
+        if self.processed_at:
+            fields.update(
+                processing_status=ProductImage.PROCESSING_DONE,
+                processed_at=self.processed_at,
+                processing_error=''
+            )
+        return self.product_images.update(**fields)
 
 class ProductImage(models.Model):
     """Модель для хранения изображений продуктов"""
+    
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_DONE = 'done'
+    PROCESSING_FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = [
+        (PROCESSING_PENDING, 'Ожидает обработки'),
+        (PROCESSING_RUNNING, 'Обрабатывается'),
+        (PROCESSING_DONE, 'Обработано'),
+        (PROCESSING_FAILED, 'Ошибка обработки'),
+    ]
+    
     product = models.ForeignKey(
         Product, 
         on_delete=models.CASCADE, 
@@ -424,6 +619,13 @@ class ProductImage(models.Model):
         verbose_name="Миниатюра",
         editable=False
     )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Адаптивные варианты",
+        help_text="Файлы вариантов изображения по названию и формату (заполняется при обработке)"
+    )
     is_main = models.BooleanField(
         default=False, 
         verbose_name="Основное изображение",
@@ -442,6 +644,25 @@ class ProductImage(models.Model):
         verbose_name="Кем загружено"
     )
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата загрузки")
+    blob = models.ForeignKey(
+        ImageBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='product_images',
+        verbose_name="Общий файл"
+    )
+    processing_status = models.CharField(
+        max_length=20,
+        choices=PROCESSING_STATUS_CHOICES,
+        default=PROCESSING_PENDING,
+        editable=False,
+        db_index=True,
+        verbose_name="Состояние обработки"
+    )
+    processed_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Дата обработки")
+    processing_error = models.TextField(blank=True, editable=False, verbose_name="Ошибка обработки")
     
     class Meta:
         verbose_name = "Изображение продукта"
@@ -451,9 +672,62 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"Изображение для {self.product.code}"
     
+    def get_renditions(self, name, fmt='jpeg'):
+        """Варианты изображения [(url, ширина), ...] по возрастанию ширины"""
+        items = (self.renditions or {}).get(name, {}).get(fmt, [])
+        storage = self.image.storage
+        return [(storage.url(item['name']), item['width']) for item in items]
+    
+    def get_rendition_url(self, name, fmt='jpeg'):
+        """URL самого крупного варианта; до обработки - миниатюра или оригинал"""
+        renditions = self.get_renditions(name, fmt)
+        if renditions:
+            return renditions[-1][0]
+        if self.thumbnail:
+            return self.thumbnail.url
+        return self.image.url
+    
+    def get_rendition_path(self, filename):
+        return get_rendition_upload_path(self, filename)
+    
+    def get_processing_queryset(self):
+        """Изображения, обрабатываемые вместе с этим (все ссылки на общий файл)"""
+        if self.blob_id:
+            return ProductImage.objects.filter(blob_id=self.blob_id)
+        return ProductImage.objects.filter(pk=self.pk)
+    
+    def mark_processing(self):
+        self.get_processing_queryset().update(processing_status=self.PROCESSING_RUNNING)
+    
+    def mark_processed(self):
+        self.get_processing_queryset().update(
+            processing_status=self.PROCESSING_DONE,
+            processed_at=timezone.now(),
+            processing_error=''
+        )
+    
+    def mark_failed(self, error):
+        self.get_processing_queryset().update(
+            processing_status=self.PROCESSING_FAILED,
+            processing_error=str(error)
+        )
+    
     def save(self, *args, **kwargs):
         """Переопределение save для обработки изображений"""
         is_new = self.pk is None
+        needs_processing = is_new
+        
+        # Новый файл заменяем ссылкой на общий файл с тем же содержимым
+        if is_new and self.image and not self.image._committed:
+            self.blob = ImageBlob.acquire(self.image.file)
+            self.blob.copy_to(self)
+        
+        if is_new and self.blob_id:
+            # Уже обработанное содержимое повторно не обрабатываем
+            needs_processing = self.blob.processed_at is None
+            if not needs_processing:
+                self.processing_status = self.PROCESSING_DONE
+                self.processed_at = self.blob.processed_at
         
         # Сохраняем, чтобы получить ID
         super().save(*args, **kwargs)
@@ -474,17 +748,21 @@ class ProductImage(models.Model):
                 is_main=True
             ).exclude(pk=self.pk).update(is_main=False)
         
-        # Если это новое изображение, запускаем обработку
-        if is_new:
-            try:
-                from .tasks import process_product_image
-                # Запускаем с задержкой 5 секунд, чтобы убедиться, что файл сохранен
-                process_product_image.apply_async((self.id,), countdown=5)
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Ошибка при запуске обработки изображения {self.id}: {e}")
-                # Сохраняем ошибку в лог, но не прерываем процесс сохранения
+        # Если это новое изображение, запускаем обработку после фиксации
+        # транзакции: к этому моменту файл и запись уже видны воркеру
+        if needs_processing:
+            transaction.on_commit(self.dispatch_processing)
+    
+    def dispatch_processing(self):
+        """Отправка изображения на обработку (состояние - в processing_status)"""
+        try:
+            from .tasks import process_product_image
+            process_product_image.delay(self.id)
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Ошибка при запуске обработки изображения {self.id}: {e}")
+            # Сохраняем ошибку в лог, но не прерываем процесс сохранения
 
 class ChangeLog(models.Model):
     """Модель для отслеживания изменений в продуктах"""
@@ -513,12 +791,79 @@ class ChangeLog(models.Model):
         verbose_name="Изменения",
         help_text="Детали изменений в формате JSON"
     )
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Время изменения")
+    # Время задается при изменении, а не при записи в базу (журнал пишется пачками)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, verbose_name="Время изменения")
     
     class Meta:
         verbose_name = "История изменений"
         verbose_name_plural = "История изменений"
         ordering = ['-timestamp']
+        indexes = [
+            # История продукта (inline в админке) - новые первыми
+            models.Index(fields=['product', '-timestamp', '-id']),
+            # Отбор старых записей для архивации
+            models.Index(fields=['timestamp']),
+        ]
     
     def __str__(self):
-        return f"{self.get_action_display()} - {self.product.code}"
\ No newline at end of file
+        return f"{self.get_action_display()} - {self.product.code}"
+
+
+class UploadSession(models.Model):
+    """
+    Сессия порционной (возобновляемой) загрузки изображения.
+    
+    Части файла дописываются во временный файл (apps.catalog.uploads),
+    offset - сколько байт уже принято. После обрыва связи клиент узнает
+    offset и продолжает с него. Когда файл принят целиком, создается
+    ProductImage: временный файл удаляется, а сессия остается со ссылкой
+    на изображение, чтобы повторный запрос последней части (ответ на первый
+    потерян) вернул то же изображение. Завершенные сессии удаляются вместе
+    с брошенными (cleanup_sessions).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name="Продукт"
+    )
+    uploaded_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Кем загружается"
+    )
+    filename = models.CharField(max_length=255, verbose_name="Имя файла")
+    size = models.PositiveBigIntegerField(verbose_name="Размер файла")
+    offset = models.PositiveBigIntegerField(default=0, verbose_name="Принято байт")
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="SHA-256",
+        help_text="Хеш содержимого, считается по мере приема частей (заполняется после приема всего файла)"
+    )
+    product_image = models.ForeignKey(
+        ProductImage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Созданное изображение",
+        help_text="Заполняется при завершении загрузки"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    
+    class Meta:
+        verbose_name = "Сессия загрузки"
+        verbose_name_plural = "Сессии загрузки"
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+    
+    @property
+    def is_complete(self):
+        return self.offset >= self.size
@@ -0,0 +1,108 @@
+"""
+Курсорная (keyset) пагинация.
+
+Вместо OFFSET следующая страница выбирается условием по ключу сортировки
+(created_at, id) последней записи, поэтому глубокие страницы так же быстры,
+как первая, и не нужен COUNT(*) на каждый запрос. Курсор передается
+клиенту непрозрачной строкой.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(created_at, pk, direction):
+    data = json.dumps([created_at.isoformat(), pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id, направление) или None для неверного курсора"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk, direction = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = parse_datetime(created_at)
+        if created_at is None or direction not in ('next', 'prev'):
+            return None
+        return created_at, int(pk), direction
+    except (ValueError, TypeError):
+        return None
+
+
+class CursorPage:
+    """Страница курсорной пагинации (совместима по основным атрибутам с Page)"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last.created_at, last.pk, 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first.created_at, first.pk, 'prev')
+
+
+class CursorPaginator:
+    """
+    Пагинация по (created_at, id) в порядке убывания.
+
+    Для эффективной работы нужен составной индекс, начинающийся
+    с полей фильтра и заканчивающийся (created_at, id).
+    count - необязательное общее количество (например, из счетчиков или кэша).
+    """
+
+    def __init__(self, queryset, per_page, count=None):
+        self.queryset = queryset.order_by('-created_at', '-id')
+        self.per_page = per_page
+        self.count = count
+
+    def page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+
+        if position is None:
+            items = list(self.queryset[:self.per_page + 1])
+            return CursorPage(items[:self.per_page], self, len(items) > self.per_page, False)
+
+        created_at, pk, direction = position
+        if direction == 'next':
+            items = list(self.queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )[:self.per_page + 1])
+            return CursorPage(items[:self.per_page], self, len(items) > self.per_page, True)
+
+        # Назад: выбираем в обратном порядке и разворачиваем
+        items = list(self.queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        ).order_by('created_at', 'id')[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page]
+        items.reverse()
+        return CursorPage(items, self, True, has_previous)
@@ -0,0 +1,190 @@
+from django.utils.functional import cached_property
+
+VIEW_ONLY = {'view': True, 'add': False, 'edit_any': False, 'delete': False, 'manage': False}
+FULL_ACCESS = {'view': True, 'add': True, 'edit_any': True, 'delete': True, 'manage': True}
+EDITOR_ACCESS = {'view': True, 'add': True, 'edit_any': True, 'delete': False, 'manage': False}
+
+
+def resolve_permissions(user, profile, group_names, subdivision_id):
+    """Права пользователя в подразделении по уже загруженным данным (без запросов к БД)"""
+    if not user.is_authenticated:
+        return dict(VIEW_ONLY)
+
+    if user.is_superuser:
+        return dict(FULL_ACCESS)
+
+    # Если пользователь не привязан к подразделению - только просмотр
+    if profile is None or not profile.subdivision_id:
+        return dict(VIEW_ONLY)
+
+    is_in_subdivision = profile.subdivision_id == subdivision_id
+
+    # Права Viewer (только просмотр)
+    if 'Viewer' in group_names:
+        return dict(VIEW_ONLY)
+
+    # Права Editor (только в своем подразделении)
+    if 'Editor' in group_names:
+        return dict(EDITOR_ACCESS if is_in_subdivision else VIEW_ONLY)
+
+    # Права Subdivision_Admin (только в своем подразделении)
+    if 'Subdivision_Admin' in group_names:
+        return dict(FULL_ACCESS if is_in_subdivision else VIEW_ONLY)
+
+    # Права Super_Admin (во всех подразделениях)
+    if 'Super_Admin' in group_names:
+        return dict(FULL_ACCESS)
+
+    # По умолчанию - только просмотр
+    return dict(VIEW_ONLY)
+
+
+class PermissionContext:
+    """
+    Права пользователя в каталоге на время одного запроса.
+
+    Профиль (с подразделением) и названия групп загружаются один раз,
+    после чего все проверки can_* выполняются в памяти.
+    Доступен в представлениях и админке (ProductAdmin.has_*_permission) через
+    get_permission_context(request.user), в шаблонах - через переменную
+    catalog_permissions и фильтры catalog_tags (product|can_edit:catalog_permissions).
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._permissions = {}
+
+    @cached_property
+    def profile(self):
+        """Профиль пользователя с подразделением или None"""
+        if not self.user.is_authenticated:
+            return None
+        from .models import Profile
+        return Profile.objects.select_related('subdivision').filter(user=self.user).first()
+
+    @cached_property
+    def group_names(self):
+        """Названия групп пользователя"""
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(self.user.groups.values_list('name', flat=True))
+
+    @property
+    def subdivision(self):
+        """Подразделение, к которому привязан пользователь"""
+        return self.profile.subdivision if self.profile else None
+
+    @property
+    def is_viewer(self):
+        return 'Viewer' in self.group_names
+
+    @property
+    def is_editor(self):
+        return 'Editor' in self.group_names
+
+    @property
+    def is_subdivision_admin(self):
+        return 'Subdivision_Admin' in self.group_names
+
+    @property
+    def is_super_admin(self):
+        return 'Super_Admin' in self.group_names
+
+    def get_permissions(self, subdivision):
+        """Права пользователя в подразделении (объект или id)"""
+        subdivision_id = getattr(subdivision, 'pk', subdivision)
+        if subdivision_id not in self._permissions:
+            self._permissions[subdivision_id] = resolve_permissions(
+                self.user, self.profile, self.group_names, subdivision_id
+            )
+        return dict(self._permissions[subdivision_id])
+
+    def can_view_subdivision(self, subdivision):
+        """Может ли пользователь просматривать подразделение"""
+        if not self.user.is_authenticated or self.user.is_superuser:
+            return True
+
+        if self.profile is None:
+            return True  # По умолчанию - может просматривать
+
+        return self.get_permissions(subdivision)['view']
+
+    def can_add_product(self, subdivision):
+        """Может ли пользователь добавлять продукты в подразделение"""
+        if not self.user.is_authenticated:
+            return False
+
+        if self.user.is_superuser:
+            return True
+
+        if self.profile is None:
+            return False
+
+        return self.get_permissions(subdivision)['add']
+
+    def can_manage_subdivision(self, subdivision):
+        """Может ли пользователь управлять подразделением"""
+        if not self.user.is_authenticated:
+            return False
+
+        if self.user.is_superuser:
+            return True
+
+        if self.profile is None:
+            return False
+
+        return self.get_permissions(subdivision)['manage']
+
+    def can_view(self, product):
+        """Может ли пользователь просматривать продукт"""
+        return self.can_view_subdivision(product.subdivision_id)
+
+    def can_edit(self, product):
+        """Может ли пользователь редактировать продукт"""
+        if not self.user.is_authenticated:
+            return False
+
+        if self.user.is_superuser:
+            return True
+
+        if self.profile is None:
+            return False
+
+        permissions = self.get_permissions(product.subdivision_id)
+
+        # Editor и Subdivision_Admin могут редактировать любые записи в своем подразделении
+        if permissions['edit_any']:
+            return True
+
+        # Если пользователь создал эту запись и имеет право на добавление
+        return permissions['add'] and product.created_by_id == self.user.pk
+
+    def can_delete(self, product):
+        """Может ли пользователь удалить продукт"""
+        if not self.user.is_authenticated:
+            return False
+
+        if self.user.is_superuser:
+            return True
+
+        if self.profile is None:
+            return False
+
+        return self.get_permissions(product.subdivision_id)['delete']
+
+
+def get_permission_context(user):
+    """
+    Контекст прав для пользователя.
+
+    Кэшируется на объекте пользователя: AuthenticationMiddleware создает
+    request.user заново для каждого запроса, поэтому кэш живет ровно один запрос.
+    """
+    context = getattr(user, '_catalog_permissions', None)
+    if context is None:
+        context = PermissionContext(user)
+        try:
+            user._catalog_permissions = context
+        except AttributeError:
+            pass
+    return context
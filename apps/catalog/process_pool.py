@@ -0,0 +1,30 @@
+"""
+Пересоздание миниатюр в пуле процессов (regenerate_thumbnails --workers).
+
+Пул запускается через spawn: процессы не наследуют соединения с базой
+родителя, а этот модуль импортируется в них до django.setup() - поэтому
+модели и конвейер импортируются внутри функций.
+"""
+
+
+def init_worker():
+    """Инициализация процесса пула: настройка Django и свои соединения с базой"""
+    import django
+    django.setup()
+
+
+def process_chunk(image_ids):
+    """Пересоздание миниатюр пачки изображений в процессе пула"""
+    from .image_pipeline import process_stored_image
+    from .models import ProductImage
+
+    processed = 0
+    errors = []
+    for product_image in ProductImage.objects.filter(id__in=image_ids).select_related('blob', 'product__subdivision'):
+        try:
+            process_stored_image(product_image, force=True, optimize=False)
+            processed += 1
+        except Exception as e:
+            product_image.mark_failed(e)
+            errors.append((product_image.id, str(e)))
+    return processed, errors
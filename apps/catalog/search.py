@@ -0,0 +1,205 @@
+"""
+Полнотекстовый поиск по каталогу неликвидов.
+
+Движок выбирается настройкой CATALOG_SEARCH_ENGINE (путь к классу).
+По умолчанию - по типу базы данных:
+    PostgreSQL - tsvector + GIN-индекс с русской морфологией;
+    SQLite     - виртуальная таблица FTS5;
+    остальные  - поиск подстроки (как раньше, без индекса).
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+SEARCH_FIELDS = ('code', 'name', 'description', 'location')
+
+SQLITE_FTS_TABLE = 'catalog_product_fts'
+
+# Выражение tsvector; должно совпадать с выражением GIN-индекса из миграции
+POSTGRES_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(catalog_product.code, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(catalog_product.name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(catalog_product.description, '')), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(catalog_product.location, '')), 'C')"
+)
+POSTGRES_INDEX_NAME = 'catalog_product_search_gin'
+
+
+def tokenize(query):
+    """Разбивает поисковый запрос на слова (буквы и цифры)"""
+    return re.findall(r'\w+', query.lower())
+
+
+class BaseSearchEngine:
+    """Базовый класс поискового движка"""
+
+    def search(self, query, queryset=None, limit=50):
+        """Список продуктов, отсортированных по релевантности"""
+        raise NotImplementedError
+
+    def index_product(self, product):
+        """Обновить продукт в индексе после сохранения"""
+
+    def remove_product(self, product_id):
+        """Удалить продукт из индекса"""
+
+    def rebuild(self):
+        """Полностью перестроить индекс. Возвращает количество проиндексированных продуктов"""
+        return Product.objects.count()
+
+    def get_queryset(self, queryset):
+        if queryset is None:
+            queryset = Product.objects.all()
+        return queryset.select_related('subdivision')
+
+
+class SimpleSearchEngine(BaseSearchEngine):
+    """Поиск подстроки без индекса (для баз данных без полнотекстового поиска)"""
+
+    def search(self, query, queryset=None, limit=50):
+        query_lower = query.strip().lower()
+        if not query_lower:
+            return []
+
+        products = self.get_queryset(queryset).annotate(
+            search_code=Lower('code'),
+            search_name=Lower('name'),
+            search_description=Lower('description'),
+            search_location=Lower('location')
+        ).filter(
+            Q(search_code__contains=query_lower) |
+            Q(search_name__contains=query_lower) |
+            Q(search_description__contains=query_lower) |
+            Q(search_location__contains=query_lower)
+        ).order_by('code')
+        return list(products[:limit])
+
+
+class PostgresSearchEngine(BaseSearchEngine):
+    """
+    Поиск PostgreSQL по tsvector с конфигурацией 'russian'.
+
+    Индекс - функциональный GIN по выражению POSTGRES_SEARCH_VECTOR,
+    поэтому PostgreSQL обновляет его сам при INSERT/UPDATE/DELETE.
+    """
+
+    def build_tsquery(self, query):
+        # Каждое слово ищем по префиксу, все слова обязательны
+        return ' & '.join(f'{token}:*' for token in tokenize(query))
+
+    def search(self, query, queryset=None, limit=50):
+        tsquery = self.build_tsquery(query)
+        if not tsquery:
+            return []
+
+        products = self.get_queryset(queryset).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({POSTGRES_SEARCH_VECTOR}, to_tsquery('russian', %s))",
+                (tsquery,),
+                output_field=FloatField()
+            )
+        ).filter(
+            RawSQL(
+                f"({POSTGRES_SEARCH_VECTOR}) @@ to_tsquery('russian', %s)",
+                (tsquery,),
+                output_field=BooleanField()
+            )
+        ).order_by('-search_rank', 'code')
+        return list(products[:limit])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {POSTGRES_INDEX_NAME}')
+        return Product.objects.count()
+
+
+class SQLiteSearchEngine(BaseSearchEngine):
+    """
+    Поиск SQLite через виртуальную таблицу FTS5.
+
+    rowid таблицы совпадает с id продукта. Индекс обновляется
+    сигналами Product (post_save/post_delete), ранжирование - bm25.
+    """
+
+    # Веса полей для bm25: code, name, description, location
+    weights = (10.0, 5.0, 1.0, 2.0)
+
+    def build_match(self, query):
+        # Каждое слово ищем по префиксу, все слова обязательны
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def search(self, query, queryset=None, limit=50):
+        match = self.build_match(query)
+        if not match:
+            return []
+
+        weights = ', '.join(str(weight) for weight in self.weights)
+
+        # Если набор продуктов уже сужен фильтрами, ранжируем все совпадения,
+        # а ограничение применяем после пересечения с ним
+        fts_limit = limit if queryset is None else -1
+        queryset = self.get_queryset(queryset)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SQLITE_FTS_TABLE} '
+                f'WHERE {SQLITE_FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({SQLITE_FTS_TABLE}, {weights}) LIMIT %s',
+                [match, fts_limit]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        if not ids:
+            return []
+
+        ordering = Case(
+            *[When(id=product_id, then=Value(position)) for position, product_id in enumerate(ids)]
+        )
+        products = queryset.filter(id__in=ids).order_by(ordering)
+        return list(products[:limit])
+
+    def index_product(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, code, name, description, location) '
+                f'VALUES (%s, %s, %s, %s, %s)',
+                [product.pk] + [getattr(product, field) or '' for field in SEARCH_FIELDS]
+            )
+
+    def remove_product(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [product_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, code, name, description, location) '
+                f"SELECT id, code, name, coalesce(description, ''), coalesce(location, '') "
+                f'FROM catalog_product'
+            )
+            cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE} ({SQLITE_FTS_TABLE}) VALUES ('optimize')")
+        return Product.objects.count()
+
+
+DEFAULT_ENGINES = {
+    'postgresql': PostgresSearchEngine,
+    'sqlite': SQLiteSearchEngine,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_engine():
+    """Поисковый движок по настройке CATALOG_SEARCH_ENGINE или по типу базы данных"""
+    engine_path = getattr(settings, 'CATALOG_SEARCH_ENGINE', None)
+    if engine_path:
+        return import_string(engine_path)()
+    return DEFAULT_ENGINES.get(connection.vendor, SimpleSearchEngine)()
@@ -0,0 +1,117 @@
+import logging
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import ImageBlob, Product, ProductCounter, ProductImage, Subdivision
+from .search import get_search_engine
+from .cache import bump_versions_on_commit, product_scope, subdivision_scope
+from . import changelog
+from . import code_index
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """Обновление поискового индекса после сохранения продукта"""
+    if raw:
+        return
+    try:
+        get_search_engine().index_product(instance)
+    except Exception as e:
+        # Ошибка индекса не должна мешать сохранению продукта
+        logger.error(f"Ошибка обновления поискового индекса для продукта {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Удаление продукта из поискового индекса"""
+    try:
+        get_search_engine().remove_product(instance.pk)
+    except Exception as e:
+        logger.error(f"Ошибка удаления продукта {instance.pk} из поискового индекса: {e}")
+
+
+@receiver(post_save, sender=Product)
+def update_product_counters(sender, instance, created, raw=False, **kwargs):
+    """Инкрементальное обновление счетчиков (подразделение, статус, состояние)"""
+    if raw:
+        return
+    new_key = instance.get_counter_key()
+    if created:
+        ProductCounter.adjust(*new_key, 1)
+        return
+    
+    old_key = instance.get_counter_key(loaded=True)
+    if old_key is not None and old_key != new_key:
+        ProductCounter.adjust(*old_key, -1)
+        ProductCounter.adjust(*new_key, 1)
+
+
+@receiver(post_delete, sender=Product)
+def decrement_product_counters(sender, instance, **kwargs):
+    """Уменьшение счетчика при удалении продукта"""
+    key = instance.get_counter_key(loaded=True) or instance.get_counter_key()
+    ProductCounter.adjust(*key, -1)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    """Новые версии кэша продукта и его подразделения (и прежнего при переносе)"""
+    scopes = ['products', product_scope(instance.pk), subdivision_scope(instance.subdivision_id)]
+    old_key = instance.get_counter_key(loaded=True)
+    if old_key is not None and old_key[0] != instance.subdivision_id:
+        scopes.append(subdivision_scope(old_key[0]))
+    bump_versions_on_commit(*scopes)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image_cache(sender, instance, **kwargs):
+    """Изображения видны на странице продукта и в карточках списка"""
+    try:
+        subdivision_id = instance.product.subdivision_id
+    except Product.DoesNotExist:
+        # Продукт удаляется каскадно - его кэш сбросит сигнал продукта
+        return
+    bump_versions_on_commit(product_scope(instance.product_id), subdivision_scope(subdivision_id))
+
+
+@receiver(post_save, sender=Subdivision)
+@receiver(post_delete, sender=Subdivision)
+def invalidate_subdivision_cache(sender, instance, **kwargs):
+    bump_versions_on_commit('subdivisions', subdivision_scope(instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def discard_product_changes(sender, instance, **kwargs):
+    """Записи журнала удаленного продукта в буфере больше не нужны"""
+    changelog.discard(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_code_index(sender, instance, signal, created=False, **kwargs):
+    """Сброс множеств кодов подразделения (и прежнего при переносе), если набор кодов изменился"""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    old_subdivision_id = loaded.get('subdivision_id', instance.subdivision_id)
+    if (
+        signal is post_save and not created
+        and loaded.get('code') == instance.code
+        and old_subdivision_id == instance.subdivision_id
+    ):
+        return
+    code_index.invalidate_on_commit(*{instance.subdivision_id, old_subdivision_id})
+
+
+@receiver(post_save, sender=Subdivision)
+@receiver(post_delete, sender=Subdivision)
+def invalidate_code_index_subdivisions(sender, instance, **kwargs):
+    code_index.invalidate_on_commit(subdivisions=True)
+
+
+@receiver(post_delete, sender=ProductImage)
+def release_image_blob(sender, instance, **kwargs):
+    """Освобождение общего файла изображения (файлы удаляются с последней ссылкой)"""
+    if instance.blob_id:
+        ImageBlob.release(instance.blob_id)
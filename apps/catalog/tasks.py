@@ -1,110 +1,88 @@
-import os
+import logging
+
 from celery import shared_task
-from PIL import Image
-from io import BytesIO
-from django.core.files.base import ContentFile
-from django.conf import settings
 from .models import ProductImage
+from .image_pipeline import process_stored_image
+from .changelog import write_entries
+from .events import publish_image_events
+
+logger = logging.getLogger(__name__)
+
+
+def run_processing(image_id, result, force=False, **options):
+    """
+    Обработка изображения с отметкой состояния в ProductImage.
+
+    Без force уже обработанное изображение пропускается (повторная доставка
+    задачи при acks_late или дублирующий вызов ничего не делают). Ошибка
+    записывается в processing_error и пробрасывается - задача завершается
+    со статусом FAILURE. О результате сообщается событием продукта.
+    """
+    product_image = ProductImage.objects.select_related('blob').filter(id=image_id).first()
+    if product_image is None:
+        # Изображение удалено до начала обработки
+        logger.info(f"Изображение {image_id} не найдено, обработка пропущена")
+        return None
+    if not force and product_image.processing_status == ProductImage.PROCESSING_DONE:
+        return {'result': f"Изображение {image_id} уже обработано", 'timings': {}}
+
+    if options.get('thumbnail', True):
+        product_image.mark_processing()
+    try:
+        timings = process_stored_image(product_image, force=force, **options)
+    except Exception as e:
+        product_image.mark_failed(e)
+        logger.error(f"Ошибка при обработке изображения {image_id}: {e}")
+        publish_image_events(product_image)
+        raise
+
+    # Страница продукта получает готовую миниатюру через SSE (apps.catalog.events)
+    publish_image_events(product_image)
+    return {
+        'result': f"{result} для {image_id}",
+        'timings': timings
+    }
 
 @shared_task
 def create_thumbnail(image_id):
     """Создание миниатюры для изображения продукта"""
-    try:
-        product_image = ProductImage.objects.get(id=image_id)
-        
-        # Открываем оригинальное изображение
-        img = Image.open(product_image.image.path)
-        
-        # Конвертируем в RGB если нужно
-        if img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
-        
-        # Создаем миниатюру (500x500)
-        img.thumbnail((500, 500), Image.Resampling.LANCZOS)
-        
-        # Сохраняем миниатюру
-        thumb_name = f"thumb_{os.path.basename(product_image.image.name)}"
-        thumb_path = os.path.join(
-            settings.MEDIA_ROOT,
-            'product_thumbnails',
-            thumb_name
-        )
-        
-        # Создаем директорию если не существует
-        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
-        
-        # Сохраняем изображение
-        img.save(thumb_path, 'JPEG', quality=85)
-        
-        # Обновляем модель
-        product_image.thumbnail.name = f'product_thumbnails/{thumb_name}'
-        product_image.save(update_fields=['thumbnail'])
-        
-        return f"Миниатюра создана для {product_image.id}"
-        
-    except ProductImage.DoesNotExist:
-        return f"Изображение {image_id} не найдено"
-    except Exception as e:
-        return f"Ошибка при создании миниатюры: {str(e)}"
+    return run_processing(image_id, "Миниатюра создана", force=True, optimize=False)
 
 @shared_task
 def optimize_image(image_id):
     """Оптимизация оригинального изображения"""
-    try:
-        product_image = ProductImage.objects.get(id=image_id)
-        
-        # Открываем оригинальное изображение
-        img = Image.open(product_image.image.path)
-        
-        # Конвертируем в RGB если нужно
-        if img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
-        
-        # Определяем максимальный размер
-        max_size = (1920, 1080)  # Full HD
-        
-        # Масштабируем если изображение слишком большое
-        if img.width > max_size[0] or img.height > max_size[1]:
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Сохраняем оптимизированное изображение
-        buffer = BytesIO()
-        img.save(buffer, 'JPEG', quality=85, optimize=True)
-        
-        # Перезаписываем оригинальный файл
-        product_image.image.save(
-            os.path.basename(product_image.image.name),
-            ContentFile(buffer.getvalue()),
-            save=True
-        )
-        
-        return f"Изображение оптимизировано для {product_image.id}"
-        
-    except ProductImage.DoesNotExist:
-        return f"Изображение {image_id} не найдено"
-    except Exception as e:
-        return f"Ошибка при оптимизации: {str(e)}"
+    return run_processing(image_id, "Изображение оптимизировано", force=True, thumbnail=False)
 
 @shared_task
 def process_product_image(image_id):
-    """Полная обработка изображения: оптимизация + создание миниатюры"""
-    optimize_result = optimize_image(image_id)
-    thumbnail_result = create_thumbnail(image_id)
-    
-    return {
-        'optimize': optimize_result,
-        'thumbnail': thumbnail_result
-    }
+    """Полная обработка изображения: оптимизация + создание миниатюры за одно декодирование"""
+    return run_processing(image_id, "Изображение обработано")
+
+@shared_task
+def process_product_image_bulk(image_id):
+    """
+    Полная обработка изображения в составе массовой обработки.
+
+    То же, что process_product_image, но отдельная задача: она направляется
+    в очередь bulk и получает ограничение скорости массовых задач
+    (config/celery.py, CELERY_TASK_ANNOTATIONS), не затрагивая свежие загрузки.
+    """
+    return run_processing(image_id, "Изображение обработано")
 
 @shared_task
 def process_multiple_images(image_ids):
     """Обработка нескольких изображений"""
     results = []
     for image_id in image_ids:
-        result = process_product_image.delay(image_id)
+        result = process_product_image_bulk.delay(image_id)
         results.append((image_id, result.id))
     
     return {
         'total': len(image_ids),
         'tasks': results
-    }
\ No newline at end of file
+    }
+@shared_task
+def write_changelog(entries):
+    """Запись пачки записей журнала изменений (см. apps.catalog.changelog)"""
+    write_entries(entries)
+    return len(entries)
@@ -1,9 +1,18 @@
 from django import template
-from django.utils.html import escape
+from django.utils.html import escape, format_html, format_html_join
 from django.utils.safestring import mark_safe
 
+from ..permissions import PermissionContext, get_permission_context
+
 register = template.Library()
 
+
+def as_permissions(permissions):
+    """Контекст прав: catalog_permissions из шаблона или пользователь"""
+    if isinstance(permissions, PermissionContext):
+        return permissions
+    return get_permission_context(permissions)
+
 @register.filter
 def status_color(status):
     """Возвращает цвет для статуса"""
@@ -27,9 +36,19 @@ def status_class(status):
     return classes.get(status, 'status-default')
 
 @register.filter
-def can_add_product(subdivision, user):
-    """Проверяет, может ли пользователь добавлять продукты в подразделение"""
-    return subdivision.can_user_add_product(user)    
+def can_add_product(subdivision, permissions):
+    """Может ли пользователь добавлять продукты в подразделение: subdivision|can_add_product:catalog_permissions"""
+    return as_permissions(permissions).can_add_product(subdivision)
+
+@register.filter
+def can_edit(product, permissions):
+    """Может ли пользователь редактировать продукт: product|can_edit:catalog_permissions"""
+    return as_permissions(permissions).can_edit(product)
+
+@register.filter
+def can_delete(product, permissions):
+    """Может ли пользователь удалить продукт: product|can_delete:catalog_permissions"""
+    return as_permissions(permissions).can_delete(product)
 
 @register.filter
 def highlight(text, query):
@@ -54,4 +73,44 @@ def highlight(text, query):
         text_str
     )
     
-    return mark_safe(highlighted)
\ No newline at end of file
+    return mark_safe(highlighted)
+
+@register.simple_tag
+def picture(image, rendition, **attrs):
+    """
+    Тег <picture> с адаптивными вариантами изображения.
+    
+    Пример: {% picture main_image 'card' alt=product.name class='img-fluid' loading='lazy' %}
+    Для каждого формата кроме JPEG выводится <source> с srcset, JPEG - запасной <img>.
+    Пока изображение не обработано, выводится обычный <img> с миниатюрой.
+    """
+    from ..image_pipeline import RENDITION_FORMATS, get_rendition_formats, get_rendition_specs
+    
+    if not image:
+        return ''
+    
+    sizes = get_rendition_specs().get(rendition, {}).get('sizes', '100vw')
+    img_attrs = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+    
+    jpeg = image.get_renditions(rendition, 'jpeg')
+    if not jpeg:
+        return format_html('<img src="{}" {}>', image.get_rendition_url(rendition), img_attrs)
+    
+    sources = []
+    for fmt in get_rendition_formats():
+        renditions = image.get_renditions(rendition, fmt)
+        if fmt == 'jpeg' or not renditions:
+            continue
+        sources.append(format_html(
+            '<source type="{}" srcset="{}" sizes="{}">',
+            RENDITION_FORMATS[fmt][1], srcset(renditions), sizes
+        ))
+    
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        mark_safe(''.join(sources)), jpeg[-1][0], srcset(jpeg), sizes, img_attrs
+    )
+
+def srcset(renditions):
+    """Значение атрибута srcset из списка [(url, ширина), ...]"""
+    return ', '.join(f'{url} {width}w' for url, width in renditions)
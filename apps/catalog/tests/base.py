@@ -0,0 +1,52 @@
+import io
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ..code_index import code_index
+from ..models import Product, Subdivision
+
+# Файлы тестов хранятся в памяти, а не в MEDIA_ROOT
+in_memory_storage = override_settings(STORAGES={
+    **settings.STORAGES,
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+})
+
+
+def make_image(size=(800, 600), color='red', name='photo.jpg'):
+    """Загруженный файл JPEG заданного размера"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+def list_files(storage, path=''):
+    """Все файлы хранилища (рекурсивно)"""
+    directories, files = storage.listdir(path)
+    names = [f'{path}{name}' for name in files]
+    for directory in directories:
+        names += list_files(storage, f'{path}{directory}/')
+    return sorted(names)
+
+
+class CatalogTestCase(TestCase):
+    """Общие данные: суперпользователь и подразделение"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.subdivision = Subdivision.objects.create(code='S1', name='Склад 1')
+
+    def setUp(self):
+        # Версии кэша и множества кодов не должны переходить между тестами
+        cache.clear()
+        code_index.invalidate()
+
+    def create_product(self, code, **kwargs):
+        kwargs.setdefault('name', f'Продукт {code}')
+        kwargs.setdefault('subdivision', self.subdivision)
+        return Product.objects.create(code=code, created_by=self.user, **kwargs)
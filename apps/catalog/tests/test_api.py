@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from .base import CatalogTestCase
+
+
+class ApiTests(CatalogTestCase):
+    """JSON API с ETag (apps.catalog.api)"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1', quantity=3)
+        self.create_product('A2', status='reserved')
+        self.urls = {
+            'subdivisions': reverse('api_subdivision_list'),
+            'products': reverse('api_subdivision_products', args=['S1']),
+            'product': reverse('api_product_detail', args=[self.product.pk]),
+        }
+
+    def test_data(self):
+        data = self.client.get(self.urls['subdivisions']).json()
+        self.assertEqual(
+            [(item['code'], item['product_count']) for item in data['results']], [('S1', 2)]
+        )
+
+        data = self.client.get(self.urls['products'], {'status': 'reserved'}).json()
+        self.assertEqual([item['code'] for item in data['results']], ['A2'])
+
+        data = self.client.get(self.urls['product']).json()
+        self.assertEqual((data['code'], data['quantity'], data['images']), ('A1', 3, []))
+
+    def test_cursor_pagination(self):
+        first = self.client.get(self.urls['products'], {'limit': 1}).json()
+        second = self.client.get(self.urls['products'], {'limit': 1, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(first['results']), 1)
+        self.assertEqual(
+            {first['results'][0]['code'], second['results'][0]['code']}, {'A1', 'A2'}
+        )
+        self.assertIsNone(second['next_cursor'])
+
+    def test_not_modified(self):
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                response = self.client.get(url)
+                etag = response['ETag']
+                self.assertNotIn('Last-Modified', response)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+                # 304 без выборки данных: только поиск подразделения по коду
+                with self.assertNumQueries(1 if name == 'products' else 0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_data(self):
+        url = self.urls['product']
+        etag = self.client.get(url)['ETag']
+        list_etag = self.client.get(self.urls['products'])['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.quantity = 5
+            self.product.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['quantity'], 5)
+        response = self.client.get(self.urls['products'], HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_parameters(self):
+        etag = self.client.get(self.urls['products'])['ETag']
+        response = self.client.get(self.urls['products'], {'status': 'reserved'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_unavailable(self):
+        etag = self.client.get(self.urls['product'])['ETag']
+        with mock.patch('apps.catalog.cache.cache.get_many', side_effect=ConnectionError), \
+                self.assertLogs('apps.catalog', 'ERROR'):
+            response = self.client.get(self.urls['product'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response.json()['code'], 'A1')
+
+    def test_not_found(self):
+        self.assertEqual(self.client.get(reverse('api_subdivision_products', args=['NONE'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_product_detail', args=[0])).status_code, 404)
+        self.assertEqual(self.client.post(self.urls['subdivisions']).status_code, 405)
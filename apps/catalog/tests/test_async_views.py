@@ -0,0 +1,92 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from .. import changelog
+from ..middleware import ChangeLogMiddleware
+from ..models import ChangeLog, Product
+from .base import CatalogTestCase
+
+
+class AsyncEndpointTests(CatalogTestCase):
+    """Асинхронные AJAX-представления (проверка кода, подсказки, поиск)"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_product('BOLT-1', name='болт')
+        self.create_product('NUT-1', name='гайка для BOLT')
+
+    async def test_check_product_code(self):
+        await self.async_client.aforce_login(self.user)
+        for code_index_enabled in (True, False):
+            with self.settings(CATALOG_CODE_INDEX=code_index_enabled):
+                response = await self.async_client.get('/check-code/S1/', {'code': 'BOLT-1'})
+                self.assertFalse(response.json()['valid'])
+                response = await self.async_client.get('/check-code/S1/', {'code': 'BOLT-2'})
+                self.assertTrue(response.json()['valid'])
+                response = await self.async_client.get('/check-code/NONE/', {'code': 'BOLT-1'})
+                self.assertEqual(response.status_code, 404)
+
+    async def test_check_product_code_requires_login(self):
+        response = await self.async_client.get('/check-code/S1/', {'code': 'BOLT-1'})
+        self.assertEqual(response.status_code, 302)
+
+    async def test_autocomplete(self):
+        response = await self.async_client.get('/autocomplete/', {'q': 'bolt'})
+        # Сначала совпадения по началу кода, затем по наименованию
+        self.assertEqual([item['code'] for item in response.json()['results']], ['BOLT-1', 'NUT-1'])
+
+        response = await self.async_client.get('/autocomplete/', {'q': 'b'})
+        self.assertEqual(response.json(), {'results': []})
+        response = await self.async_client.get('/autocomplete/', {'q': 'bolt', 'subdivision': 'NONE'})
+        self.assertEqual(response.json(), {'results': []})
+
+    async def test_search(self):
+        response = await self.async_client.get('/search/', {'q': 'гайка'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product.code for product in response.context['products']], ['NUT-1'])
+
+
+class ChangeLogMiddlewareTests(CatalogTestCase):
+    """Запись журнала изменений в конце запроса (sync и async)"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+        ChangeLog.objects.all().delete()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def rename(self):
+        self.product.name = 'Новое имя'
+        self.product.save()
+        self.assertTrue(changelog.has_pending())
+
+    def assert_logged(self):
+        self.assertEqual(ChangeLog.objects.get().changed_by, self.user)
+
+    def test_sync_request(self):
+        def view(request):
+            self.rename()
+            return HttpResponse()
+
+        ChangeLogMiddleware(view)(self.request)
+        self.assert_logged()
+
+    async def test_async_request(self):
+        async def view(request):
+            await sync_to_async(self.rename)()
+            return HttpResponse()
+
+        await ChangeLogMiddleware(view)(self.request)
+        await sync_to_async(self.assert_logged)()
+
+    async def test_async_request_without_changes_skips_flush(self):
+        async def view(request):
+            return HttpResponse()
+
+        with mock.patch('apps.catalog.middleware.flush') as flush:
+            await ChangeLogMiddleware(view)(self.request)
+        flush.assert_not_called()
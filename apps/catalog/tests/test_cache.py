@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..cache import bump_versions, bump_versions_on_commit, get_many_or_build, get_or_build
+from .base import CatalogTestCase
+
+
+class VersionedCacheTests(CatalogTestCase):
+    """Кэш с версионной инвалидацией (apps.catalog.cache)"""
+
+    def test_get_or_build(self):
+        builder = mock.Mock(side_effect=[1, 2])
+        self.assertEqual(get_or_build('value', ['products'], builder), 1)
+        self.assertEqual(get_or_build('value', ['products'], builder), 1)
+        # Другие части ключа - другие данные
+        self.assertEqual(get_or_build('value', ['products'], builder, parts=('x',)), 2)
+        self.assertEqual(builder.call_count, 2)
+
+    def test_bump_invalidates_dependent_data(self):
+        get_or_build('value', ['products', 'subdivision:1'], lambda: 'old')
+        get_or_build('other', ['subdivisions'], lambda: 'kept')
+
+        bump_versions('subdivision:1')
+        self.assertEqual(get_or_build('value', ['products', 'subdivision:1'], lambda: 'new'), 'new')
+        self.assertEqual(get_or_build('other', ['subdivisions'], lambda: 'new'), 'kept')
+
+    def test_bump_on_commit(self):
+        get_or_build('value', ['products'], lambda: 'old')
+        with self.captureOnCommitCallbacks() as callbacks:
+            bump_versions_on_commit('products')
+            # До фиксации действует прежняя версия
+            self.assertEqual(get_or_build('value', ['products'], lambda: 'new'), 'old')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_or_build('value', ['products'], lambda: 'new'), 'new')
+
+    def test_cache_errors_fall_back_to_builder(self):
+        with mock.patch.object(cache, 'get_many', side_effect=ConnectionError), \
+                mock.patch.object(cache, 'set_many', side_effect=ConnectionError), \
+                self.assertLogs('apps.catalog.cache', 'ERROR'):
+            self.assertEqual(get_or_build('value', ['products'], lambda: 'built'), 'built')
+            self.assertEqual(get_many_or_build('item', [1, 2], str, lambda item: item * 2), [2, 4])
+            bump_versions('products')
+
+    def test_get_many_or_build(self):
+        builder = mock.Mock(side_effect=lambda item: item * 10)
+        self.assertEqual(get_many_or_build('item', [1, 2], str, builder), [10, 20])
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            self.assertEqual(get_many_or_build('item', [2, 3, 1], str, builder), [20, 30, 10])
+        get_many.assert_called_once()
+        self.assertEqual([call.args[0] for call in builder.call_args_list], [1, 2, 3])
+
+
+class PageCacheTests(CatalogTestCase):
+    """Кэширование страниц каталога и их сброс сигналами моделей"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+        self.client.force_login(self.user)
+
+    def product_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries if 'catalog_product"' in query['sql']]
+
+    def test_subdivision_page_is_cached_until_product_changes(self):
+        self.product_queries('/S1/')
+        response, queries = self.product_queries('/S1/')
+        self.assertEqual(queries, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Новое имя'
+            self.product.save()
+        response, queries = self.product_queries('/S1/')
+        self.assertNotEqual(queries, [])
+        self.assertContains(response, 'Новое имя')
+
+    def test_product_page_is_cached_until_product_changes(self):
+        url = f'/product/{self.product.pk}/in/S1/'
+        self.product_queries(url)
+        response, queries = self.product_queries(url)
+        self.assertEqual(queries, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Новое имя'
+            self.product.save()
+        self.assertContains(self.client.get(url), 'Новое имя')
+
+    def test_home_page_follows_subdivision_rename(self):
+        self.client.get('/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subdivision.name = 'Склад готовой продукции'
+            self.subdivision.save()
+        self.assertContains(self.client.get('/'), 'Склад готовой продукции')
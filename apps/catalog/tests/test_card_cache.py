@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Product, ProductImage
+from ..views import SubdivisionProductsView
+from .base import CatalogTestCase
+
+
+class ProductCardCacheTests(CatalogTestCase):
+    """Кэширование HTML карточек на странице подразделения"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+        other = self.create_product('A2')
+        # Автор второй карточки - другой пользователь
+        Product.objects.filter(pk=other.pk).update(
+            created_by=User.objects.create_user('author', password='password')
+        )
+        self.view = SubdivisionProductsView()
+        self.view.subdivision = self.subdivision
+
+    def render_cards(self):
+        """Карточки и число отрендеренных (не взятых из кэша)"""
+        products = list(
+            Product.objects.order_by('code')
+            .select_related('subdivision', 'created_by').prefetch_related('images')
+        )
+        with mock.patch('apps.catalog.views.render_to_string', wraps=render_to_string) as render:
+            cards = self.view.get_product_cards(products)
+        return cards, render.call_count
+
+    def test_warm_cards_are_not_rendered(self):
+        cards, rendered = self.render_cards()
+        self.assertEqual(rendered, 2)
+
+        with self.assertNumQueries(2):
+            cached_cards, rendered = self.render_cards()
+        self.assertEqual(rendered, 0)
+        self.assertEqual([card for _, card in cached_cards], [card for _, card in cards])
+
+    def test_key_follows_displayed_data(self):
+        self.render_cards()
+
+        self.product.save()
+        self.assertEqual(self.render_cards()[1], 1)
+
+        image = ProductImage(product=self.product, image='product_images/S1/A1/photo.jpg', is_main=True)
+        # bulk_create - без обработки изображения в save()
+        ProductImage.objects.bulk_create([image])
+        self.assertEqual(self.render_cards()[1], 1)
+
+        ProductImage.objects.filter(pk=image.pk).update(processed_at=timezone.now())
+        self.assertEqual(self.render_cards()[1], 1)
+
+        self.user.first_name = 'Иван'
+        self.user.save()
+        self.assertEqual(self.render_cards()[1], 1)
+
+        self.subdivision.code = 'S1-NEW'
+        self.assertEqual(self.render_cards()[1], 2)
+
+    def test_page_uses_cached_cards(self):
+        self.client.force_login(self.user)
+        url = reverse('subdivision_products', args=[self.subdivision.code])
+        with mock.patch('apps.catalog.views.render_to_string', wraps=render_to_string) as render:
+            response = self.client.get(url)
+            self.client.get(url)
+        self.assertEqual(render.call_count, 2)
+        self.assertContains(response, 'Продукт A1')
@@ -0,0 +1,69 @@
+from .. import changelog
+from ..models import ChangeLog, Product
+from .base import CatalogTestCase
+
+
+class ChangeLogTests(CatalogTestCase):
+    """Буферизация журнала изменений (apps.catalog.changelog)"""
+
+    def test_changes_are_buffered_until_block_ends(self):
+        product = self.create_product('A1')
+        ChangeLog.objects.all().delete()
+
+        with changelog.collect(user=self.user):
+            product.name = 'Новое имя'
+            product.save()
+            product.status = 'reserved'
+            product.save()
+            self.assertTrue(changelog.has_pending())
+            self.assertFalse(ChangeLog.objects.exists())
+
+        self.assertFalse(changelog.has_pending())
+        entries = list(ChangeLog.objects.order_by('id'))
+        self.assertEqual([entry.action for entry in entries], ['update', 'status_change'])
+        self.assertEqual(entries[0].changes, {'name': ['Продукт A1', 'Новое имя']})
+        self.assertEqual({entry.changed_by for entry in entries}, {self.user})
+
+    def test_nested_blocks_write_once(self):
+        with changelog.collect(user=self.user):
+            with changelog.collect():
+                self.create_product('A1')
+            self.assertFalse(ChangeLog.objects.exists())
+        self.assertEqual(ChangeLog.objects.get().changed_by, self.user)
+
+    def test_change_outside_block_is_written_immediately(self):
+        product = self.create_product('A1')
+        self.assertEqual(ChangeLog.objects.get(product=product).action, 'create')
+
+    def test_save_without_changes_is_not_logged(self):
+        product = self.create_product('A1')
+        product.save()
+        self.assertEqual(ChangeLog.objects.filter(product=product).count(), 1)
+
+    def test_deleted_product_entries_are_discarded(self):
+        with changelog.collect(user=self.user):
+            product = self.create_product('A1')
+            product.delete()
+            self.assertFalse(changelog.has_pending())
+
+    def test_record_bulk(self):
+        existing = self.create_product('A1', quantity=1)
+        unchanged = self.create_product('A2')
+        ChangeLog.objects.all().delete()
+        old_values = {
+            product.pk: changelog.snapshot(product) for product in (existing, unchanged)
+        }
+
+        existing.quantity = 5
+        created = Product(code='A3', name='Новый', subdivision=self.subdivision, created_by=self.user)
+        created.save()
+        ChangeLog.objects.filter(product=created).delete()
+
+        with changelog.collect(user=self.user):
+            changelog.record_bulk(old_values, [existing, unchanged, created])
+
+        entries = {entry.product_id: entry for entry in ChangeLog.objects.all()}
+        self.assertEqual(set(entries), {existing.pk, created.pk})
+        self.assertEqual(entries[existing.pk].action, 'update')
+        self.assertEqual(entries[existing.pk].changes, {'quantity': [1, 5]})
+        self.assertEqual(entries[created.pk].action, 'create')
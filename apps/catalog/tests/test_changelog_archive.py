@@ -0,0 +1,33 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..changelog_archive import archive_changelog, find_archived_entries
+from ..models import ChangeLog
+from .base import CatalogTestCase
+
+
+class ChangeLogArchiveTests(CatalogTestCase):
+    """Перенос старых записей журнала в архив (apps.catalog.changelog_archive)"""
+
+    def test_archive_moves_old_entries(self):
+        product = self.create_product('A1')
+        for quantity in (2, 3, 4):
+            product.quantity = quantity
+            product.save()
+        old = list(ChangeLog.objects.order_by('id').values_list('id', flat=True)[:3])
+        ChangeLog.objects.filter(id__in=old).update(timestamp=timezone.now() - timedelta(days=400))
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        segments = archive_changelog(365, batch_size=1, segment_size=2, directory=directory)
+
+        self.assertEqual([segment['count'] for segment in segments], [2, 1])
+        self.assertEqual(ChangeLog.objects.count(), 1)
+        archived = find_archived_entries(product.pk, directory=directory)
+        self.assertEqual(sorted(entry['id'] for entry in archived), old)
+        self.assertEqual(archived[-1]['action'], 'create')
+        self.assertEqual(archived[0]['product_code'], 'A1')
+        self.assertEqual(find_archived_entries(product.pk + 1, directory=directory), [])
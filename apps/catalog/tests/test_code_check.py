@@ -0,0 +1,91 @@
+import json
+
+from ..models import Product
+from ..views import MAX_CHECK_CODES
+from .base import CatalogTestCase
+
+
+class ProductCodeCheckTests(CatalogTestCase):
+    """Проверка занятости кодов продуктов (одиночная и пачкой)"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_product('A1')
+        self.create_product('A2')
+        self.client.force_login(self.user)
+
+    def check_code(self, code, subdivision_code='S1'):
+        return self.client.get(f'/check-code/{subdivision_code}/', {'code': code})
+
+    def check_codes(self, codes, subdivision_code='S1'):
+        return self.client.post(
+            f'/check-codes/{subdivision_code}/',
+            json.dumps({'codes': codes}),
+            content_type='application/json'
+        )
+
+    def assert_checks(self):
+        self.assertFalse(self.check_code('A1').json()['valid'])
+        self.assertTrue(self.check_code('B1').json()['valid'])
+        self.assertFalse(self.check_code('').json()['valid'])
+        self.assertEqual(self.check_code('A1', subdivision_code='NONE').status_code, 404)
+
+        response = self.check_codes(['A1', 'B1', ' A2 ', 'B1', ''])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'results': {'A1': False, 'B1': True, 'A2': False},
+            'taken': ['A1', 'A2'],
+        })
+        response = self.client.get('/check-codes/S1/', {'code': ['A2', 'C1']})
+        self.assertEqual(response.json()['taken'], ['A2'])
+
+    def test_checks_with_code_index(self):
+        with self.settings(CATALOG_CODE_INDEX=True):
+            self.assert_checks()
+
+    def test_checks_without_code_index(self):
+        with self.settings(CATALOG_CODE_INDEX=False):
+            self.assert_checks()
+
+    def test_code_index_sees_committed_changes(self):
+        with self.settings(CATALOG_CODE_INDEX=True):
+            self.assertTrue(self.check_code('B1').json()['valid'])
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_product('B1')
+            self.assertFalse(self.check_code('B1').json()['valid'])
+
+            product = Product.objects.get(code='A1')
+            with self.captureOnCommitCallbacks(execute=True):
+                product.code = 'A9'
+                product.save()
+            self.assertTrue(self.check_code('A1').json()['valid'])
+            self.assertFalse(self.check_code('A9').json()['valid'])
+
+    def test_codes_limit(self):
+        codes = [f'C{number}' for number in range(MAX_CHECK_CODES)]
+        response = self.check_codes(codes)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), MAX_CHECK_CODES)
+
+        response = self.check_codes(codes + ['C-extra'])
+        self.assertEqual(response.status_code, 400)
+
+        # Повторы не считаются
+        response = self.check_codes(codes + codes[:10])
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_request(self):
+        response = self.client.post('/check-codes/S1/', 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/check-codes/S1/', json.dumps({'codes': 'A1'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.check_codes(['A1'], subdivision_code='NONE').status_code, 404)
+
+    def test_empty_codes(self):
+        for code_index_enabled in (True, False):
+            with self.settings(CATALOG_CODE_INDEX=code_index_enabled):
+                response = self.check_codes([])
+                self.assertEqual(response.json(), {'results': {}, 'taken': []})
+                # Подразделение проверяется и без кодов
+                self.assertEqual(self.check_codes([], subdivision_code='NONE').status_code, 404)
+                self.assertEqual(self.client.get('/check-codes/NONE/').status_code, 404)
@@ -0,0 +1,80 @@
+import io
+
+from django.core.management import call_command
+
+from ..models import Product, ProductCounter, Subdivision
+from .base import CatalogTestCase
+
+
+class ProductCounterTests(CatalogTestCase):
+    """Инкрементальные счетчики продуктов (ProductCounter)"""
+
+    def counters(self):
+        return {
+            (counter.subdivision.code, counter.status, counter.condition): counter.count
+            for counter in ProductCounter.objects.select_related('subdivision').filter(count__gt=0)
+        }
+
+    def test_create_and_delete(self):
+        product = self.create_product('A1')
+        self.create_product('A2', condition='new')
+        self.assertEqual(self.counters(), {('S1', 'available', 'used'): 1, ('S1', 'available', 'new'): 1})
+
+        product.delete()
+        self.assertEqual(self.counters(), {('S1', 'available', 'new'): 1})
+
+    def test_status_and_subdivision_change(self):
+        other = Subdivision.objects.create(code='S2', name='Склад 2')
+        self.create_product('A1')
+
+        product = Product.objects.get(code='A1')
+        product.status = 'reserved'
+        product.save()
+        self.assertEqual(self.counters(), {('S1', 'reserved', 'used'): 1})
+
+        product = Product.objects.get(code='A1')
+        product.subdivision = other
+        product.save()
+        self.assertEqual(self.counters(), {('S2', 'reserved', 'used'): 1})
+
+        # Сохранение без изменения ключа счетчики не меняет
+        product.name = 'Новое имя'
+        product.save()
+        self.assertEqual(self.counters(), {('S2', 'reserved', 'used'): 1})
+
+    def test_adjust(self):
+        ProductCounter.adjust(self.subdivision.pk, 'used', 'new', 2)
+        ProductCounter.adjust(self.subdivision.pk, 'used', 'new', -1)
+        # Несуществующий счетчик не создается уменьшением
+        ProductCounter.adjust(self.subdivision.pk, 'written_off', 'new', -1)
+        self.assertEqual(self.counters(), {('S1', 'used', 'new'): 1})
+
+    def test_recount(self):
+        self.create_product('A1')
+        self.create_product('A2')
+        # Массовое обновление не отправляет сигналы
+        Product.objects.filter(code='A2').update(status='used')
+        ProductCounter.objects.filter(status='available').update(count=10)
+
+        call_command('recount_product_counters', stdout=io.StringIO())
+        self.assertEqual(self.counters(), {('S1', 'available', 'used'): 1, ('S1', 'used', 'used'): 1})
+
+    def test_home_page_uses_counters(self):
+        self.create_product('A1')
+        self.create_product('A2', status='reserved')
+        self.client.force_login(self.user)
+
+        response = self.client.get('/')
+        self.assertEqual(response.context['total_products'], 2)
+        self.assertEqual(
+            {stat['status']: stat['count'] for stat in response.context['status_stats']},
+            {'available': 1, 'reserved': 1}
+        )
+        self.assertEqual(response.context['subdivisions'][0].product_count, 2)
+
+        # Кэш страницы сбрасывается после фиксации изменения
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(code='A1').delete()
+        response = self.client.get('/')
+        self.assertEqual(response.context['total_products'], 1)
+        self.assertEqual(response.context['subdivisions'][0].product_count, 1)
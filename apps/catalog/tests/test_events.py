@@ -0,0 +1,91 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from .. import events
+from ..models import ProductImage
+from .base import CatalogTestCase, in_memory_storage, make_image
+
+
+class LocalEventsTests(CatalogTestCase):
+    """Замена Redis pub/sub в памяти процесса"""
+
+    async def test_publish_and_subscribe(self):
+        async with events.subscribe(1) as subscription:
+            # Публикация из потока задачи (sync)
+            await sync_to_async(events.publish, thread_sensitive=False)(1, {'id': 5})
+            events.publish(2, {'id': 6})
+            self.assertEqual(json.loads(await subscription.get(1)), {'id': 5})
+            self.assertIsNone(await subscription.get(0.01))
+        self.assertNotIn(1, events._local_subscribers)
+
+
+@in_memory_storage
+class ImageEventsViewTests(CatalogTestCase):
+    """Поток Server-Sent Events о готовности изображений"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+        with mock.patch('apps.catalog.tasks.process_product_image.delay'):
+            self.done = ProductImage.objects.create(product=self.product, image=make_image(color='red'))
+            self.pending = ProductImage.objects.create(product=self.product, image=make_image(color='blue'))
+        ProductImage.objects.filter(pk=self.done.pk).update(processing_status=ProductImage.PROCESSING_DONE)
+        self.url = f'/product/{self.product.pk}/image-events/'
+
+    async def read_events(self, response):
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        return [
+            (chunk.split('\n')[0][len('event: '):], json.loads(chunk.split('\n')[1][len('data: '):]))
+            for chunk in chunks if chunk.startswith('event: ')
+        ]
+
+    async def test_processed_images_are_sent_first(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, {'images': str(self.done.pk)})
+        self.assertEqual(
+            [(event, data.get('id'), data.get('status')) for event, data in await self.read_events(response)],
+            [('image', self.done.pk, 'done'), ('end', None, None)]
+        )
+
+    async def test_stream_ends_when_awaited_images_finish(self):
+        await self.async_client.aforce_login(self.user)
+        waiting = f'{self.done.pk},{self.pending.pk}'
+        response = await self.async_client.get(self.url, {'images': waiting})
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.2, events.publish, self.product.pk, {'id': self.pending.pk, 'status': 'processing'})
+        loop.call_later(0.3, events.publish, self.product.pk, {'id': self.pending.pk, 'status': 'failed'})
+        received = await asyncio.wait_for(self.read_events(response), 5)
+
+        self.assertEqual(
+            [(event, data.get('id'), data.get('status')) for event, data in received],
+            [
+                ('image', self.done.pk, 'done'),
+                ('image', self.pending.pk, 'processing'),
+                ('image', self.pending.pk, 'failed'),
+                ('end', None, None),
+            ]
+        )
+
+    async def test_deleted_images_are_not_awaited(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, {'images': '999999'})
+        self.assertEqual(await self.read_events(response), [('end', {})])
+
+    async def test_invalid_requests(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, {'images': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.get('/product/999999/image-events/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_image_event(self):
+        done = ProductImage.objects.get(pk=self.done.pk)
+        event = events.image_event(done)
+        self.assertEqual((event['id'], event['status'], event['error']), (done.pk, 'done', ''))
+        self.assertEqual(event['url'], done.get_rendition_url('card'))
+        self.assertIsNone(events.image_event(self.pending)['url'])
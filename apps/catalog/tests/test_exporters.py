@@ -0,0 +1,73 @@
+import csv
+import io
+
+from django.urls import reverse
+
+from ..exporters import EXPORT_COLUMNS
+from ..importers import import_products
+from ..models import Product
+from .base import CatalogTestCase
+
+
+class ProductExportTests(CatalogTestCase):
+    """Потоковая выгрузка продуктов подразделения (apps.catalog.exporters)"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_product('B2', status='reserved', characteristics={'длина': 10})
+        self.create_product('A1', quantity=3, location='Стеллаж 1')
+        self.url = reverse('export_subdivision_products', args=['S1'])
+        self.client.force_login(self.user)
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(content[1:]), delimiter=';'))
+
+    def test_csv(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('products_S1_', response['Content-Disposition'])
+
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual([row[0] for row in rows[1:]], ['A1', 'B2'])
+        a1 = dict(zip(EXPORT_COLUMNS, rows[1]))
+        self.assertEqual((a1['quantity'], a1['location'], a1['created_by']), ('3', 'Стеллаж 1', 'admin'))
+        self.assertEqual(dict(zip(EXPORT_COLUMNS, rows[2]))['characteristics'], '{"длина": 10}')
+
+    def test_filters_match_listing(self):
+        rows = self.read_csv(self.client.get(self.url, {'status': 'reserved'}))
+        self.assertEqual([row[0] for row in rows[1:]], ['B2'])
+
+    def test_csv_can_be_imported_back(self):
+        content = b''.join(self.client.get(self.url).streaming_content)
+        Product.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_products(io.BytesIO(content), 'export.csv', user=self.user)
+        self.assertEqual((report.created, report.errors), (2, []))
+        product = Product.objects.get(code='B2')
+        self.assertEqual((product.status, product.characteristics), ('reserved', {'длина': 10}))
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(self.url, {'format': 'xlsx'})
+        self.assertEqual(
+            response['Content-Type'],
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        self.assertIn('.xlsx', response['Content-Disposition'])
+
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        workbook.close()
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual([row[0] for row in rows[1:]], ['A1', 'B2'])
+        self.assertEqual(rows[1][EXPORT_COLUMNS.index('quantity')], 3)
+
+    def test_unknown_subdivision(self):
+        response = self.client.get(reverse('export_subdivision_products', args=['NONE']))
+        self.assertEqual(response.status_code, 404)
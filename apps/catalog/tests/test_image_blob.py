@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+
+from ..models import ImageBlob, ProductImage
+from .base import CatalogTestCase
+
+
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+})
+class ImageBlobTests(CatalogTestCase):
+    """Дедупликация одинаковых изображений через ImageBlob"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+        self.other_product = self.create_product('A2')
+
+    def upload(self, product, content=b'first image', name='photo.jpg'):
+        return ProductImage.objects.create(product=product, image=SimpleUploadedFile(name, content))
+
+    def test_same_content_shares_blob(self):
+        first = self.upload(self.product)
+        second = self.upload(self.other_product, name='copy.jpg')
+
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('image_blobs/'))
+        self.assertEqual(ImageBlob.objects.get().ref_count, 2)
+
+    def test_different_content_gets_own_blob(self):
+        first = self.upload(self.product)
+        second = self.upload(self.product, content=b'second image')
+        self.assertNotEqual(first.blob_id, second.blob_id)
+        self.assertEqual(ImageBlob.objects.count(), 2)
+
+    def test_processed_blob_is_not_processed_again(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            first = self.upload(self.product)
+        self.assertIn(first.dispatch_processing, callbacks)
+        first.blob.processed_at = timezone.now()
+        first.blob.save(update_fields=['processed_at'])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            second = self.upload(self.other_product)
+        self.assertEqual(second.processing_status, ProductImage.PROCESSING_DONE)
+        self.assertNotIn(second.dispatch_processing, callbacks)
+
+    def test_release_keeps_file_until_last_reference(self):
+        first = self.upload(self.product)
+        second = self.upload(self.other_product)
+        name = first.image.name
+
+        first.delete()
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        second.delete()
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_claim_processing(self):
+        blob = self.upload(self.product).blob
+        self.assertTrue(blob.claim_processing())
+        # Параллельная задача того же файла обработку не получает
+        self.assertFalse(ImageBlob.objects.get(pk=blob.pk).claim_processing(force=True))
+
+        blob.finish_processing(processed=True)
+        self.assertIsNone(ImageBlob.objects.get(pk=blob.pk).processing_started_at)
+        self.assertFalse(blob.claim_processing())
+        self.assertTrue(blob.claim_processing(force=True))
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .. import image_pipeline
+from ..image_pipeline import OPTIMIZED_SIZE, THUMBNAIL_SIZE, process_stored_image, source_stem
+from ..models import ImageBlob, ProductImage
+from .base import CatalogTestCase, in_memory_storage, list_files, make_image
+
+
+@in_memory_storage
+class ImagePipelineTests(CatalogTestCase):
+    """Обработка изображения за одно декодирование (apps.catalog.image_pipeline)"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+
+    def upload(self, product=None, **kwargs):
+        return ProductImage.objects.create(product=product or self.product, image=make_image(**kwargs))
+
+    def process(self, product_image, **kwargs):
+        product_image = ProductImage.objects.select_related('blob').get(pk=product_image.pk)
+        timings = process_stored_image(product_image, **kwargs)
+        return ProductImage.objects.get(pk=product_image.pk), timings
+
+    def open_image(self, field_file):
+        with default_storage.open(field_file.name) as file:
+            return Image.open(file).size
+
+    def test_outputs(self):
+        product_image, timings = self.process(self.upload(size=(3000, 2000)))
+
+        width, height = self.open_image(product_image.image)
+        self.assertLessEqual(width, OPTIMIZED_SIZE[0])
+        self.assertLessEqual(height, OPTIMIZED_SIZE[1])
+        width, height = self.open_image(product_image.thumbnail)
+        self.assertLessEqual(max(width, height), max(THUMBNAIL_SIZE))
+        self.assertEqual(set(product_image.renditions), {'admin', 'card', 'detail'})
+        self.assertEqual(product_image.processing_status, ProductImage.PROCESSING_DONE)
+        self.assertTrue({'decode', 'optimize', 'thumbnail', 'renditions', 'write'} <= set(timings))
+
+    def test_image_is_decoded_once(self):
+        product_image = self.upload(size=(2000, 1500))
+        with mock.patch.object(image_pipeline, 'decode_image', wraps=image_pipeline.decode_image) as decode:
+            self.process(product_image)
+        decode.assert_called_once()
+
+    def test_reprocessing_replaces_files(self):
+        product_image, _ = self.process(self.upload())
+        files = list_files(default_storage)
+        thumbnail_stem = source_stem(product_image.thumbnail.name)
+
+        for _ in range(2):
+            product_image, _ = self.process(product_image, force=True)
+            self.assertEqual(len(list_files(default_storage)), len(files))
+            # Имена не удлиняются суффиксами хранилища при каждой обработке
+            self.assertEqual(source_stem(product_image.thumbnail.name), thumbnail_stem)
+
+    def test_shared_file_is_processed_for_all_images(self):
+        first = self.upload()
+        second = self.upload(product=self.create_product('A2'))
+
+        self.process(first)
+
+        blob = ImageBlob.objects.get()
+        self.assertIsNotNone(blob.processed_at)
+        for product_image in ProductImage.objects.all():
+            self.assertEqual(product_image.thumbnail.name, blob.thumbnail.name)
+            self.assertEqual(product_image.renditions, blob.renditions)
+            self.assertEqual(product_image.processing_status, ProductImage.PROCESSING_DONE)
+        self.assertEqual(second.blob_id, blob.pk)
@@ -0,0 +1,132 @@
+import io
+
+from ..importers import ProductImporter, import_products, read_rows
+from ..models import ChangeLog, Product, ProductCounter
+from ..search import get_search_engine
+from .base import CatalogTestCase
+
+
+def csv_file(*lines):
+    return io.BytesIO('\n'.join(lines).encode('utf-8'))
+
+
+class ProductImportTests(CatalogTestCase):
+    """Пакетный импорт продуктов (apps.catalog.importers)"""
+
+    def run_import(self, *lines, **options):
+        options.setdefault('subdivision', self.subdivision)
+        options.setdefault('user', self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_products(csv_file(*lines), 'products.csv', **options)
+
+    def counters(self):
+        return {
+            (counter.status, counter.condition): counter.count
+            for counter in ProductCounter.objects.filter(subdivision=self.subdivision)
+        }
+
+    def test_creates_products_in_batches(self):
+        report = self.run_import(
+            'Код;Наименование;Количество;Дата постановки на хранение',
+            'A1;Болт;5;01.02.2024',
+            'A2;Гайка;;2024-03-01',
+            'A3;Шайба;1;',
+            batch_size=2,
+        )
+        self.assertEqual((report.created, report.updated, report.errors), (3, 0, []))
+        product = Product.objects.get(code='A2')
+        self.assertEqual(product.quantity, 1)
+        self.assertEqual(product.storage_date.isoformat(), '2024-03-01')
+        self.assertEqual(product.created_by, self.user)
+
+    def test_row_errors_keep_file_row_numbers(self):
+        self.create_product('A9')
+        report = self.run_import(
+            'code,name,storage_date,subdivision',
+            'A1,Болт,,',
+            '',
+            'A2,Гайка,31.31.2024,',
+            'A1,Болт повторно,,',
+            'A9,Существующий,,',
+            'A3,Чужой,,NONE',
+            ',Без кода,,',
+        )
+        self.assertEqual(report.created, 1)
+        errors = {row: code for row, code, _ in report.errors}
+        # Пустая строка 3 пропущена, но учтена в нумерации
+        self.assertEqual(errors, {4: 'A2', 5: 'A1', 6: 'A9', 7: 'A3', 8: ''})
+        self.assertIn('Неверная дата', dict((row, message) for row, _, message in report.errors)[4])
+
+    def test_rejected_batch_is_written_row_by_row(self):
+        # Продукт с тем же кодом создан после загрузки множества кодов
+        importer = ProductImporter(subdivision=self.subdivision, user=self.user, batch_size=10)
+        importer.get_codes(self.subdivision)
+        self.create_product('A2')
+
+        rows = read_rows(csv_file('code;name', 'A1;Болт', 'A2;Гайка', 'A3;Шайба'), 'products.csv')
+        report = importer.run(rows)
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual([(row, code) for row, code, _ in report.errors], [(3, 'A2')])
+        self.assertEqual(
+            set(Product.objects.values_list('code', flat=True)), {'A1', 'A2', 'A3'}
+        )
+        self.assertEqual(Product.objects.get(code='A2').name, 'Продукт A2')
+
+    def test_update_existing(self):
+        existing = self.create_product('A1', quantity=1)
+        report = self.run_import(
+            'code;name;quantity;status',
+            'A1;Болт М8;7;reserved',
+            'A2;Гайка;1;',
+            update_existing=True,
+        )
+        self.assertEqual((report.created, report.updated, report.errors), (1, 1, []))
+        existing.refresh_from_db()
+        self.assertEqual((existing.name, existing.quantity, existing.status), ('Болт М8', 7, 'reserved'))
+        self.assertEqual(Product.objects.count(), 2)
+
+        entry = ChangeLog.objects.filter(product=existing).latest('id')
+        self.assertEqual(entry.action, 'status_change')
+        self.assertEqual(entry.changes['quantity'], [1, 7])
+        self.assertEqual(self.counters(), {('reserved', 'used'): 1, ('available', 'used'): 1})
+
+    def test_side_effects_of_bulk_write(self):
+        self.run_import('code;name;condition', 'A1;Болт;new', 'A2;Гайка;')
+
+        self.assertEqual(self.counters(), {('available', 'new'): 1, ('available', 'used'): 1})
+        self.assertEqual(
+            [product.code for product in get_search_engine().search('гайка')], ['A2']
+        )
+        entries = ChangeLog.objects.filter(product__code__in=['A1', 'A2'])
+        self.assertEqual(sorted(entries.values_list('action', flat=True)), ['create', 'create'])
+        self.assertEqual({entry.changed_by for entry in entries}, {self.user})
+
+        self.client.force_login(self.user)
+        response = self.client.get('/check-codes/S1/', {'code': ['A1', 'B1']})
+        self.assertEqual(response.json()['taken'], ['A1'])
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import('code;name', 'A1;Болт', 'A1;Болт', dry_run=True)
+        self.assertEqual((report.created, report.failed), (1, 1))
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(ProductCounter.objects.exists())
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['Код продукции', 'Наименование', 'Количество'])
+        sheet.append(['A1', 'Болт', 3])
+        sheet.append([None, None, None])
+        sheet.append(['A2', None, 1])
+        file = io.BytesIO()
+        workbook.save(file)
+        file.seek(0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_products(file, 'products.xlsx', subdivision=self.subdivision)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([(row, code) for row, code, _ in report.errors], [(4, 'A2')])
+        self.assertEqual(Product.objects.get(code='A1').quantity, 3)
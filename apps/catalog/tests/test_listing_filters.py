@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Product, ProductCounter
+from .base import CatalogTestCase
+
+
+class SubdivisionFilterTests(CatalogTestCase):
+    """Фильтры страницы подразделения в SQL и количество из счетчиков"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_product('A1', location='Стеллаж 1')
+        self.create_product('A2', status='reserved', location='Стеллаж 2')
+        self.create_product('A3', status='reserved', condition='new')
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        response = self.client.get('/S1/', params)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        return sorted(product.code for product in page), page.paginator.count
+
+    def test_status_and_condition(self):
+        self.assertEqual(self.get(), (['A1', 'A2', 'A3'], 3))
+        self.assertEqual(self.get(status='reserved'), (['A2', 'A3'], 2))
+        self.assertEqual(self.get(status='reserved', condition='new'), (['A3'], 1))
+        # Неизвестные значения отбрасываются
+        self.assertEqual(self.get(status='unknown'), (['A1', 'A2', 'A3'], 3))
+
+    def test_location_and_dates(self):
+        Product.objects.filter(code='A1').update(created_at=timezone.now() - timedelta(days=10))
+        today = timezone.localdate()
+
+        self.assertEqual(self.get(location='Стеллаж'), (['A1', 'A2'], 2))
+        self.assertEqual(self.get(date_from=today.isoformat()), (['A2', 'A3'], 2))
+        self.assertEqual(
+            self.get(date_to=(today - timedelta(days=5)).isoformat(), location='Стеллаж'),
+            (['A1'], 1)
+        )
+
+    def test_count_comes_from_counters(self):
+        ProductCounter.objects.filter(status='reserved', condition='new').update(count=10)
+        self.assertEqual(self.get(status='reserved'), (['A2', 'A3'], 11))
+
+    def test_count_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product('A4', status='reserved')
+        self.assertEqual(self.get(status='reserved')[1], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.get(code='A4')
+            product.status = 'used'
+            product.save()
+        self.assertEqual(self.get(status='reserved')[1], 2)
+        self.assertEqual(self.get(status='used')[1], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(code='A1').delete()
+        self.assertEqual(self.get(), (['A2', 'A3', 'A4'], 3))
+
+        # Пересчет восстанавливает счетчики, испорченные массовым обновлением
+        ProductCounter.objects.update(count=0)
+        ProductCounter.recount([self.subdivision.pk])
+        cache.clear()
+        self.assertEqual(self.get(status='reserved')[1], 2)
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+
+from ..models import ProductImage
+from ..permissions import PermissionContext
+from .base import CatalogTestCase, make_image
+
+
+class ProtectedMediaTests(CatalogTestCase):
+    """Выдача медиафайлов с проверкой прав (apps.catalog.media)"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE_BACKEND='nginx')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.name = default_storage.save('product_images/S1/A1/photo 1.jpg', ContentFile(b'jpeg data'))
+        self.client.force_login(self.user)
+
+    def get(self, name, **kwargs):
+        return self.client.get(f'/media/{name}', **kwargs)
+
+    def test_nginx(self):
+        response = self.get(self.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/product_images/S1/A1/photo%201.jpg')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response.content, b'')
+        self.assertIn('private', response['Cache-Control'])
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='apache')
+    def test_apache(self):
+        response = self.get(self.name)
+        self.assertEqual(response['X-Sendfile'], default_storage.path(self.name))
+        self.assertEqual(self.client.head(f'/media/{self.name}').status_code, 200)
+        self.assertEqual(self.client.post(f'/media/{self.name}').status_code, 405)
+
+    def test_unknown_and_disallowed_files(self):
+        default_storage.save('other/notes.txt', ContentFile(b'secret'))
+        for name in ('product_images/NONE/A1/photo.jpg', 'other/notes.txt', 'product_images/S1/../../other/notes.txt'):
+            with self.subTest(name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+        with mock.patch.object(PermissionContext, 'can_view_subdivision', return_value=False):
+            self.assertEqual(self.get(self.name).status_code, 404)
+
+    def test_shared_image_file(self):
+        product_image = ProductImage.objects.create(product=self.create_product('A1'), image=make_image())
+        self.assertTrue(product_image.image.name.startswith('image_blobs/'))
+        self.assertEqual(self.get(product_image.image.name).status_code, 200)
+
+        product_image.delete()
+        self.assertEqual(self.get(product_image.image.name).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND=None)
+    def test_without_backend(self):
+        # Без DEBUG процесс Django файлы не отдает
+        with self.assertRaises(ImproperlyConfigured):
+            self.get(self.name)
+
+        with self.settings(DEBUG=True):
+            response = self.get(self.name)
+            self.assertEqual(b''.join(response.streaming_content), b'jpeg data')
+
+            os.remove(default_storage.path(self.name))
+            self.assertEqual(self.get(self.name).status_code, 404)
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.utils import timezone
+
+from ..models import Product
+from ..pagination import CursorPaginator, decode_cursor, encode_cursor
+from ..views import SubdivisionProductsView
+from .base import CatalogTestCase
+
+
+class CursorPaginationTests(CatalogTestCase):
+    """Курсорная пагинация по (created_at, id)"""
+
+    def setUp(self):
+        super().setUp()
+        self.products = [self.create_product(f'A{number}') for number in range(5)]
+        # Одинаковое время создания - порядок определяет id
+        Product.objects.update(created_at=timezone.now())
+        self.expected = [product.pk for product in reversed(self.products)]
+
+    def get_page(self, cursor=None, per_page=2):
+        return CursorPaginator(Product.objects.all(), per_page).page(cursor)
+
+    def ids(self, page):
+        return [product.pk for product in page]
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        cursor = encode_cursor(created_at, 42, 'next')
+        self.assertEqual(decode_cursor(cursor), (created_at, 42, 'next'))
+
+    def test_invalid_cursor(self):
+        for cursor in ('', 'garbage', encode_cursor(timezone.now(), 1, 'next')[:-3]):
+            self.assertIsNone(decode_cursor(cursor))
+        page = self.get_page('garbage')
+        self.assertEqual(self.ids(page), self.expected[:2])
+        self.assertFalse(page.has_previous())
+
+    def test_forward_through_all_pages(self):
+        first = self.get_page()
+        self.assertEqual(self.ids(first), self.expected[:2])
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        self.assertIsNone(first.previous_cursor)
+
+        second = self.get_page(first.next_cursor)
+        self.assertEqual(self.ids(second), self.expected[2:4])
+        self.assertTrue(second.has_next())
+        self.assertTrue(second.has_previous())
+
+        last = self.get_page(second.next_cursor)
+        self.assertEqual(self.ids(last), self.expected[4:])
+        self.assertFalse(last.has_next())
+        self.assertIsNone(last.next_cursor)
+
+    def test_backward_from_last_page(self):
+        second = self.get_page(self.get_page().next_cursor)
+        last = self.get_page(second.next_cursor)
+
+        back = self.get_page(last.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertTrue(back.has_next())
+
+        first = self.get_page(back.previous_cursor)
+        self.assertEqual(self.ids(first), self.expected[:2])
+        self.assertFalse(first.has_previous())
+
+    def test_exact_page_size(self):
+        page = self.get_page(per_page=5)
+        self.assertEqual(self.ids(page), self.expected)
+        self.assertFalse(page.has_other_pages())
+
+    def test_empty_queryset(self):
+        page = CursorPaginator(Product.objects.none(), 2).page()
+        self.assertEqual(len(page), 0)
+        self.assertIsNone(page.next_cursor)
+        self.assertIsNone(page.previous_cursor)
+
+    @mock.patch.object(SubdivisionProductsView, 'paginate_by', 2)
+    def test_subdivision_page_uses_cursor(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/S1/')
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(self.ids(page), self.expected[:2])
+
+        response = self.client.get('/S1/', {'cursor': page.next_cursor})
+        self.assertEqual(self.ids(response.context['page_obj']), self.expected[2:4])
@@ -0,0 +1,74 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import Group, Permission, User
+from django.test import RequestFactory
+from django.urls import reverse
+
+from ..models import Product, Profile, Subdivision
+from ..permissions import get_permission_context
+from .base import CatalogTestCase
+
+
+class PermissionContextTests(CatalogTestCase):
+    """Права пользователя на время запроса (apps.catalog.permissions)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_subdivision = Subdivision.objects.create(code='S2', name='Склад 2')
+        cls.editor = User.objects.create_user('editor', password='password', is_staff=True)
+        cls.editor.groups.add(Group.objects.create(name='Editor'))
+        cls.editor.user_permissions.add(*Permission.objects.filter(
+            codename__in=['view_product', 'change_product', 'delete_product']
+        ))
+        Profile.objects.create(user=cls.editor, subdivision=cls.subdivision)
+
+    def setUp(self):
+        super().setUp()
+        self.own_product = self.create_product('A1')
+        self.other_product = self.create_product('B1', subdivision=self.other_subdivision)
+
+    def get_context(self):
+        # Новый объект пользователя - новый запрос
+        return get_permission_context(User.objects.get(pk=self.editor.pk))
+
+    def test_editor_rules(self):
+        permissions = self.get_context()
+        self.assertTrue(permissions.can_edit(self.own_product))
+        self.assertFalse(permissions.can_delete(self.own_product))
+        self.assertTrue(permissions.can_add_product(self.subdivision))
+        self.assertFalse(permissions.can_edit(self.other_product))
+        self.assertFalse(permissions.can_add_product(self.other_subdivision))
+        self.assertTrue(permissions.can_view(self.other_product))
+
+    def test_profile_and_groups_are_loaded_once(self):
+        permissions = self.get_context()
+        with self.assertNumQueries(2):
+            for _ in range(3):
+                permissions.can_edit(self.own_product)
+                permissions.can_delete(self.other_product)
+                permissions.can_add_product(self.subdivision)
+        self.assertIs(get_permission_context(permissions.user), permissions)
+
+    def test_detail_page_uses_request_permissions(self):
+        self.client.force_login(self.editor)
+        response = self.client.get(
+            reverse('product_detail', args=[self.own_product.pk, self.subdivision.code])
+        )
+        self.assertContains(response, reverse('product_update', kwargs={'pk': self.own_product.pk}))
+        self.assertNotContains(response, reverse('product_delete', kwargs={'pk': self.own_product.pk}))
+
+        response = self.client.get(
+            reverse('product_detail', args=[self.other_product.pk, self.other_subdivision.code])
+        )
+        self.assertNotContains(response, reverse('product_update', kwargs={'pk': self.other_product.pk}))
+
+    def test_admin_checks_object_permissions(self):
+        model_admin = site._registry[Product]
+        request = RequestFactory().get('/admin/')
+        request.user = User.objects.get(pk=self.editor.pk)
+
+        self.assertTrue(model_admin.has_change_permission(request))
+        self.assertTrue(model_admin.has_change_permission(request, self.own_product))
+        self.assertFalse(model_admin.has_change_permission(request, self.other_product))
+        self.assertFalse(model_admin.has_delete_permission(request, self.own_product))
+        self.assertTrue(model_admin.has_view_permission(request, self.other_product))
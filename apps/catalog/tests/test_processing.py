@@ -0,0 +1,73 @@
+from unittest import mock
+
+from .. import tasks
+from ..models import ProductImage
+from .base import CatalogTestCase, in_memory_storage, make_image
+
+
+@in_memory_storage
+class ImageProcessingStateTests(CatalogTestCase):
+    """Запуск обработки после фиксации и состояние обработки изображения"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+
+    def upload(self):
+        with mock.patch.object(tasks.process_product_image, 'delay'):
+            return ProductImage.objects.create(product=self.product, image=make_image())
+
+    def test_processing_starts_after_commit(self):
+        with mock.patch.object(tasks.process_product_image, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                product_image = ProductImage.objects.create(product=self.product, image=make_image())
+                delay.assert_not_called()
+        delay.assert_called_once_with(product_image.pk)
+        self.assertEqual(product_image.processing_status, ProductImage.PROCESSING_PENDING)
+
+    def test_broker_error_does_not_break_upload(self):
+        with mock.patch.object(tasks.process_product_image, 'delay', side_effect=ConnectionError), \
+                self.assertLogs('apps.catalog.models', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                product_image = ProductImage.objects.create(product=self.product, image=make_image())
+        self.assertTrue(ProductImage.objects.filter(pk=product_image.pk).exists())
+
+    def test_task_marks_image_processed(self):
+        product_image = self.upload()
+        result = tasks.process_product_image(product_image.pk)
+
+        product_image.refresh_from_db()
+        self.assertEqual(product_image.processing_status, ProductImage.PROCESSING_DONE)
+        self.assertIsNotNone(product_image.processed_at)
+        self.assertTrue(product_image.thumbnail)
+        self.assertIn('decode', result['timings'])
+
+    def test_repeated_delivery_is_skipped(self):
+        product_image = self.upload()
+        tasks.process_product_image(product_image.pk)
+
+        with mock.patch.object(tasks, 'process_stored_image') as process:
+            result = tasks.process_product_image(product_image.pk)
+        process.assert_not_called()
+        self.assertEqual(result['timings'], {})
+
+        # Перегенерация миниатюр обрабатывает заново
+        with mock.patch.object(tasks, 'process_stored_image', return_value={}) as process:
+            tasks.create_thumbnail(product_image.pk)
+        process.assert_called_once()
+
+    def test_failure_is_recorded(self):
+        product_image = self.upload()
+        with mock.patch.object(tasks, 'process_stored_image', side_effect=OSError('битый файл')), \
+                self.assertLogs('apps.catalog.tasks', 'ERROR'):
+            with self.assertRaises(OSError):
+                tasks.process_product_image(product_image.pk)
+
+        product_image.refresh_from_db()
+        self.assertEqual(product_image.processing_status, ProductImage.PROCESSING_FAILED)
+        self.assertEqual(product_image.processing_error, 'битый файл')
+
+    def test_deleted_image_is_skipped(self):
+        image_id = self.upload().pk
+        ProductImage.objects.filter(pk=image_id).delete()
+        self.assertIsNone(tasks.process_product_image(image_id))
@@ -0,0 +1,81 @@
+from django.template import Context, Template
+from PIL import Image
+
+from ..image_pipeline import build_renditions, get_rendition_formats, process_stored_image
+from ..models import ProductImage
+from .base import CatalogTestCase, in_memory_storage, make_image
+
+RENDITIONS = {
+    'card': {'widths': [320, 640], 'sizes': '33vw'},
+    'detail': {'widths': [640, 1280], 'sizes': '50vw'},
+}
+
+
+class BuildRenditionsTests(CatalogTestCase):
+    """Адаптивные варианты изображения (build_renditions)"""
+
+    def widths(self, size):
+        with self.settings(IMAGE_RENDITIONS=RENDITIONS):
+            outputs, formats = build_renditions(Image.new('RGB', size), 'products/photo_AbC1234.jpg')
+        self.assertEqual(formats[-1], 'jpeg')
+        return {width: by_format['jpeg'] for width, by_format in outputs.items()}
+
+    def test_widths_and_names(self):
+        outputs = self.widths((2000, 1000))
+        self.assertEqual(sorted(outputs), [320, 640, 1280])
+        name, _, size = outputs[640]
+        self.assertEqual(name, 'photo_640.jpg')
+        self.assertEqual(size, (640, 320))
+
+    def test_small_source_is_not_upscaled(self):
+        outputs = self.widths((500, 300))
+        self.assertEqual(outputs[320][0], 'photo_320.jpg')
+        # Ширины не меньше исходной - один общий вариант в исходном размере
+        self.assertEqual(outputs[640][0], 'photo_500.jpg')
+        self.assertIs(outputs[640], outputs[1280])
+        self.assertEqual(outputs[1280][2], (500, 300))
+
+    def test_portrait_uses_largest_side(self):
+        outputs = self.widths((300, 900))
+        self.assertEqual(outputs[640][2], (213, 640))
+        self.assertEqual(outputs[1280][0], 'photo_900.jpg')
+
+
+@in_memory_storage
+class PictureTagTests(CatalogTestCase):
+    """Тег {% picture %} и сохраненные варианты"""
+
+    def setUp(self):
+        super().setUp()
+        self.product_image = ProductImage.objects.create(
+            product=self.create_product('A1'), image=make_image(size=(1000, 500))
+        )
+
+    def render(self, product_image):
+        return Template(
+            "{% load catalog_tags %}{% picture image 'detail' alt='Фото' %}"
+        ).render(Context({'image': product_image}))
+
+    def process(self):
+        with self.settings(IMAGE_RENDITIONS=RENDITIONS):
+            process_stored_image(ProductImage.objects.select_related('blob').get(pk=self.product_image.pk))
+        return ProductImage.objects.get(pk=self.product_image.pk)
+
+    def test_unprocessed_image_falls_back_to_img(self):
+        html = self.render(self.product_image)
+        self.assertTrue(html.startswith('<img src="'))
+        self.assertIn(self.product_image.image.url, html)
+
+    def test_srcset_lists_each_file_once(self):
+        product_image = self.process()
+        detail = product_image.renditions['detail']['jpeg']
+        self.assertEqual([item['width'] for item in detail], [640, 1000])
+
+        with self.settings(IMAGE_RENDITIONS=RENDITIONS):
+            html = self.render(product_image)
+        self.assertTrue(html.startswith('<picture>'))
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn(' 640w, ', html)
+        self.assertEqual(html.count(' 1000w'), len(get_rendition_formats()))
+        self.assertNotIn('1280w', html)
+        self.assertIn(f'src="{product_image.get_rendition_url("detail")}"', html)
@@ -0,0 +1,71 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.urls import reverse
+
+from ..models import Product
+from ..search import SimpleSearchEngine, SQLiteSearchEngine, SQLITE_FTS_TABLE
+from .base import CatalogTestCase
+
+
+class SimpleSearchEngineTests(CatalogTestCase):
+    """Поиск подстроки без индекса"""
+
+    engine_class = SimpleSearchEngine
+
+    def setUp(self):
+        super().setUp()
+        self.engine = self.engine_class()
+        # Строчные буквы: LOWER() в SQLite не меняет регистр кириллицы
+        self.bolt = self.create_product('BOLT-12', name='болт оцинкованный', location='стеллаж 4')
+        self.nut = self.create_product('N-1', name='гайка', description='подходит к болту BOLT-12')
+        self.create_product('W-1', name='шайба')
+
+    def codes(self, query, **kwargs):
+        return [product.code for product in self.engine.search(query, **kwargs)]
+
+    def test_matches_all_fields(self):
+        self.assertEqual(self.codes('гайка'), ['N-1'])
+        self.assertEqual(self.codes('стеллаж'), ['BOLT-12'])
+        self.assertEqual(self.codes('шуруп'), [])
+        self.assertEqual(self.codes('  '), [])
+
+    def test_code_match_ranks_first(self):
+        self.assertEqual(self.codes('bolt')[0], 'BOLT-12')
+        self.assertEqual(set(self.codes('bolt')), {'BOLT-12', 'N-1'})
+
+    def test_search_within_queryset(self):
+        queryset = Product.objects.exclude(pk=self.bolt.pk)
+        self.assertEqual(self.codes('bolt', queryset=queryset), ['N-1'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 доступен только в SQLite')
+class SQLiteSearchEngineTests(SimpleSearchEngineTests):
+    """Поиск через индекс FTS5"""
+
+    engine_class = SQLiteSearchEngine
+
+    def test_index_follows_saves_and_deletes(self):
+        self.nut.name = 'гайка шестигранная'
+        self.nut.save()
+        self.assertEqual(self.codes('шестигранная'), ['N-1'])
+
+        self.nut.delete()
+        self.assertEqual(self.codes('гайка'), [])
+
+    def test_prefix_match(self):
+        self.assertEqual(self.codes('оцинк'), ['BOLT-12'])
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE}')
+        self.assertEqual(self.codes('гайка'), [])
+
+        self.assertEqual(self.engine.rebuild(), 3)
+        self.assertEqual(self.codes('гайка'), ['N-1'])
+
+    def test_search_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_products'), {'q': 'гайка'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product.code for product in response.context['products']], ['N-1'])
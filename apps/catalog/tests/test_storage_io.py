@@ -0,0 +1,102 @@
+import io
+import re
+from unittest import mock
+
+from django.core.files import File
+from django.core.files.storage import InMemoryStorage
+from django.db.models.fields.files import FieldFile
+from django.test import SimpleTestCase
+from PIL import Image
+
+from ..image_pipeline import process_stored_image
+from ..models import ProductImage
+from ..storage_io import (
+    READ_BUFFER_SIZE, RangedReader, delete_file, encode_image, open_stream, save_file
+)
+from .base import CatalogTestCase, in_memory_storage, make_image
+
+
+class FakeS3Object:
+    """Объект S3 с чтением диапазонов (как boto3 Object.get(Range=...))"""
+
+    def __init__(self, data):
+        self.data = data
+        self.content_length = len(data)
+        self.ranges = []
+
+    def get(self, Range):
+        start, end = map(int, re.fullmatch(r'bytes=(\d+)-(\d+)', Range).groups())
+        self.ranges.append((start, end))
+        return {'Body': io.BytesIO(self.data[start:end + 1])}
+
+
+class StorageIOTests(SimpleTestCase):
+    """Потоковое чтение и запись через API хранилища (apps.catalog.storage_io)"""
+
+    def test_ranged_reader(self):
+        data = bytes(range(256)) * 10
+        obj = FakeS3Object(data)
+        reader = io.BufferedReader(RangedReader(obj), buffer_size=100)
+
+        self.assertEqual(reader.read(10), data[:10])
+        reader.seek(-5, io.SEEK_END)
+        self.assertEqual(reader.read(), data[-5:])
+        reader.seek(1000)
+        self.assertEqual(reader.read(300), data[1000:1300])
+        self.assertEqual(reader.read(10 ** 6), data[1300:])
+        self.assertEqual(reader.read(), b'')
+        self.assertTrue(all(end - start < 2 * len(data) for start, end in obj.ranges))
+
+    def test_image_header_is_read_without_full_download(self):
+        data = make_image(size=(2000, 2000)).read()
+        obj = FakeS3Object(data + b'\0' * (4 * READ_BUFFER_SIZE))
+        img = Image.open(io.BufferedReader(RangedReader(obj), buffer_size=1024))
+
+        self.assertEqual(img.size, (2000, 2000))
+        self.assertLess(sum(end - start + 1 for start, end in obj.ranges), len(data))
+
+    def test_local_storage_round_trip(self):
+        storage = InMemoryStorage()
+        content = encode_image(Image.new('RGB', (50, 40)), 'JPEG', quality=80)
+        name = save_file(storage, 'renditions/photo.jpg', content)
+        self.assertTrue(content.closed)
+
+        with open_stream(storage, name) as file:
+            self.assertEqual(Image.open(file).size, (50, 40))
+
+        delete_file(storage, name)
+        self.assertFalse(storage.exists(name))
+        # Отсутствующий файл - не ошибка
+        delete_file(storage, name)
+
+    def test_save_file_closes_content_on_error(self):
+        class FailingStorage(InMemoryStorage):
+            def _save(self, name, content):
+                raise OSError('нет места')
+
+        content = File(io.BytesIO(b'data'))
+        with self.assertRaises(OSError):
+            save_file(FailingStorage(), 'photo.jpg', content)
+        self.assertTrue(content.closed)
+
+
+@in_memory_storage
+class RemoteStorageProcessingTests(CatalogTestCase):
+    """Обработка изображений без обращения к локальному диску"""
+
+    def test_processing_uses_storage_api_only(self):
+        product_image = ProductImage.objects.create(
+            product=self.create_product('A1'), image=make_image(size=(1200, 900))
+        )
+        # Как у S3Storage: локального пути у файла нет
+        no_path = mock.PropertyMock(side_effect=NotImplementedError)
+        with mock.patch.object(FieldFile, 'path', no_path):
+            process_stored_image(ProductImage.objects.select_related('blob').get(pk=product_image.pk))
+        no_path.assert_not_called()
+
+        product_image.refresh_from_db()
+        self.assertEqual(product_image.processing_status, ProductImage.PROCESSING_DONE)
+        storage = product_image.image.storage
+        self.assertTrue(storage.exists(product_image.thumbnail.name))
+        for items in product_image.renditions['card'].values():
+            self.assertTrue(all(storage.exists(item['name']) for item in items))
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from config.celery import app
+
+from .. import tasks
+
+
+class TaskRoutingTests(SimpleTestCase):
+    """Очереди и ограничения скорости задач Celery (config/celery.py)"""
+
+    def route(self, task):
+        return app.amqp.router.route({}, task.name)['queue'].name
+
+    def test_queues(self):
+        self.assertEqual(self.route(tasks.process_product_image), 'interactive')
+        for task in (tasks.process_product_image_bulk, tasks.process_multiple_images,
+                     tasks.create_thumbnail, tasks.optimize_image):
+            self.assertEqual(self.route(task), 'bulk')
+        self.assertEqual(self.route(tasks.write_changelog), 'default')
+
+    def test_rate_limit_only_for_bulk_tasks(self):
+        self.assertIsNone(tasks.process_product_image.rate_limit)
+        for task in (tasks.process_product_image_bulk, tasks.create_thumbnail, tasks.optimize_image):
+            self.assertEqual(task.rate_limit, settings.CELERY_BULK_RATE_LIMIT)
+
+    def test_worker_settings(self):
+        self.assertTrue(app.conf.task_acks_late)
+        self.assertEqual(app.conf.worker_prefetch_multiplier, 1)
+        self.assertGreater(
+            app.conf.broker_transport_options['visibility_timeout'], app.conf.task_time_limit
+        )
+
+    def test_multiple_images_use_bulk_task(self):
+        with mock.patch.object(tasks.process_product_image_bulk, 'delay') as bulk_delay, \
+                mock.patch.object(tasks.process_product_image, 'delay') as delay:
+            bulk_delay.return_value.id = 'task-id'
+            result = tasks.process_multiple_images([1, 2])
+
+        self.assertEqual([call.args for call in bulk_delay.call_args_list], [(1,), (2,)])
+        delay.assert_not_called()
+        self.assertEqual(result, {'total': 2, 'tasks': [(1, 'task-id'), (2, 'task-id')]})
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import uploads
+from ..models import ImageBlob, ProductImage, UploadSession
+from .base import CatalogTestCase, in_memory_storage, make_image
+
+
+@in_memory_storage
+class ChunkedUploadTests(CatalogTestCase):
+    """Порционная возобновляемая загрузка (apps.catalog.uploads)"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('A1')
+        self.data = make_image(size=(400, 300)).read()
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        settings_override = self.settings(UPLOAD_TEMP_DIR=temp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(uploads._hashers.clear)
+        self.client.force_login(self.user)
+
+    def start(self, filename='photo.jpg', size=None):
+        return self.client.post(
+            reverse('create_upload_session', args=[self.product.pk]),
+            json.dumps({'filename': filename, 'size': len(self.data) if size is None else size}),
+            content_type='application/json'
+        )
+
+    def put(self, url, offset, data):
+        return self.client.put(url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_upload_in_parts(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        url = response.json()['url']
+
+        response = self.put(url, 0, self.data[:1000])
+        self.assertEqual(response.json(), {'success': True, 'offset': 1000, 'size': len(self.data)})
+        # После обрыва клиент узнает смещение и продолжает с него
+        self.assertEqual(self.client.get(url).json()['offset'], 1000)
+
+        response = self.put(url, 1000, self.data[1000:])
+        data = response.json()
+        self.assertTrue(data['complete'])
+        product_image = ProductImage.objects.get(pk=data['image']['id'])
+        self.assertEqual(product_image.product, self.product)
+        self.assertEqual(product_image.uploaded_by, self.user)
+        self.assertEqual(product_image.blob.sha256, hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(os.listdir(uploads.get_temp_dir()), [])
+
+    def test_offset_mismatch(self):
+        url = self.start().json()['url']
+        self.put(url, 0, self.data[:1000])
+
+        response = self.put(url, 0, self.data[:1000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1000')
+        self.assertEqual(self.put(url, 500, self.data[500:]).status_code, 409)
+        self.assertEqual(self.client.put(url, b'x', content_type='application/octet-stream').status_code, 400)
+
+    def test_data_beyond_declared_size(self):
+        url = self.start().json()['url']
+        response = self.put(url, 0, self.data + b'extra')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.client.get(url).json()['offset'], 0)
+
+    def test_hash_is_resumed_from_temp_file(self):
+        url = self.start().json()['url']
+        self.put(url, 0, self.data[:1000])
+        # Следующую часть принимает другой процесс
+        uploads._hashers.clear()
+        image_id = self.put(url, 1000, self.data[1000:]).json()['image']['id']
+        self.assertEqual(
+            ProductImage.objects.get(pk=image_id).blob.sha256, hashlib.sha256(self.data).hexdigest()
+        )
+
+    def test_hasher_cache_is_bounded(self):
+        for _ in range(uploads.MAX_CACHED_HASHERS + 5):
+            self.put(self.start().json()['url'], 0, self.data[:10])
+        self.assertEqual(len(uploads._hashers), uploads.MAX_CACHED_HASHERS)
+
+    def test_retried_final_part_returns_same_image(self):
+        url = self.start().json()['url']
+        self.put(url, 0, self.data[:1000])
+        first = self.put(url, 1000, self.data[1000:]).json()
+
+        # Ответ потерян - клиент повторяет последнюю часть
+        retry = self.put(url, 1000, self.data[1000:])
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()['image'], first['image'])
+        self.assertEqual(self.client.get(url).json()['image'], first['image'])
+        self.assertEqual(ProductImage.objects.count(), 1)
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+
+    def test_invalid_image(self):
+        url = self.start(size=4).json()['url']
+        response = self.put(url, 0, b'abcd')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(uploads.get_temp_dir()), [])
+
+    def test_invalid_session_requests(self):
+        self.assertEqual(self.start(filename='setup.exe').status_code, 400)
+        self.assertEqual(self.start(size=0).status_code, 400)
+        self.assertEqual(self.start(size=uploads.MAX_UPLOAD_SIZE + 1).status_code, 400)
+
+        url = self.start().json()['url']
+        other = User.objects.create_user('other', password='password')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_cancel_and_cleanup(self):
+        url = self.start().json()['url']
+        self.put(url, 0, self.data[:1000])
+        self.assertEqual(self.client.delete(url).json(), {'success': True})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.put(self.start().json()['url'], 0, self.data[:1000])
+        UploadSession.objects.update(updated_at=timezone.now() - timedelta(hours=25))
+        self.assertEqual(uploads.cleanup_sessions(hours=24), 1)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(uploads.get_temp_dir()), [])
@@ -0,0 +1,282 @@
+"""
+Порционная возобновляемая загрузка изображений.
+
+Протокол:
+    POST   ajax-upload/<product_id>/sessions/  {"filename", "size"} -> {"id", "offset", "chunk_size"}
+    GET    upload-sessions/<id>/               -> {"offset", "size"} (для возобновления)
+    PUT    upload-sessions/<id>/               тело - очередная часть файла,
+                                               заголовок Upload-Offset - ее смещение
+    DELETE upload-sessions/<id>/               отмена загрузки
+
+Завершение идемпотентно: если ответ на последнюю часть потерян и клиент
+повторил ее, возвращается уже созданное изображение.
+
+Часть читается из потока запроса небольшими блоками в буфер (крупные -
+во временный файл), затем под блокировкой сессии дописывается во временный
+файл загрузки (UPLOAD_TEMP_DIR), поэтому память на загрузку постоянна
+и не зависит от размера файла, а медленный клиент не держит блокировку. Смещение хранится в UploadSession: после
+обрыва связи клиент запрашивает его и отправляет только оставшуюся часть.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import ImageBlob, ProductImage, UploadSession
+
+# Рекомендуемый размер части для клиента
+CHUNK_SIZE = 1024 * 1024
+
+# Размер блока чтения из потока запроса
+READ_BLOCK_SIZE = 64 * 1024
+
+# Ограничение размера изображения (как validate_image_size)
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Незавершенные хеши сессий процесса: {id сессии: (смещение, hasher)}.
+# Брошенные сессии из словаря не удаляются, поэтому он ограничен
+# MAX_CACHED_HASHERS последними сессиями (вытесненный хеш пересчитывается
+# из временного файла)
+MAX_CACHED_HASHERS = 100
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Ошибка загрузки; status - HTTP-статус ответа"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_temp_dir():
+    directory = str(getattr(settings, 'UPLOAD_TEMP_DIR', os.path.join(settings.BASE_DIR, 'upload_sessions')))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def get_temp_path(session):
+    return os.path.join(get_temp_dir(), f'{session.pk}.part')
+
+
+def create_session(product, user, filename, size):
+    """Новая сессия загрузки с пустым временным файлом"""
+    filename = os.path.basename(str(filename or '')).strip()
+    if not filename:
+        raise UploadError('Не указано имя файла')
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in settings.ALLOWED_IMAGE_EXTENSIONS:
+        raise UploadError(f'Недопустимый тип файла: {extension}')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('Не указан размер файла')
+    if size <= 0:
+        raise UploadError('Пустой файл')
+    if size > MAX_UPLOAD_SIZE:
+        raise UploadError('Размер изображения не должен превышать 10MB')
+
+    session = UploadSession.objects.create(
+        product=product,
+        uploaded_by=user,
+        filename=filename,
+        size=size
+    )
+    open(get_temp_path(session), 'wb').close()
+    return session
+
+
+def read_chunk(stream, limit):
+    """
+    Чтение части из потока запроса во временный файл (до блокировки сессии).
+
+    Читается не более limit + 1 байт - этого достаточно, чтобы обнаружить
+    превышение заявленного размера. При обрыве связи возвращается
+    принятое до обрыва.
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+    received = 0
+    while received <= limit:
+        try:
+            block = stream.read(min(READ_BLOCK_SIZE, limit + 1 - received))
+        except OSError:
+            # Обрыв связи: принятое сохраняем, клиент продолжит с нового смещения
+            break
+        if not block:
+            break
+        buffer.write(block)
+        received += len(block)
+    buffer.seek(0)
+    return buffer, received
+
+
+def append_chunk(session, offset, stream):
+    """
+    Дописывание части из потока stream со смещения offset.
+
+    Часть сначала читается из сети без блокировок, затем сессия
+    блокируется только на время проверки смещения и записи в файл,
+    чтобы параллельные запросы не перемешали части. Смещение должно
+    совпадать с принятым сервером (иначе UploadError 409 - клиент должен
+    запросить актуальное смещение); завершенная или отмененная
+    параллельным запросом сессия - UploadError 404.
+    Если файл уже принят целиком (повтор последней части), данные
+    не записываются и сессия возвращается как есть.
+    Возвращает обновленную сессию.
+    """
+    buffer, received = read_chunk(stream, session.size - offset)
+    with buffer, transaction.atomic():
+        try:
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        except UploadSession.DoesNotExist:
+            raise UploadError('Сессия загрузки завершена или отменена', status=404)
+        if session.is_complete:
+            return session
+        if offset != session.offset:
+            raise UploadError(f'Неверное смещение: ожидается {session.offset}', status=409)
+        if received > session.size - session.offset:
+            # Лишние данные: часть не принимается, смещение не меняется
+            raise UploadError('Размер данных превышает заявленный размер файла', status=413)
+
+        hasher = get_hasher(session)
+        with open(get_temp_path(session), 'r+b') as output:
+            output.seek(session.offset)
+            while True:
+                block = buffer.read(READ_BLOCK_SIZE)
+                if not block:
+                    break
+                output.write(block)
+                hasher.update(block)
+
+        session.offset += received
+        if session.is_complete:
+            session.sha256 = hasher.hexdigest()
+        session.save(update_fields=['offset', 'sha256', 'updated_at'])
+
+    # Состояние хеша запоминается только после фиксации части
+    if session.is_complete:
+        forget_hasher(session)
+    else:
+        remember_hasher(session, hasher)
+    return session
+
+
+def get_hasher(session):
+    """
+    SHA-256 принятой части файла для продолжения хеширования.
+
+    Состояние хеша хранится в памяти процесса; если предыдущую часть
+    принимал другой процесс (или процесс перезапущен), уже принятые
+    байты хешируются из временного файла.
+    """
+    with _hashers_lock:
+        cached = _hashers.get(session.pk)
+    if cached is not None and cached[0] == session.offset:
+        # Копия - при ошибке записи сохраненное состояние не портится
+        return cached[1].copy()
+
+    hasher = hashlib.sha256()
+    remaining = session.offset
+    with open(get_temp_path(session), 'rb') as source:
+        while remaining > 0:
+            block = source.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def remember_hasher(session, hasher):
+    """Сохранение состояния хеша сессии (с вытеснением самых старых)"""
+    with _hashers_lock:
+        _hashers[session.pk] = (session.offset, hasher)
+        _hashers.move_to_end(session.pk)
+        while len(_hashers) > MAX_CACHED_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def forget_hasher(session):
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+
+
+def is_valid_image(path):
+    try:
+        with Image.open(path) as img:
+            img.verify()
+    except Exception:
+        return False
+    return True
+
+
+def finalize_session(session):
+    """
+    Создание ProductImage из полностью принятого файла.
+
+    Файл передается в ImageBlob с уже посчитанным при приеме хешем:
+    повторная загрузка того же содержимого не сохраняет новую копию.
+    Сессия блокируется на время создания изображения; для уже завершенной
+    сессии возвращается созданное ранее изображение.
+    """
+    path = get_temp_path(session)
+    with transaction.atomic():
+        try:
+            session = UploadSession.objects.select_for_update().select_related('product_image').get(pk=session.pk)
+        except UploadSession.DoesNotExist:
+            raise UploadError('Сессия загрузки завершена или отменена', status=404)
+        if session.product_image is not None:
+            return session.product_image
+        if not os.path.exists(path):
+            # Завершена, но созданное изображение уже удалено
+            raise UploadError('Сессия загрузки завершена или отменена', status=404)
+
+        valid = is_valid_image(path)
+        if valid:
+            with open(path, 'rb') as source:
+                blob = ImageBlob.acquire(File(source, name=session.filename), sha256=session.sha256 or None)
+            product_image = ProductImage(product=session.product, uploaded_by=session.uploaded_by, blob=blob)
+            blob.copy_to(product_image)
+            product_image.save()
+            session.product_image = product_image
+            session.save(update_fields=['product_image', 'updated_at'])
+
+    if not valid:
+        discard_session(session)
+        raise UploadError('Файл не является изображением')
+
+    # Сессия остается до cleanup_sessions как отметка о завершении
+    remove_temp_file(session)
+    return product_image
+
+
+def remove_temp_file(session):
+    path = get_temp_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def discard_session(session):
+    """Удаление сессии и ее временного файла"""
+    remove_temp_file(session)
+    forget_hasher(session)
+    session.delete()
+
+
+def cleanup_sessions(hours=24):
+    """Удаление брошенных и завершенных сессий без активности дольше hours часов"""
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    count = 0
+    for session in stale.iterator():
+        discard_session(session)
+        count += 1
+    return count
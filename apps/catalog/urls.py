@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Главная страница
@@ -10,15 +10,28 @@ urlpatterns = [
     
     # Поиск
     path('search/', views.search_products, name='search_products'),
+    path('autocomplete/', views.autocomplete_products, name='autocomplete_products'),
     
     # Проверка уникальности кода (AJAX)
     path('check-code/<str:subdivision_code>/', 
          views.check_product_code, name='check_product_code'),
+    path('check-codes/<str:subdivision_code>/', 
+         views.check_product_codes, name='check_product_codes'),
     
     # Загрузка изображений (AJAX)
     path('ajax-upload/<int:product_id>/', 
          views.ajax_upload_images, name='ajax_upload_images'),
     
+    # Порционная возобновляемая загрузка изображений (AJAX)
+    path('ajax-upload/<int:product_id>/sessions/', 
+         views.create_upload_session, name='create_upload_session'),
+    path('upload-sessions/<uuid:session_id>/', 
+         views.upload_session, name='upload_session'),
+    
+    # События обработки изображений продукта (Server-Sent Events)
+    path('product/<int:product_id>/image-events/', 
+         views.image_events, name='product_image_events'),
+    
     # CRUD операции
     path('create/<str:subdivision_code>/', 
          views.ProductCreateView.as_view(), name='product_create'),
@@ -35,9 +48,17 @@ urlpatterns = [
     path('upload-images/<int:product_id>/', 
          views.upload_product_images, name='upload_product_images'),
     
+    # JSON API только для чтения (ETag)
+    path('api/subdivisions/', api.subdivision_list, name='api_subdivision_list'),
+    path('api/subdivisions/<str:subdivision_code>/products/', 
+         api.subdivision_products, name='api_subdivision_products'),
+    path('api/products/<int:product_id>/', api.product_detail, name='api_product_detail'),
+    
     # Подразделения и продукты
     path('product/<int:product_id>/in/<str:subdivision_code>/', 
          views.ProductDetailView.as_view(), name='product_detail'),
+    path('<str:subdivision_code>/export/', 
+         views.export_subdivision_products, name='export_subdivision_products'),
     path('<str:subdivision_code>/', views.SubdivisionProductsView.as_view(), 
          name='subdivision_products'),
 ]
\ No newline at end of file
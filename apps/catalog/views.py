@@ -1,16 +1,36 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
-from django.db.models import Count, Q
-from django.db.models.functions import Lower
-from django.http import JsonResponse, HttpResponseRedirect
+from django.urls import reverse, reverse_lazy
+from django.db.models import Exists, OuterRef, Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, JsonResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import content_disposition_header
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import os
-from .models import Subdivision, Product, ProductImage
+import json
+import asyncio
+from asgiref.sync import sync_to_async
+from datetime import datetime, time, timedelta
+from .models import Subdivision, Product, ProductCounter, ProductImage, UploadSession
+from .permissions import get_permission_context
+from .search import get_search_engine
+from .exporters import iter_csv, iter_file, write_xlsx
+from .pagination import CursorPage, CursorPaginator
+from .cache import get_many_or_build, get_or_build, product_scope, subdivision_scope
+from .uploads import (
+    CHUNK_SIZE as UPLOAD_CHUNK_SIZE, UploadError,
+    append_chunk, create_session, discard_session, finalize_session,
+)
+from .code_index import afind_taken_codes, is_enabled as is_code_index_enabled
+from . import events
 from .forms import (
     ProductForm, MultipleImageUploadForm,
     ProductCreateWithImagesForm, 
@@ -26,21 +46,84 @@ class HomeView(ListView):
     context_object_name = 'subdivisions'
     
     def get_queryset(self):
-        # Аннотируем количество продуктов в каждом подразделении
-        return Subdivision.objects.annotate(
-            product_count=Count('products')
-        ).order_by('name')
+        # Количество продуктов берем из счетчиков, а не считаем по таблице продуктов
+        return get_or_build(
+            'home:subdivisions',
+            ['subdivisions', 'products'],
+            lambda: list(
+                Subdivision.objects.select_related('manager').annotate(
+                    product_count=Coalesce(Sum('product_counters__count'), 0)
+                ).order_by('name')
+            )
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Общее количество неликвидов
-        context['total_products'] = Product.objects.count()
         # Статистика по статусам
-        context['status_stats'] = Product.objects.values('status').annotate(
-            count=Count('id')
+        status_stats = get_or_build(
+            'home:status_stats',
+            ['products'],
+            lambda: list(
+                ProductCounter.objects.order_by('status').values('status').annotate(
+                    count=Sum('count')
+                ).filter(count__gt=0)
+            )
         )
+        context['status_stats'] = status_stats
+        # Общее количество неликвидов
+        context['total_products'] = sum(stat['count'] for stat in status_stats)
         return context
 
+def get_product_filters(params):
+    """Проверенные параметры фильтрации из GET-запроса (неверные значения отбрасываются)"""
+    filters = {}
+    
+    status_filter = params.get('status')
+    if status_filter in dict(Product.STATUS_CHOICES):
+        filters['status'] = status_filter
+    
+    condition_filter = params.get('condition')
+    if condition_filter in dict(Product.CONDITION_CHOICES):
+        filters['condition'] = condition_filter
+    
+    location_filter = params.get('location', '').strip()
+    if location_filter:
+        filters['location'] = location_filter
+    
+    for name in ('date_from', 'date_to'):
+        try:
+            value = parse_date(params.get(name, ''))
+        except ValueError:
+            value = None
+        if value:
+            filters[name] = value
+    
+    return filters
+
+def apply_product_filters(queryset, params):
+    """Фильтрация продуктов по параметрам GET-запроса (статус, состояние, место, даты)"""
+    filters = get_product_filters(params)
+    
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    if 'condition' in filters:
+        queryset = queryset.filter(condition=filters['condition'])
+    if 'location' in filters:
+        queryset = queryset.filter(location__icontains=filters['location'])
+    # Диапазон дат по created_at, чтобы условие попадало в составной индекс
+    if 'date_from' in filters:
+        queryset = queryset.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(filters['date_from'], time.min))
+        )
+    if 'date_to' in filters:
+        queryset = queryset.filter(
+            created_at__lt=timezone.make_aware(
+                datetime.combine(filters['date_to'] + timedelta(days=1), time.min)
+            )
+        )
+    
+    return queryset
+
 class SubdivisionProductsView(ListView):
     """Список продуктов в подразделении"""
     model = Product
@@ -48,39 +131,153 @@ class SubdivisionProductsView(ListView):
     context_object_name = 'products'
     paginate_by = 24
     
+    # Время кэширования количества для фильтров, которых нет в счетчиках
+    count_cache_timeout = 60
+    
+    # Время кэширования HTML карточек (ключ меняется при изменении продукта)
+    card_cache_timeout = 60 * 60
+    
     def get_queryset(self):
         self.subdivision = get_object_or_404(
             Subdivision, 
             code=self.kwargs['subdivision_code']
         )
-        return Product.objects.filter(
-            subdivision=self.subdivision
-        ).select_related('subdivision', 'created_by').prefetch_related('images')
+        self.filters = get_product_filters(self.request.GET)
+        
+        # Фильтры применяются до пагинации: страница - один диапазон
+        # составного индекса (subdivision, status|condition, -created_at, -id)
+        queryset = Product.objects.filter(subdivision=self.subdivision)
+        return apply_product_filters(queryset, self.request.GET).select_related(
+            'subdivision', 'created_by'
+        ).prefetch_related('images')
+    
+    def get_total_count(self):
+        """Количество продуктов с учетом фильтров без COUNT на каждую страницу"""
+        if not self.filters.keys() - {'status', 'condition'}:
+            # Статус и состояние есть в счетчиках
+            counters = self.subdivision.product_counters.all()
+            if 'status' in self.filters:
+                counters = counters.filter(status=self.filters['status'])
+            if 'condition' in self.filters:
+                counters = counters.filter(condition=self.filters['condition'])
+            return counters.aggregate(total=Sum('count'))['total'] or 0
+        
+        # Для места хранения и дат - COUNT с кэшированием до изменения подразделения
+        return get_or_build(
+            'count',
+            [subdivision_scope(self.subdivision.pk)],
+            lambda: self.object_list.order_by().count(),
+            parts=(sorted((name, str(value)) for name, value in self.filters.items()),),
+            timeout=self.count_cache_timeout
+        )
+    
+    def paginate_queryset(self, queryset, page_size):
+        """Курсорная пагинация по (created_at, id) вместо OFFSET, с кэшированием страницы"""
+        cursor = self.request.GET.get('cursor')
+        
+        def build_page():
+            paginator = CursorPaginator(queryset, page_size, count=self.get_total_count())
+            page = paginator.page(cursor)
+            return {
+                'object_list': page.object_list,
+                'has_next': page.has_next(),
+                'has_previous': page.has_previous(),
+                'count': paginator.count,
+            }
+        
+        data = get_or_build(
+            'subdivision:page',
+            ['subdivisions', subdivision_scope(self.subdivision.pk)],
+            build_page,
+            parts=(sorted((name, str(value)) for name, value in self.filters.items()), cursor, page_size)
+        )
+        paginator = CursorPaginator(queryset, page_size, count=data['count'])
+        page = CursorPage(data['object_list'], paginator, data['has_next'], data['has_previous'])
+        return (paginator, page, page.object_list, page.has_other_pages())
+    
+    def get_product_cards(self, products):
+        """
+        HTML карточек страницы: одно чтение кэша (get_many) на страницу.
+        
+        Ключ карточки - id, updated_at и основное изображение с датой его
+        обработки, а также все выводимые связанные данные (код подразделения
+        в ссылке, имя автора): неизмененные карточки не рендерятся, а
+        переименование подразделения или пользователя дает новые ключи.
+        Связанные объекты уже загружены (select_related) - ключ не требует
+        запросов. Кнопки, зависящие от прав, в карточку не входят.
+        """
+        def key_parts(product):
+            main_image = product.get_main_image()
+            created_by = product.created_by
+            return (
+                product.pk,
+                product.updated_at.isoformat(),
+                main_image.pk if main_image else None,
+                main_image.processed_at.isoformat() if main_image and main_image.processed_at else None,
+                self.subdivision.code,
+                (created_by.pk, created_by.username, created_by.get_full_name()) if created_by else None,
+            )
+        
+        def render_card(product):
+            return render_to_string('catalog/product_card.html', {
+                'product': product,
+                'subdivision': self.subdivision,
+            })
+        
+        cards = get_many_or_build(
+            'product_card', products, key_parts, render_card, self.card_cache_timeout
+        )
+        return [(product, mark_safe(card)) for product, card in zip(products, cards)]
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['subdivision'] = self.subdivision
+        context['product_cards'] = self.get_product_cards(list(context['products']))
         
         # Проверяем права пользователя
         context['can_add_product'] = self.subdivision.can_user_add_product(self.request.user)
         
-        # Получаем параметры фильтрации из GET-запроса
-        status_filter = self.request.GET.get('status')
-        condition_filter = self.request.GET.get('condition')
-        
-        # Применяем фильтры к queryset
-        queryset = self.get_queryset()
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        if condition_filter:
-            queryset = queryset.filter(condition=condition_filter)
-        
-        context['filtered_products'] = queryset
-        context['status_filter'] = status_filter
-        context['condition_filter'] = condition_filter
+        # Текущие значения фильтров для формы
+        context['status_filter'] = self.filters.get('status')
+        context['condition_filter'] = self.filters.get('condition')
+        context['location_filter'] = self.filters.get('location', '')
+        context['date_from'] = self.filters.get('date_from')
+        context['date_to'] = self.filters.get('date_to')
         
         return context
 
+@login_required
+def export_subdivision_products(request, subdivision_code):
+    """Потоковая выгрузка продуктов подразделения в CSV или XLSX (?format=xlsx)"""
+    subdivision = get_object_or_404(Subdivision, code=subdivision_code)
+    
+    if not subdivision.can_user_view(request.user):
+        messages.error(request, 'У вас нет прав для просмотра этого подразделения')
+        return redirect('home')
+    
+    # Те же фильтры, что и на странице подразделения
+    queryset = apply_product_filters(
+        Product.objects.filter(subdivision=subdivision),
+        request.GET
+    ).order_by('code')
+    
+    filename = f'products_{subdivision.code}_{timezone.localdate():%Y%m%d}'
+    if request.GET.get('format') == 'xlsx':
+        response = StreamingHttpResponse(
+            iter_file(write_xlsx(queryset)),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        filename += '.xlsx'
+    else:
+        response = StreamingHttpResponse(
+            iter_csv(queryset),
+            content_type='text/csv; charset=utf-8'
+        )
+        filename += '.csv'
+    
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
 class ProductDetailView(DetailView):
     """Детальная страница продукта"""
     model = Product
@@ -92,25 +289,27 @@ class ProductDetailView(DetailView):
         product_id = self.kwargs['product_id']
         subdivision_code = self.kwargs['subdivision_code']
         
-        return get_object_or_404(
-            Product.objects.select_related('subdivision', 'created_by')
-                          .prefetch_related('images'),
-            id=product_id,
-            subdivision__code=subdivision_code
+        return get_or_build(
+            'product:detail',
+            ['subdivisions', product_scope(product_id)],
+            lambda: get_object_or_404(
+                Product.objects.select_related('subdivision', 'created_by')
+                              .prefetch_related('images'),
+                id=product_id,
+                subdivision__code=subdivision_code
+            ),
+            parts=(subdivision_code,)
         )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['main_image'] = self.object.get_main_image()
-        context['other_images'] = self.object.images.exclude(
-            id=context['main_image'].id if context['main_image'] else None
-        )
-        
-        # Проверяем права пользователя
-        context['can_edit'] = self.object.can_edit(self.request.user)
-        context['can_delete'] = self.object.can_delete(self.request.user)
-        context['can_upload_images'] = self.object.can_edit(self.request.user)
-        
+        # Берем изображения из кэша prefetch_related, без дополнительного запроса
+        context['other_images'] = [
+            image for image in self.object.images.all()
+            if image != context['main_image']
+        ]
+        # Кнопки по правам проверяет шаблон через catalog_permissions
         return context
 
 class ProductCreateView(LoginRequiredMixin, CreateView):
@@ -297,34 +496,63 @@ def upload_product_images(request, product_id):
         'product': product
     })
 
-def search_products(request):
-    """Поиск продуктов с учетом регистра для русского и английского языка"""
+async def search_products(request):
+    """Полнотекстовый поиск продуктов с ранжированием по релевантности"""
     query = request.GET.get('q', '').strip()
     
     if query:
-        # Приводим запрос к нижнему регистру
-        query_lower = query.lower()
-        
-        # Используем аннотацию с Lower для всех поисковых полей
-        products = Product.objects.annotate(
-            search_code=Lower('code'),
-            search_name=Lower('name'),
-            search_description=Lower('description'),
-            search_location=Lower('location')
-        ).filter(
-            Q(search_code__contains=query_lower) |
-            Q(search_name__contains=query_lower) |
-            Q(search_description__contains=query_lower) |
-            Q(search_location__contains=query_lower)
-        ).select_related('subdivision').order_by('code')[:50]
+        # Движок зависит от базы данных: PostgreSQL (tsvector), SQLite (FTS5);
+        # поисковые запросы выполняются через курсор, поэтому в sync-потоке
+        products = await sync_to_async(get_search_engine().search)(query, limit=50)
     else:
-        products = Product.objects.none()
+        products = []
     
-    return render(request, 'catalog/search_results.html', {
+    # Контекст-процессоры шаблона (пользователь, права) обращаются к базе синхронно
+    return await sync_to_async(render)(request, 'catalog/search_results.html', {
         'products': products,
         'query': query
     })
 
+AUTOCOMPLETE_LIMIT = 10
+
+async def autocomplete_products(request):
+    """Подсказки по коду и наименованию для полей поиска (AJAX)"""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    
+    queryset = Product.objects.all()
+    subdivision_code = request.GET.get('subdivision')
+    if subdivision_code:
+        queryset = queryset.filter(subdivision__code=subdivision_code)
+    
+    # Сначала совпадения по началу кода (индекс), затем по наименованию
+    results = [
+        product async for product in queryset.filter(code__istartswith=query)
+            .order_by('code')
+            .values('id', 'code', 'name', 'subdivision__code')[:AUTOCOMPLETE_LIMIT]
+    ]
+    if len(results) < AUTOCOMPLETE_LIMIT:
+        found = [product['id'] for product in results]
+        results += [
+            product async for product in queryset.filter(name__icontains=query)
+                .exclude(id__in=found)
+                .order_by('name')
+                .values('id', 'code', 'name', 'subdivision__code')[:AUTOCOMPLETE_LIMIT - len(results)]
+        ]
+    
+    return JsonResponse({
+        'results': [
+            {
+                'id': product['id'],
+                'code': product['code'],
+                'name': product['name'],
+                'subdivision': product['subdivision__code'],
+            }
+            for product in results
+        ]
+    })
+
 @login_required
 def user_profile(request):
     """Профиль пользователя"""
@@ -335,19 +563,19 @@ def user_profile(request):
     # Получаем группы пользователя
     groups = user.groups.all()
     
-    # Получаем названия групп для удобства проверки в шаблоне
-    group_names = [group.name for group in groups]
+    # Принадлежность к группам проверяем в памяти через контекст прав
+    permissions = get_permission_context(user)
     
     context = {
         'user': user,
         'created_products': created_products,
         'managed_subdivisions': managed_subdivisions,
         'groups': groups,
-        'group_names': group_names,  # Добавляем список названий групп
-        'is_editor': user.groups.filter(name='Editor').exists(),
-        'is_subdivision_admin': user.groups.filter(name='Subdivision_Admin').exists(),
-        'is_super_admin': user.groups.filter(name='Super_Admin').exists(),
-        'is_viewer': user.groups.filter(name='Viewer').exists(),
+        'group_names': sorted(permissions.group_names),  # Добавляем список названий групп
+        'is_editor': permissions.is_editor,
+        'is_subdivision_admin': permissions.is_subdivision_admin,
+        'is_super_admin': permissions.is_super_admin,
+        'is_viewer': permissions.is_viewer,
     }
     
     return render(request, 'catalog/user_profile.html', context)
@@ -496,7 +724,8 @@ def ajax_upload_images(request, product_id):
         return JsonResponse({
             'success': True,
             'message': f'Загружено {len(created_images)} изображений',
-            'images': created_images
+            'images': created_images,
+            'events_url': reverse('product_image_events', args=[product.id])
         })
         
     except Exception as e:
@@ -505,6 +734,162 @@ def ajax_upload_images(request, product_id):
             'error': str(e)
         }, status=500)
 
+@login_required
+@require_POST
+def create_upload_session(request, product_id):
+    """Начало порционной загрузки изображения (см. apps.catalog.uploads)"""
+    product = get_object_or_404(Product, id=product_id)
+    if not product.can_edit(request.user):
+        return JsonResponse({'success': False, 'error': 'У вас нет прав для загрузки изображений'}, status=403)
+    
+    try:
+        data = json.loads(request.body)
+        session = create_session(product, request.user, data.get('filename'), data.get('size'))
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Ожидается JSON с полями filename и size'}, status=400)
+    except UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+    
+    return JsonResponse({
+        'success': True,
+        'id': str(session.pk),
+        'url': reverse('upload_session', args=[session.pk]),
+        'offset': session.offset,
+        'size': session.size,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+    }, status=201)
+
+def upload_complete_response(session, product_image):
+    """Ответ о завершенной порционной загрузке"""
+    return JsonResponse({
+        'success': True,
+        'offset': session.size,
+        'size': session.size,
+        'complete': True,
+        'image': {
+            'id': product_image.id,
+            'url': product_image.image.url,
+            'name': os.path.basename(product_image.image.name)
+        },
+        'events_url': reverse('product_image_events', args=[product_image.product_id])
+    })
+
+@login_required
+def upload_session(request, session_id):
+    """
+    Состояние (GET), очередная часть (PUT) или отмена (DELETE) порционной загрузки.
+    
+    Для завершенной сессии GET и повторный PUT возвращают созданное изображение.
+    """
+    session = get_object_or_404(
+        UploadSession.objects.select_related('product_image'),
+        pk=session_id, uploaded_by=request.user
+    )
+    
+    if request.method == 'GET':
+        if session.product_image is not None:
+            return upload_complete_response(session, session.product_image)
+        return JsonResponse({'success': True, 'offset': session.offset, 'size': session.size})
+    
+    if request.method == 'DELETE':
+        discard_session(session)
+        return JsonResponse({'success': True})
+    
+    if request.method != 'PUT':
+        return JsonResponse({'success': False, 'error': 'Метод не поддерживается'}, status=405)
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Не указан заголовок Upload-Offset'}, status=400)
+    
+    try:
+        # Тело читается потоком, без request.body
+        session = append_chunk(session, offset, request)
+        if not session.is_complete:
+            return JsonResponse({'success': True, 'offset': session.offset, 'size': session.size})
+        product_image = finalize_session(session)
+    except UploadError as e:
+        response = JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+        if e.status == 409:
+            current_offset = UploadSession.objects.filter(pk=session.pk).values_list('offset', flat=True).first()
+            if current_offset is not None:
+                response['Upload-Offset'] = current_offset
+        return response
+    
+    return upload_complete_response(session, product_image)
+
+# Поток событий закрывается через IMAGE_EVENTS_TIMEOUT секунд (браузер
+# переподключается сам); комментарий-пинг не дает прокси закрыть соединение
+IMAGE_EVENTS_TIMEOUT = 60
+IMAGE_EVENTS_PING_INTERVAL = 15
+
+def format_sse(event, data):
+    return f'event: {event}\ndata: {data}\n\n'
+
+@login_required
+async def image_events(request, product_id):
+    """
+    Server-Sent Events о готовности изображений продукта (только под ASGI).
+    
+    Событие image - состояние изображения (apps.catalog.events.image_event).
+    Параметр images=1,2,... - ожидаемые изображения: сначала передается
+    состояние уже обработанных, а когда готовы все, отправляется событие
+    end и поток закрывается.
+    """
+    product = await Product.objects.select_related('subdivision').filter(pk=product_id).afirst()
+    if product is None:
+        raise Http404('Продукт не найден')
+    user = await request.auser()
+    if not await sync_to_async(product.subdivision.can_user_view)(user):
+        return JsonResponse({'success': False, 'error': 'Нет доступа'}, status=403)
+    
+    try:
+        waiting = {int(image_id) for image_id in request.GET.get('images', '').split(',') if image_id}
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Неверный список изображений'}, status=400)
+    finished = {ProductImage.PROCESSING_DONE, ProductImage.PROCESSING_FAILED}
+    
+    async def stream():
+        loop = asyncio.get_running_loop()
+        yield 'retry: 3000\n\n'
+        # Подписка до чтения состояния: событие между ними не потеряется
+        async with events.subscribe(product_id) as subscription:
+            if waiting:
+                images = ProductImage.objects.filter(
+                    product_id=product_id, pk__in=waiting, processing_status__in=finished
+                )
+                async for image in images:
+                    waiting.discard(image.pk)
+                    yield format_sse('image', json.dumps(events.image_event(image), ensure_ascii=False))
+                # Удаленные изображения не ждем
+                existing = ProductImage.objects.filter(product_id=product_id, pk__in=waiting)
+                waiting.intersection_update([image_id async for image_id in existing.values_list('pk', flat=True)])
+                if not waiting:
+                    yield format_sse('end', '{}')
+                    return
+            
+            deadline = loop.time() + IMAGE_EVENTS_TIMEOUT
+            while loop.time() < deadline:
+                data = await subscription.get(min(IMAGE_EVENTS_PING_INTERVAL, deadline - loop.time()))
+                if data is None:
+                    yield ': ping\n\n'
+                    continue
+                yield format_sse('image', data)
+                if waiting:
+                    event = json.loads(data)
+                    if event['status'] in finished:
+                        waiting.discard(event['id'])
+                        if not waiting:
+                            yield format_sse('end', '{}')
+                            return
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def quick_product_create(request, subdivision_code):
     """Быстрое создание продукта с минимальными полями"""
@@ -559,24 +944,66 @@ def quick_product_create(request, subdivision_code):
     })
 
 @login_required
-def check_product_code(request, subdivision_code):
-    """Проверка уникальности кода продукта через AJAX"""
+async def check_product_code(request, subdivision_code):
+    """Проверка уникальности кода продукта через AJAX (асинхронно)"""
     code = request.GET.get('code', '').strip()
-    subdivision = get_object_or_404(Subdivision, code=subdivision_code)
+    
+    if is_code_index_enabled():
+        # Ответ по множеству кодов в памяти, без запроса к базе
+        taken = await afind_taken_codes(subdivision_code, [code])
+        exists = None if taken is None else bool(taken)
+    else:
+        # Существование подразделения и занятость кода проверяются одним запросом
+        exists = await Subdivision.objects.filter(code=subdivision_code).annotate(
+            code_taken=Exists(Product.objects.filter(subdivision=OuterRef('pk'), code=code))
+        ).values_list('code_taken', flat=True).afirst()
+    if exists is None:
+        raise Http404('Подразделение не найдено')
     
     if not code:
         return JsonResponse({'valid': False, 'message': 'Код не может быть пустым'})
     
-    exists = Product.objects.filter(
-        code=code, 
-        subdivision=subdivision
-    ).exists()
-    
     return JsonResponse({
         'valid': not exists,
         'message': 'Код уже используется в этом подразделении' if exists else 'Код доступен'
     })
 
+MAX_CHECK_CODES = 1000
+
+@login_required
+async def check_product_codes(request, subdivision_code):
+    """
+    Проверка пачки кодов продуктов (AJAX, массовый ввод).
+    
+    POST с JSON {"codes": [...]} или GET с параметрами code=...;
+    ответ - занятые коды и признак доступности для каждого кода.
+    """
+    if request.method == 'POST':
+        try:
+            codes = json.loads(request.body).get('codes')
+        except (ValueError, AttributeError):
+            codes = None
+        if not isinstance(codes, list):
+            return JsonResponse({'error': 'Ожидается JSON вида {"codes": [...]}'}, status=400)
+    else:
+        codes = request.GET.getlist('code')
+    
+    codes = list(dict.fromkeys(str(code).strip() for code in codes if str(code).strip()))
+    if len(codes) > MAX_CHECK_CODES:
+        return JsonResponse(
+            {'error': f'Не более {MAX_CHECK_CODES} кодов за один запрос'}, status=400
+        )
+    
+    # Подразделение проверяется и для пустого списка: неизвестный код - 404
+    taken = await afind_taken_codes(subdivision_code, codes)
+    if taken is None:
+        raise Http404('Подразделение не найдено')
+    
+    return JsonResponse({
+        'results': {code: code not in taken for code in codes},
+        'taken': [code for code in codes if code in taken],
+    })
+
 def custom_logout(request):
     """Кастомный выход из системы с подтверждением"""
     if request.method == 'POST':
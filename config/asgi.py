@@ -3,6 +3,11 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+AJAX-представления каталога (check_product_code, search_products,
+autocomplete_products) асинхронные; запуск под ASGI-сервером:
+
+    uvicorn config.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -1,6 +1,7 @@
 import os
 import platform
 from celery import Celery
+from kombu import Queue
 
 # Устанавливаем переменную окружения для настроек Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -15,6 +16,30 @@ if platform.system() == 'Windows':
     app.conf.worker_pool = 'solo'  # или 'threads'
     app.conf.worker_concurrency = 1
 
+# Очереди задач:
+#   interactive - обработка только что загруженных изображений (ждет пользователь)
+#   bulk        - массовая перегенерация и обслуживание (regenerate_thumbnails,
+#                 process_multiple_images)
+#   default     - прочие задачи (журнал изменений)
+# Чтобы массовая обработка не задерживала свежие загрузки, запускайте
+# отдельные воркеры:
+#   celery -A config worker -Q interactive -c 2 -n interactive@%h
+#   celery -A config worker -Q bulk,default -c 2 -n bulk@%h
+app.conf.task_default_queue = 'default'
+app.conf.task_queues = (
+    Queue('interactive'),
+    Queue('bulk'),
+    Queue('default'),
+)
+app.conf.task_routes = {
+    'apps.catalog.tasks.process_product_image': {'queue': 'interactive'},
+    'apps.catalog.tasks.process_product_image_bulk': {'queue': 'bulk'},
+    'apps.catalog.tasks.create_thumbnail': {'queue': 'bulk'},
+    'apps.catalog.tasks.optimize_image': {'queue': 'bulk'},
+    'apps.catalog.tasks.process_multiple_images': {'queue': 'bulk'},
+    'apps.catalog.tasks.write_changelog': {'queue': 'default'},
+}
+
 # Автоматически находим задачи в установленных приложениях
 app.autodiscover_tasks()
 
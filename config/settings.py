@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,24 +48,35 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.catalog.middleware.ChangeLogMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
 
+# Загрузчики шаблонов: в production скомпилированные шаблоны кэшируются
+# в памяти процесса, при разработке перечитываются с диска
+template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    template_loaders = [('django.template.loaders.cached.Loader', template_loaders)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.catalog.context_processors.catalog_permissions',
             ],
+            'loaders': template_loaders,
         },
     },
 ]
@@ -130,12 +142,83 @@ os.makedirs(MEDIA_ROOT, exist_ok=True)
 os.makedirs(os.path.join(MEDIA_ROOT, 'product_images'), exist_ok=True)
 os.makedirs(os.path.join(MEDIA_ROOT, 'product_thumbnails'), exist_ok=True)
 
+# Хранилище медиафайлов: локальный диск (по умолчанию), S3-совместимое
+# (MEDIA_STORAGE=s3, в том числе MinIO через AWS_S3_ENDPOINT_URL) или
+# память процесса (MEDIA_STORAGE=memory, для тестов). Обработка изображений
+# работает только через API хранилища (apps/catalog/storage_io.py)
+MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'filesystem')
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+if MEDIA_STORAGE == 's3':
+    from boto3.s3.transfer import TransferConfig
+    STORAGES['default'] = {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'bucket_name': os.environ.get('AWS_STORAGE_BUCKET_NAME'),
+            'endpoint_url': os.environ.get('AWS_S3_ENDPOINT_URL'),
+            'access_key': os.environ.get('AWS_ACCESS_KEY_ID'),
+            'secret_key': os.environ.get('AWS_SECRET_ACCESS_KEY'),
+            'region_name': os.environ.get('AWS_S3_REGION_NAME'),
+            'location': 'media',
+            # Как на локальном диске: одинаковые имена получают суффикс
+            'file_overwrite': False,
+            # Файлы больше 8MB загружаются частями по 8MB параллельно
+            'transfer_config': TransferConfig(
+                multipart_threshold=8 * 1024 * 1024,
+                multipart_chunksize=8 * 1024 * 1024,
+            ),
+        },
+    }
+elif MEDIA_STORAGE == 'memory':
+    STORAGES['default'] = {'BACKEND': 'django.core.files.storage.InMemoryStorage'}
+
+# Выдача медиафайлов с проверкой прав (apps/catalog/media.py): 'nginx' -
+# X-Accel-Redirect на internal-location MEDIA_ACCEL_REDIRECT_PREFIX,
+# 'apache' - X-Sendfile, None - файл отдает Django (только при DEBUG, без
+# DEBUG выдача медиафайлов завершается ошибкой ImproperlyConfigured)
+MEDIA_SENDFILE_BACKEND = os.environ.get('MEDIA_SENDFILE_BACKEND') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# Срок хранения медиафайлов в кэше браузера (секунды)
+MEDIA_CACHE_MAX_AGE = 24 * 60 * 60
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
+# Кэш (Redis); версии данных каталога - apps/catalog/cache.py
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', 'redis://localhost:6379/1')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+        'KEY_PREFIX': 'nonliquid',
+        'TIMEOUT': 300,
+    }
+}
+
+# События обработки изображений для SSE (apps/catalog/events.py) - Redis pub/sub
+CATALOG_EVENTS_REDIS_URL = os.environ.get('CATALOG_EVENTS_REDIS_URL', REDIS_CACHE_URL)
+
+# Для тестов и локальной работы без Redis - кэш и события в памяти процесса
+if 'test' in sys.argv or os.environ.get('CACHE_BACKEND') == 'locmem':
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nonliquid-catalog',
+    }
+    CATALOG_EVENTS_REDIS_URL = None
+
+# Журнал изменений продуктов: False - запись в конце запроса,
+# True - передача пачки записей в задачу Celery write_changelog
+CHANGELOG_ASYNC = os.environ.get('CHANGELOG_ASYNC') == '1'
+
+# Каталог сегментов архива журнала изменений (команда archive_changelog)
+CHANGELOG_ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive', 'changelog')
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -146,6 +229,28 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 минут
 
+# Очереди и маршруты задач - в config/celery.py.
+# Обработка изображений идемпотентна: подтверждение после выполнения, чтобы
+# задача упавшего воркера (например, убитого по памяти) вернулась в очередь
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+# Неподтвержденная задача возвращается брокером Redis через visibility_timeout:
+# он должен быть больше ограничения времени задачи
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 2 * CELERY_TASK_TIME_LIMIT}
+# Задачи Pillow длинные: воркер берет по одной, не придерживая очередь
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Перезапуск процесса воркера против роста памяти после декодирования
+# больших изображений (max_memory_per_child - в килобайтах)
+CELERY_WORKER_MAX_TASKS_PER_CHILD = 200
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = 400 * 1024
+# Ограничение скорости задач массовой обработки (на процесс воркера)
+CELERY_BULK_RATE_LIMIT = os.environ.get('CELERY_BULK_RATE_LIMIT', '10/s')
+CELERY_TASK_ANNOTATIONS = {
+    'apps.catalog.tasks.create_thumbnail': {'rate_limit': CELERY_BULK_RATE_LIMIT},
+    'apps.catalog.tasks.optimize_image': {'rate_limit': CELERY_BULK_RATE_LIMIT},
+    'apps.catalog.tasks.process_product_image_bulk': {'rate_limit': CELERY_BULK_RATE_LIMIT},
+}
+
 # Настройки изображений
 IMAGE_MAX_SIZE = 10 * 1024 * 1024  # 10MB
 IMAGE_ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
@@ -153,12 +258,33 @@ IMAGE_THUMBNAIL_SIZE = (500, 500)
 IMAGE_OPTIMIZED_SIZE = (1920, 1080)
 IMAGE_QUALITY = 85
 
+# Адаптивные варианты изображений: ширины (px) и атрибут sizes для <picture>/srcset
+IMAGE_RENDITIONS = {
+    'admin': {'widths': [100, 200], 'sizes': '100px'},
+    'card': {'widths': [320, 480, 640], 'sizes': '(max-width: 768px) 100vw, 33vw'},
+    'detail': {'widths': [640, 960, 1280], 'sizes': '(max-width: 992px) 100vw, 50vw'},
+}
+# Форматы вариантов по приоритету; JPEG - запасной для старых браузеров.
+# 'avif' можно добавить первым, если Pillow собран с поддержкой AVIF
+IMAGE_RENDITION_FORMATS = ['webp', 'jpeg']
+
 # Максимальный размер загружаемых файлов (10MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 
+# Временные файлы порционной загрузки изображений (apps/catalog/uploads.py)
+UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'upload_sessions')
+
 ALLOWED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
 
+# Поисковый движок каталога (путь к классу из apps.catalog.search).
+# None - выбор по базе данных: PostgreSQL - tsvector/GIN, SQLite - FTS5
+CATALOG_SEARCH_ENGINE = None
+
+# Проверка занятости кодов продуктов по множествам кодов в памяти процесса
+# (apps/catalog/code_index.py); актуальность - по версиям подразделений в кэше
+CATALOG_CODE_INDEX = True
+
 # Windows-specific Celery settings
 import platform
 if platform.system() == 'Windows':
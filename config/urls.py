@@ -5,6 +5,7 @@ from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from apps.catalog.forms import CustomLoginForm
 from apps.catalog.views import custom_logout, logout_confirmation
+from apps.catalog.media import protected_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -22,12 +23,15 @@ urlpatterns = [
     path('logout/', custom_logout, name='logout'),
     path('logout/confirmation/', logout_confirmation, name='logout_confirmation'),
     
+    # Медиафайлы с проверкой прав (отдает веб-сервер, см. apps/catalog/media.py);
+    # заменяет static() для MEDIA_URL, в том числе при DEBUG
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:name>', protected_media, name='protected_media'),
+    
     # Все остальные пути каталога
     path('', include('apps.catalog.urls')),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 admin.site.site_header = "Панель администратора каталога неликвидов"
@@ -8,9 +8,26 @@ class ImageUploader {
             maxSize: 10 * 1024 * 1024, // 10MB
             allowedTypes: ['image/jpeg', 'image/png', 'image/gif', 'image/bmp'],
             csrfToken: '',
+            // Порционная загрузка: URL создания сессии (ajax-upload/<id>/sessions/);
+            // по умолчанию выводится из uploadUrl, null - отключить
+            sessionUrl: '',
+            chunkSize: 1024 * 1024, // 1MB
+            maxRetries: 10,
+            retryDelay: 2000,
+            onProgress: null,
+            // Готовность миниатюр по событиям сервера (SSE); по умолчанию
+            // заменяется src у <img data-image-id="..."> загруженного изображения
+            watchProcessing: true,
+            onImageProcessed: null,
             ...options
         };
         
+        // Порционная загрузка включена по умолчанию: URL сессий -
+        // ajax-upload/<id>/sessions/ рядом с URL обычной загрузки
+        if (!this.options.sessionUrl && this.options.uploadUrl && options.sessionUrl !== null) {
+            this.options.sessionUrl = this.options.uploadUrl.replace(/\/?$/, '/') + 'sessions/';
+        }
+        
         this.files = [];
         this.initialize();
     }
@@ -197,6 +214,10 @@ class ImageUploader {
             return { success: false, error: 'Нет файлов для загрузки' };
         }
         
+        if (this.options.sessionUrl) {
+            return this.uploadChunked();
+        }
+        
         const formData = new FormData();
         
         // Добавляем CSRF токен
@@ -217,6 +238,7 @@ class ImageUploader {
             });
             
             const result = await response.json();
+            this.watchUploaded(result);
             return result;
             
         } catch (error) {
@@ -224,6 +246,161 @@ class ImageUploader {
         }
     }
     
+    // Порционная загрузка: файлы по очереди, каждый частями с возобновлением
+    async uploadChunked() {
+        const images = [];
+        const errors = [];
+        let eventsUrl = '';
+        
+        for (const file of this.files) {
+            try {
+                const result = await this.uploadFile(file);
+                images.push(result.image);
+                eventsUrl = result.events_url;
+            } catch (error) {
+                errors.push(`${file.name}: ${error.message}`);
+            }
+        }
+        
+        const result = {
+            success: errors.length === 0,
+            message: `Загружено ${images.length} изображений`,
+            error: errors.join('\n'),
+            images: images,
+            events_url: eventsUrl
+        };
+        this.watchUploaded(result);
+        return result;
+    }
+    
+    // Подписка на события обработки загруженных изображений (вместо перезагрузки страницы)
+    watchUploaded(result) {
+        if (!this.options.watchProcessing || !window.EventSource) return;
+        if (!result || !result.events_url || !result.images || result.images.length === 0) return;
+        
+        const ids = result.images.map(image => image.id);
+        const source = new EventSource(`${result.events_url}?images=${ids.join(',')}`);
+        
+        source.addEventListener('image', (e) => {
+            const image = JSON.parse(e.data);
+            if (this.options.onImageProcessed) {
+                this.options.onImageProcessed(image);
+            } else if (image.thumbnail) {
+                document.querySelectorAll(`img[data-image-id="${image.id}"]`).forEach(img => {
+                    img.src = image.thumbnail;
+                });
+            }
+        });
+        // Все изображения обработаны - закрываем, чтобы браузер не переподключался
+        source.addEventListener('end', () => source.close());
+    }
+    
+    storageKey(file) {
+        return `upload:${this.options.sessionUrl}:${file.name}:${file.size}:${file.lastModified}`;
+    }
+    
+    forgetSession(file) {
+        if (window.localStorage) {
+            localStorage.removeItem(this.storageKey(file));
+        }
+    }
+    
+    async request(url, options = {}) {
+        const response = await fetch(url, {
+            credentials: 'same-origin',
+            ...options,
+            headers: {
+                'X-CSRFToken': this.options.csrfToken,
+                'X-Requested-With': 'XMLHttpRequest',
+                ...(options.headers || {})
+            }
+        });
+        const data = await response.json().catch(() => ({}));
+        return { response, data };
+    }
+    
+    // Сессия загрузки файла: продолжаем сохраненную (после обрыва или перезагрузки) или создаем новую
+    async getSession(file) {
+        const key = this.storageKey(file);
+        const saved = window.localStorage ? localStorage.getItem(key) : null;
+        
+        if (saved) {
+            const { response, data } = await this.request(saved);
+            if (response.ok) {
+                return { url: saved, offset: data.offset };
+            }
+            this.forgetSession(file);
+        }
+        
+        const { response, data } = await this.request(this.options.sessionUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size })
+        });
+        if (!response.ok) {
+            throw new Error(data.error || 'Не удалось начать загрузку');
+        }
+        if (window.localStorage) {
+            localStorage.setItem(key, data.url);
+        }
+        return { url: data.url, offset: data.offset };
+    }
+    
+    async uploadFile(file) {
+        const session = await this.getSession(file);
+        let offset = session.offset;
+        let retries = 0;
+        
+        while (true) {
+            const chunk = file.slice(offset, offset + this.options.chunkSize);
+            try {
+                const { response, data } = await this.request(session.url, {
+                    method: 'PUT',
+                    headers: {
+                        'Content-Type': 'application/octet-stream',
+                        'Upload-Offset': String(offset)
+                    },
+                    body: chunk
+                });
+                
+                if (response.status === 409) {
+                    // Сервер принял другое количество байт - продолжаем с его смещения
+                    const status = await this.request(session.url);
+                    offset = status.data.offset;
+                    continue;
+                }
+                if (!response.ok) {
+                    this.forgetSession(file);
+                    throw new Error(data.error || `Ошибка загрузки (${response.status})`);
+                }
+                
+                offset = data.offset;
+                retries = 0;
+                if (this.options.onProgress) {
+                    this.options.onProgress(file, offset, file.size);
+                }
+                if (data.complete) {
+                    this.forgetSession(file);
+                    return data;
+                }
+            } catch (error) {
+                if (!(error instanceof TypeError) || ++retries > this.options.maxRetries) {
+                    throw error;
+                }
+                // Сетевая ошибка: ждем и узнаем, сколько сервер успел принять
+                await new Promise(resolve => setTimeout(resolve, this.options.retryDelay * retries));
+                try {
+                    const status = await this.request(session.url);
+                    if (status.response.ok) {
+                        offset = status.data.offset;
+                    }
+                } catch (statusError) {
+                    // Сеть еще недоступна - повторим на следующей итерации
+                }
+            }
+        }
+    }
+    
     clear() {
         this.files = [];
         this.updateFileInput();